@@ -0,0 +1,208 @@
+"""Admission control for the expensive parts of a chat turn.
+
+Underwriting (credit bureau and offer mart calls, with their simulated
+delays), the sanction phase (waiting on the PDF render pool, packaging)
+and ML generation each get a `PathLimiter`: at most `max_concurrent`
+turns run the path at once and at most `max_queue` more wait for a slot,
+each for no longer than `max_wait` seconds. A turn that finds the queue
+full, or does not get a slot in time, raises `Overloaded` straight away,
+and the app answers it with 503 and a `Retry-After` estimated from the
+path's recent service time. The conversation state is left where it was,
+so retrying the same message picks the turn up again.
+
+Slot-filling turns (greeting, name, phone, amount and so on) never pass
+through a limiter, so a burst of heavy turns cannot queue in front of
+them: they only compete for CPU, while the heavy turns beyond the limits
+are turned away instead of stacking up.
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from agents.metrics import ADMISSION_REJECTIONS
+
+# Default (max_concurrent, max_queue) per path; HF_LOAN_LIMIT_<PATH>=N:Q overrides
+DEFAULT_LIMITS = {
+    "underwriting": (8, 32),
+    "sanction": (8, 32),
+    "ml": (2, 8),
+}
+
+
+class Overloaded(RuntimeError):
+    """Raised when a path's queue is full or a queued turn waited too long."""
+
+    def __init__(self, path: str, reason: str, retry_after: int) -> None:
+        super().__init__(f"{path} is overloaded ({reason}), retry after {retry_after}s")
+        self.path = path
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PathLimiter:
+    """Concurrency limit with a bounded, time-limited wait queue."""
+
+    def __init__(self, path: str, max_concurrent: int, max_queue: int, max_wait: float) -> None:
+        self.path = path
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.max_waiting = 0
+        # Exponentially weighted service time, for Retry-After
+        self._service_seconds = 0.0
+
+    def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raises `Overloaded`."""
+        with self._cond:
+            if self.running < self.max_concurrent and not self.waiting:
+                self.running += 1
+                self.admitted += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected_full += 1
+                self._reject("queue_full")
+            self.waiting += 1
+            self.queued += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self.running >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        self._reject("timeout")
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.running += 1
+            self.admitted += 1
+
+    def release(self, seconds: float) -> None:
+        with self._cond:
+            self.running -= 1
+            self._service_seconds = seconds if not self._service_seconds else 0.8 * self._service_seconds + 0.2 * seconds
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained (at least 1)."""
+        backlog = (self.waiting + self.running) / self.max_concurrent
+        return max(1, min(60, math.ceil(backlog * (self._service_seconds or 1.0))))
+
+    def _reject(self, reason: str) -> None:
+        ADMISSION_REJECTIONS.labels(self.path, reason).inc()
+        raise Overloaded(self.path, reason, self.retry_after())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "max_wait_seconds": self.max_wait,
+                "running": self.running,
+                "queue_depth": self.waiting,
+                "max_queue_depth": self.max_waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": {"queue_full": self.rejected_full, "timeout": self.rejected_timeout},
+                "avg_service_ms": round(1000 * self._service_seconds, 1),
+            }
+
+
+class _LimitedStream:
+    """Iterator holding a path slot until the stream is exhausted, closed or dropped."""
+
+    def __init__(self, limiter: PathLimiter, stream: Iterable) -> None:
+        self._limiter = limiter
+        self._stream = iter(stream)
+        self._started = time.perf_counter()
+        self._held = True
+
+    def __iter__(self) -> "_LimitedStream":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._stream)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._held:
+            self._held = False
+            self._limiter.release(time.perf_counter() - self._started)
+
+    def __del__(self) -> None:
+        self.close()
+
+
+def limits_from_env(defaults: Dict[str, Tuple[int, int]] = DEFAULT_LIMITS) -> Dict[str, Tuple[int, int]]:
+    limits = {}
+    for path, default in defaults.items():
+        value = os.getenv(f"HF_LOAN_LIMIT_{path.upper()}")
+        if value:
+            concurrent, _, queue = value.partition(":")
+            limits[path] = (int(concurrent), int(queue or default[1]))
+        else:
+            limits[path] = default
+    return limits
+
+
+class AdmissionController:
+    """The `PathLimiter` for each limited path; other paths are admitted freely."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        limits = limits if limits is not None else limits_from_env()
+        max_wait = max_wait if max_wait is not None else float(os.getenv("HF_LOAN_ADMISSION_WAIT", "2"))
+        self.limiters = {
+            path: PathLimiter(path, concurrent, queue, max_wait) for path, (concurrent, queue) in limits.items()
+        }
+
+    def admit(self, path: str):
+        """Context manager holding a slot on `path` (a no-op for unlimited paths)."""
+        limiter = self.limiters.get(path)
+        return limiter.slot() if limiter is not None else nullcontext()
+
+    def admit_stream(self, path: str, stream: Iterable) -> Iterable:
+        """`stream`, holding a slot on `path` from now until it finishes."""
+        limiter = self.limiters.get(path)
+        if limiter is None:
+            return stream
+        limiter.acquire()
+        return _LimitedStream(limiter, stream)
+
+    def occupancy(self) -> Dict[Tuple[str, ...], float]:
+        """Running and queued turns by (path, state), for the /metrics gauge."""
+        values: Dict[Tuple[str, ...], float] = {}
+        for path, limiter in self.limiters.items():
+            values[(path, "running")] = limiter.running
+            values[(path, "queued")] = limiter.waiting
+        return values
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {path: limiter.get_stats() for path, limiter in self.limiters.items()}
+
@@ -1,5 +1,7 @@
 import os
 import json
+import shutil
+import tempfile
 from datetime import datetime
 from typing import Dict, Optional
 
@@ -15,11 +17,13 @@ class CloudStorage:
         self.base_dir = base_dir
         self.files_dir = os.path.join(self.base_dir, 'files')
         self.packages_dir = os.path.join(self.base_dir, 'packages')
+        self.documents_dir = os.path.join(self.base_dir, 'documents')
         self.meta_path = os.path.join(self.base_dir, 'metadata.json')
         self.manager_inbox = os.path.join(self.base_dir, 'manager_inbox.json')
 
         os.makedirs(self.files_dir, exist_ok=True)
         os.makedirs(self.packages_dir, exist_ok=True)
+        os.makedirs(self.documents_dir, exist_ok=True)
 
         # Initialize metadata files if missing
         if not os.path.exists(self.meta_path):
@@ -39,10 +43,10 @@ class CloudStorage:
         safe_name = f"{timestamp}_{filename}"
         dest = os.path.join(self.files_dir, safe_name)
 
-        # write bytes
+        # stream bytes in chunks rather than reading the whole upload into memory
         file_stream.seek(0)
         with open(dest, 'wb') as fh:
-            fh.write(file_stream.read())
+            shutil.copyfileobj(file_stream, fh)
 
         # append metadata
         self._append_metadata('uploads', {
@@ -55,6 +59,34 @@ class CloudStorage:
 
         return dest
 
+    def save_document(self, data: bytes, filename: str, metadata: Optional[Dict] = None) -> str:
+        """Persist a generated document (e.g. a rendered PDF) held in memory.
+
+        The bytes are written once, to a temporary file that is renamed into
+        place, so readers never see a partial document. The returned path is
+        the stored object itself: downloads and packages refer to it rather
+        than to copies. Returns the saved filepath.
+        """
+        dest = os.path.join(self.documents_dir, filename)
+        fd, tmp_path = tempfile.mkstemp(dir=self.documents_dir, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self._append_metadata('documents', {
+            'filename': filename,
+            'saved_path': dest,
+            'size': len(data),
+            'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S'),
+            'meta': metadata or {}
+        })
+
+        return dest
+
     def create_package(self, session_id: str, files: Dict[str, str], package_meta: Optional[Dict] = None) -> str:
         """Create a package (loan folder) that groups files and metadata and store it.
 
@@ -65,15 +97,14 @@ class CloudStorage:
         pkg_dir = os.path.join(self.packages_dir, pkg_name)
         os.makedirs(pkg_dir, exist_ok=True)
 
-        # copy or move files into package dir (we'll copy to keep originals)
+        # link files into the package dir (originals stay where they are)
         pkg_files = {}
         for key, path in files.items():
             if not path:
                 continue
             if os.path.exists(path):
                 dest_path = os.path.join(pkg_dir, os.path.basename(path))
-                with open(path, 'rb') as src, open(dest_path, 'wb') as dst:
-                    dst.write(src.read())
+                self._link_or_copy(path, dest_path)
                 pkg_files[key] = dest_path
 
         record = {
@@ -88,6 +119,15 @@ class CloudStorage:
         self._append_metadata('packages', record)
         return pkg_dir
 
+    @staticmethod
+    def _link_or_copy(src: str, dest: str) -> None:
+        """Hard-link `src` to `dest`, copying only across filesystems."""
+        try:
+            os.link(src, dest)
+        except OSError:
+            # copyfile uses the kernel's zero-copy path where available
+            shutil.copyfile(src, dest)
+
     def notify_manager(self, manager_payload: Dict) -> None:
         """Add an entry to the manager inbox (simulated notification)."""
         with open(self.manager_inbox, 'r+', encoding='utf-8') as fh:
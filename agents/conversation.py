@@ -0,0 +1,258 @@
+"""Compact, typed conversation state.
+
+Every session used to be a dict of dicts, so each one carried its own
+hash tables for the same handful of keys. The records here keep known
+fields in `__slots__` instead, so a field costs one pointer whether it is
+set or not, and `customer_data` and `loan_details` are only created on
+first use. An idle session is a single small object; see
+`benchmarks.bench_conversation_memory`.
+
+The records behave as mutable mappings, so code written against the old
+dicts (`conversation['status']`, `.get(...)`, `conversation[section][key]
+= value`) works unchanged. Keys outside the declared fields go into a
+small overflow dict. The status is held as a `ConversationStatus` member
+(`conversation.status`) but reads through the mapping return its string
+value, so metric labels, JSON payloads and comparisons see the same
+strings as before.
+
+`to_dict`/`to_json` and `from_dict`/`from_json` convert to and from plain
+JSON for persistence, and pickling goes through the same form.
+"""
+import json
+from collections.abc import MutableMapping
+from enum import Enum
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class ConversationStatus(str, Enum):
+    INITIAL = "initial"
+    SALES = "sales"
+    VERIFICATION = "verification"
+    UNDERWRITING = "underwriting"
+    SANCTION = "sanction"
+    COMPLETED = "completed"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+def to_plain(value: Any) -> Any:
+    """`value` with records, enums and tuples turned into JSON types."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+class Record(MutableMapping):
+    """Mapping over the `__slots__` named in `_fields`, plus overflow keys.
+
+    Subclasses declare `__slots__ = _fields`. `_defaults` gives initial
+    field values; a callable is a factory, called on the first read of the
+    field (so mutable defaults are only built when used). `_converters`
+    normalise values as they are set.
+    """
+
+    __slots__ = ("_extra",)
+    _fields: Tuple[str, ...] = ()
+    _field_set: frozenset = frozenset()
+    _defaults: Dict[str, Any] = {}
+    _converters: Dict[str, Callable[[Any], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls._fields)
+
+    def __init__(self, data: Any = None, **kwargs: Any) -> None:
+        self._extra: Optional[Dict[str, Any]] = None
+        for key, default in self._defaults.items():
+            if not callable(default):
+                setattr(self, key, default)
+        if data is not None:
+            self.update(data)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def coerce(cls, value: Any) -> Any:
+        """`value` as this record type (mappings are copied into a new record)."""
+        if value is None or isinstance(value, cls):
+            return value
+        return cls(value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+            factory = self._defaults.get(key)
+            if factory is not None:
+                value = factory()
+                setattr(self, key, value)
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        converter = self._converters.get(key)
+        if converter is not None:
+            value = converter(value)
+        if key in self._field_set:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in self._field_set:
+            return hasattr(self, key) or callable(self._defaults.get(key))
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        for name in self._fields:
+            if hasattr(self, name) or callable(self._defaults.get(name)):
+                yield name
+        if self._extra is not None:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for key in self:
+            # Lazy fields that were never read are written out empty
+            # without being created
+            if key in self._field_set and not hasattr(self, key):
+                data[key] = to_plain(self._defaults[key]())
+            else:
+                data[key] = to_plain(self[key])
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        return cls(data)
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str):
+        return cls.from_dict(json.loads(text))
+
+
+class CustomerData(Record):
+    _fields = ("name", "phone", "employment", "monthly_income", "salary_slip_uploaded")
+    __slots__ = _fields
+
+
+class LoanDetails(Record):
+    _fields = ("amount", "tenure")
+    __slots__ = _fields
+
+
+def _tuple(value: Any) -> Any:
+    return tuple(value) if isinstance(value, list) else value
+
+
+class UnderwritingResult(Record):
+    """`UnderwritingAgent.evaluate_loan` result; note and condition lists are kept as tuples."""
+
+    _fields = (
+        "approved",
+        "credit_score",
+        "pre_approved_limit",
+        "approved_amount",
+        "interest_rate",
+        "tenure",
+        "emi",
+        "total_amount",
+        "total_interest",
+        "processing_fee",
+        "approval_conditions",
+        "underwriting_notes",
+        "reason",
+        "suggestions",
+    )
+    __slots__ = _fields
+    _converters = {
+        "approval_conditions": _tuple,
+        "underwriting_notes": _tuple,
+        "suggestions": _tuple,
+    }
+
+
+def _status(value: Any) -> ConversationStatus:
+    return value if isinstance(value, ConversationStatus) else ConversationStatus(value)
+
+
+class Conversation(Record):
+    """State of one chat session, as used by `MasterAgent.process_message`."""
+
+    _fields = (
+        "session_id",
+        "status",
+        "customer_data",
+        "loan_details",
+        "verification_status",
+        "underwriting_status",
+        "underwriting_result",
+        "sanction_letter",
+        "sanction_letter_status",
+        "sanction_letter_etag",
+        "salary_slip_uploaded",
+        "uploaded_files",
+        "package_path",
+        "manager_notification",
+    )
+    __slots__ = _fields
+    _defaults = {
+        "status": ConversationStatus.INITIAL,
+        "customer_data": CustomerData,
+        "loan_details": LoanDetails,
+        "verification_status": False,
+        "underwriting_status": False,
+        "sanction_letter": None,
+    }
+    _converters = {
+        "status": _status,
+        "customer_data": CustomerData.coerce,
+        "loan_details": LoanDetails.coerce,
+        "underwriting_result": UnderwritingResult.coerce,
+    }
+
+    def __getitem__(self, key: str) -> Any:
+        value = Record.__getitem__(self, key)
+        # Mapping readers get the plain status string
+        return value.value if key == "status" else value
@@ -0,0 +1,208 @@
+"""Single-pass entity extraction for sales-phase slot filling.
+
+All entity patterns are compiled into one alternation and matched with a
+single `finditer` scan over the original (case-preserved) message, so a
+message is read once no matter how many slots it may fill. Every match is
+returned as an `Entity` with its character span; deciding which entity
+fills which slot is left to the caller.
+"""
+import re
+from typing import List, NamedTuple, Optional, Union
+
+Number = Union[int, float]
+
+
+class Entity(NamedTuple):
+    kind: str  # phone | income | tenure | amount | number | employment | name | name_guess
+    value: Union[str, Number]
+    start: int
+    end: int
+
+
+# Multipliers for rupee amount suffixes ("5 lakhs", "2.5L", "50k", "1.2 cr").
+_AMOUNT_UNITS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lac": 100_000, "lacs": 100_000, "lakh": 100_000, "lakhs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+}
+
+# Months per tenure unit ("3 years", "36 months", "2 yrs").
+_TENURE_UNITS = {
+    "year": 12, "years": 12, "yr": 12, "yrs": 12,
+    "month": 1, "months": 1, "mo": 1, "mos": 1, "mth": 1, "mths": 1,
+}
+
+_EMPLOYMENT_ALIASES = {
+    "self employed": "self-employed",
+    "selfemployed": "self-employed",
+    "business owner": "business",
+    "businessman": "business",
+    "businesswoman": "business",
+    "government employee": "government",
+    "govt employee": "government",
+    "freelance": "freelancer",
+}
+
+# Words that are never part of a name: a cue-introduced or capitalised
+# name stops at the first of them, and a bare reply containing one is not
+# taken as a name. Besides function words this covers question words and
+# the common nouns customers capitalise when asking about a loan.
+_NON_NAME_WORDS = frozenset(
+    "hi hello hey dear good morning afternoon evening thanks thank you please yes no ok okay sure "
+    "i im i'm me my mine we a an the and or but for from with to of in on at by is am are was "
+    "name loan loans personal need want looking interested apply applying would like get "
+    "salaried self employed business businessman businesswoman owner government govt employee "
+    "freelancer freelance professional retired student unemployed working "
+    "tata capital rs inr rupees lakh lakhs lac lacs crore month months year years "
+    "what whats what's how when where why who which whom whose can could will shall should may might "
+    "must do does did have has had be been were it its it's this that these those there here "
+    "tell show explain know check help just also not any some all much many more about "
+    "interest rate rates emi amount tenure income salary credit score bureau card bank account "
+    "offer offers eligibility eligible document documents details process application status "
+    "approval sanction letter disbursal fee fees charges customer service sir madam "
+    "wedding marriage education medical travel holiday vacation home house car renovation "
+    "debt consolidation emergency urgent fine great nice cool perfect alright sounds awesome "
+    "today tomorrow now later soon again".split()
+)
+
+# Nothing but 1-3 words (with an optional full stop) and, for the leading
+# field of a comma-separated reply, the rest of the message.
+_BARE_NAME_RE = re.compile(r"\s*([A-Za-z][A-Za-z'.-]*(?:[ \t]+[A-Za-z][A-Za-z'.-]*){0,2})\s*(?:[.!]\s*|,(.*))?", re.S)
+
+_NUM = r"\d+(?:\.\d+)?"
+_GROUPED = r"\d{1,3}(?:,\d{2,3})+(?:\.\d+)?"
+_CURRENCY = r"(?:₹|(?i:rs)\.?|(?i:inr))\s*"
+_AMOUNT_UNIT = r"(?i:lakhs?|lacs?|l|k|thousand|crores?|cr)\b"
+_TENURE_UNIT = r"(?i:years?|yrs?|months?|mos?|mths?)\b"
+_PER_MONTH = r"(?i:\s*/\s*|\s*per\s+|\s+a\s+|\s*p\.?\s*)(?i:month|mo|m)\b"
+_NAME_WORDS = r"[A-Za-z][A-Za-z'.-]*(?:\s+[A-Za-z][A-Za-z'.-]*){0,3}"
+
+_ENTITY_RE = re.compile(
+    # Numeric entities can only start at a digit, "+" or a currency marker
+    # and word entities only at a word boundary; gating the alternatives on
+    # that keeps most positions to a single failed check.
+    r"(?=[\d+₹RrIi])(?:"
+    # 10-digit mobile number, optionally with a +91 / 91 prefix.
+    r"(?P<phone>(?<!\d)(?<!\d[,.])(?:\+?91[\s-]?)?(?P<phone_digits>\d{10}|\d{5}[\s-]\d{5})(?!\d|[,.]\d))"
+    # Any other number, read once with whatever marks it: a currency prefix,
+    # an amount or tenure unit, "/month". `extract` tells income ("80000/month"),
+    # tenure ("3 years"), rupee amounts ("5 lakhs", "Rs 5,00,000") and bare
+    # numbers apart from the groups that matched.
+    rf"|(?P<quantity>(?P<currency>{_CURRENCY})?(?P<num>{_GROUPED}|{_NUM})"
+    rf"(?:\s*(?:(?P<amount_unit>{_AMOUNT_UNIT})|(?P<tenure_unit>{_TENURE_UNIT})))?(?P<per_month>{_PER_MONTH})?))"
+    r"|\b(?=[A-Za-z])(?:"
+    r"(?P<employment>(?=[sSbBgGfFpPrRuU])(?i:(?:salaried|self[\s-]?employed|business\s+owner|business(?:man|woman)?"
+    r"|(?:government|govt)\s+employee|freelancer?|professional|retired|student|unemployed)\b))"
+    # "my name is ...", "I am ...": the name itself is only looked ahead at
+    # so that the same words can still match other entities.
+    rf"|(?P<name_cue>(?=[mMnNiItTcC])(?i:(?:my\s+name\s+is|name\s*[:-]|i\s+am|i'm|this\s+is|call\s+me))\s+)"
+    rf"(?=(?P<name_cue_value>{_NAME_WORDS}))"
+    # Capitalised word sequences ("Rajesh Kumar"), a weaker hint.
+    r"|(?P<name_caps>[A-Z][a-z]+(?:[ \t]+[A-Z][a-z]+){0,3}\b))"
+)
+
+
+def _to_number(text: str) -> Number:
+    value = float(text.replace(",", ""))
+    return int(value) if value.is_integer() else value
+
+
+def _sentence_start(text: str, index: int) -> bool:
+    """Whether `index` begins the message or a sentence, where any word is capitalised."""
+    index -= 1
+    while index >= 0 and text[index] in " \t":
+        index -= 1
+    return index < 0 or text[index] in ".!?\n"
+
+
+def _bare_name(text: str) -> Optional[str]:
+    """The words of a bare reply as a name, unless any of them is a common word."""
+    if any(word.strip(".'-").lower() in _NON_NAME_WORDS for word in text.split()):
+        return None
+    return _clean_name(text)
+
+
+def _clean_name(text: str) -> Optional[str]:
+    """Title-case the leading name words of `text`, stopping at a non-name word."""
+    words = []
+    for word in text.split():
+        clean = word.strip(".,!?;:'\"")
+        if not clean or clean.lower() in _NON_NAME_WORDS:
+            break
+        words.append(clean)
+    if not words or all(len(w) < 2 for w in words):
+        return None
+    return " ".join(w[:1].upper() + w[1:] for w in words)
+
+
+class EntityExtractor:
+    """Extracts phone, amount, tenure, income, employment and name entities.
+
+    A name is a `name` entity when it is introduced by a cue ("my name is
+    ...") or, with `expect_name`, when the reply is nothing but the name or
+    leads a comma-separated list of details. Capitalised words elsewhere
+    are only a `name_guess`; words that start a sentence are capitalised
+    anyway and are not taken.
+    """
+
+    def extract(self, text: str, expect_name: bool = False) -> List[Entity]:
+        """Return every entity found in `text`, in order, with spans.
+
+        `expect_name` is set by callers that have just asked for the name.
+        """
+        entities: List[Entity] = []
+        append = entities.append
+        name_spans = set()
+        named = False
+
+        for m in _ENTITY_RE.finditer(text):
+            kind = m.lastgroup
+            if kind == "phone":
+                digits = m.group("phone_digits").replace(" ", "").replace("-", "")
+                append(Entity("phone", digits, m.start(), m.end()))
+            elif kind == "quantity":
+                value = _to_number(m.group("num"))
+                amount_unit = m.group("amount_unit")
+                tenure_unit = m.group("tenure_unit")
+                if m.group("per_month") and not tenure_unit:
+                    if amount_unit:
+                        value = int(value * _AMOUNT_UNITS[amount_unit.lower()])
+                    append(Entity("income", value, m.start(), m.end()))
+                elif tenure_unit and not m.group("currency"):
+                    months = value * _TENURE_UNITS[tenure_unit.lower()]
+                    append(Entity("tenure", int(round(months)), m.start(), m.end()))
+                elif amount_unit:
+                    append(Entity("amount", int(value * _AMOUNT_UNITS[amount_unit.lower()]), m.start(), m.end()))
+                elif m.group("currency") or "," in m.group("num"):
+                    append(Entity("amount", value, m.start(), m.end()))
+                else:
+                    # A bare number; the caller decides which slot it belongs to.
+                    append(Entity("number", value, m.start(), m.end()))
+            elif kind == "employment":
+                word = " ".join(m.group().lower().replace("-", " ").split())
+                append(Entity("employment", _EMPLOYMENT_ALIASES.get(word, word), m.start(), m.end()))
+            elif kind == "name_cue_value":
+                # The look-ahead group closes last, so it names the match.
+                start = m.start("name_cue_value")
+                name = _clean_name(m.group("name_cue_value"))
+                if name:
+                    name_spans.add(start)
+                    named = True
+                    append(Entity("name", name, start, start + len(name)))
+            elif kind == "name_caps":
+                start = m.start()
+                if start in name_spans or _sentence_start(text, start):
+                    continue
+                name = _clean_name(m.group())
+                if name:
+                    append(Entity("name_guess", name, start, start + len(name)))
+
+        if expect_name and not named and "?" not in text:
+            bare = _BARE_NAME_RE.fullmatch(text)
+            # A leading field only counts when the rest holds other details
+            # ("Rajesh, 9876543210, 5 lakhs"), not for "Mumbai, please".
+            if bare and (bare.group(2) is None or any(e.kind not in ("name_guess", "number") for e in entities)):
+                name = _bare_name(bare.group(1))
+                if name:
+                    entities.insert(0, Entity("name", name, bare.start(1), bare.start(1) + len(name)))
+        return entities
@@ -0,0 +1,295 @@
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Curated loan FAQs: each entry lists a few phrasings of the same question
+# and the answer returned when one of them matches confidently.
+LOAN_FAQS = [
+    {
+        "intent": "documents",
+        "questions": [
+            "what documents do i need",
+            "which documents are required for a personal loan",
+            "documents required for loan application",
+            "what papers should i submit",
+        ],
+        "answer": "For a personal loan you need valid KYC documents (identity and address proof). "
+                  "If your requested amount exceeds your pre-approved limit, we will also ask for your latest salary slip.",
+    },
+    {
+        "intent": "eligibility",
+        "questions": [
+            "am i eligible for a loan",
+            "how is my loan eligibility decided",
+            "what is the eligibility criteria",
+            "who can apply for a personal loan",
+        ],
+        "answer": "Eligibility is based on your credit score (minimum 700), your monthly income and your pre-approved limit. "
+                  "Your EMI should not exceed 50% of your monthly income.",
+    },
+    {
+        "intent": "credit_score",
+        "questions": [
+            "what credit score do i need",
+            "minimum credit score for loan",
+            "does my cibil score matter",
+            "how is my credit score checked",
+        ],
+        "answer": "We need a minimum credit score of 700. Your score is fetched from the credit bureau using your registered mobile number.",
+    },
+    {
+        "intent": "loan_amount",
+        "questions": [
+            "what is the maximum loan amount",
+            "how much can i borrow",
+            "what is the minimum loan amount",
+            "loan amount limit",
+        ],
+        "answer": "You can borrow between ₹50,000 and ₹40,00,000. Amounts within your pre-approved limit are approved instantly, "
+                  "and up to twice that limit with a salary slip.",
+    },
+    {
+        "intent": "interest_rate",
+        "questions": [
+            "what is the interest rate",
+            "what interest rate will i get",
+            "how much interest do you charge",
+            "current personal loan rates",
+        ],
+        "answer": "Personal loan interest rates start from 10.99% per annum. "
+                  "Your final rate depends on your credit score, income and employment type.",
+    },
+    {
+        "intent": "tenure",
+        "questions": [
+            "what tenure options are available",
+            "how long can i take to repay",
+            "maximum loan tenure",
+            "repayment period options",
+        ],
+        "answer": "You can choose a repayment tenure between 6 and 60 months.",
+    },
+    {
+        "intent": "emi",
+        "questions": [
+            "how is the emi calculated",
+            "what will my emi be",
+            "how do you calculate monthly installment",
+        ],
+        "answer": "EMI is calculated on a reducing balance using your loan amount, interest rate and tenure. "
+                  "A longer tenure lowers the EMI but increases the total interest paid.",
+    },
+    {
+        "intent": "disbursal",
+        "questions": [
+            "how long does disbursement take",
+            "when will i get the money",
+            "how soon is the loan disbursed",
+            "how long does the loan approval take",
+        ],
+        "answer": "Once your loan is sanctioned, it is disbursed within 24-48 hours after documentation is complete.",
+    },
+    {
+        "intent": "prepayment",
+        "questions": [
+            "can i repay my loan early",
+            "can i prepay my loan",
+            "are there prepayment charges",
+            "can i foreclose my loan",
+            "part payment of loan",
+        ],
+        "answer": "Yes, you can prepay your loan. A prepayment charge of 2% of the outstanding principal applies within the first 12 months.",
+    },
+    {
+        "intent": "processing_fee",
+        "questions": [
+            "what is the processing fee",
+            "are there any processing charges",
+            "hidden charges on the loan",
+        ],
+        "answer": "The processing fee is 2% of the loan amount, capped at ₹20,000.",
+    },
+    {
+        "intent": "late_payment",
+        "questions": [
+            "what happens if i miss an emi",
+            "late payment charges",
+            "penalty for delayed emi",
+        ],
+        "answer": "A late payment charge of ₹500 per month applies to delayed EMI payments.",
+    },
+    {
+        "intent": "salary_slip",
+        "questions": [
+            "why do you need my salary slip",
+            "how do i upload salary slip",
+            "is salary slip mandatory",
+        ],
+        "answer": "A salary slip is only needed when your requested amount is above your pre-approved limit (up to twice that limit). "
+                  "You can upload it as a PDF, JPG or PNG file of up to 5MB.",
+    },
+    {
+        "intent": "contact",
+        "questions": [
+            "how can i contact customer care",
+            "customer service number",
+            "how do i talk to someone",
+        ],
+        "answer": "You can reach Tata Capital customer service at 1800-209-8808 or customer.service@tatacapital.com.",
+    },
+]
+
+_STOPWORDS = frozenset(
+    "a an the i me my we you your is are am do does can to of for in on and or it be will what how "
+    "there any this that with should".split()
+)
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    # Very light suffix stripping so "prepay"/"prepayment" and
+    # "document"/"documents" share a term.
+    for suffix in ("ment", "ing", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def _features(text: str) -> Counter:
+    """Unigram and bigram terms of `text`."""
+    words = [_stem(w) for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS]
+    terms = Counter(words)
+    terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+
+class FAQRetriever:
+    """TF-IDF retrieval over a curated loan FAQ set.
+
+    Every phrasing of every FAQ is indexed as its own document; a query is
+    answered with the FAQ of its most similar phrasing (cosine similarity)
+    together with that similarity as a confidence score.
+    """
+
+    def __init__(self, faqs: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.faqs = faqs if faqs is not None else LOAN_FAQS
+
+        documents = []  # (faq index, term counts)
+        for idx, faq in enumerate(self.faqs):
+            for question in faq["questions"]:
+                documents.append((idx, _features(question)))
+
+        doc_freq: Counter = Counter()
+        for _, terms in documents:
+            doc_freq.update(terms.keys())
+        total = len(documents)
+        self._idf = {term: math.log((1 + total) / (1 + df)) + 1.0 for term, df in doc_freq.items()}
+
+        # Inverted index: term -> [(document id, normalized weight)]
+        self._doc_faq: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, (faq_idx, terms) in enumerate(documents):
+            weights = {term: count * self._idf[term] for term, count in terms.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            self._doc_faq.append(faq_idx)
+            for term, weight in weights.items():
+                self._postings.setdefault(term, []).append((doc_id, weight / norm))
+
+    def match(self, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Return the best matching FAQ entry and its similarity (0-1)."""
+        terms = _features(text)
+        weights = {term: count * self._idf[term] for term, count in terms.items() if term in self._idf}
+        if not weights:
+            return None, 0.0
+
+        # Unknown terms still count towards the query norm so that long,
+        # mostly unrelated messages score low.
+        unknown = sum(count for term, count in terms.items() if term not in self._idf)
+        norm = math.sqrt(sum(w * w for w in weights.values()) + unknown) or 1.0
+
+        scores: Dict[int, float] = {}
+        for term, weight in weights.items():
+            for doc_id, doc_weight in self._postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * doc_weight
+
+        best_doc = max(scores, key=scores.get)
+        return self.faqs[self._doc_faq[best_doc]], scores[best_doc] / norm
+
+
+class TieredResponder:
+    """Answers confident FAQ matches directly and defers the rest to the model.
+
+    Wraps a `LoanChatModel` (or anything with the same `generate_response`
+    interface) and records request counts and latency for each tier.
+    """
+
+    def __init__(self, model, retriever: Optional[FAQRetriever] = None, threshold: Optional[float] = None) -> None:
+        self.model = model
+        self.retriever = retriever or FAQRetriever()
+        self.threshold = threshold if threshold is not None else float(os.getenv("HF_LOAN_FAQ_THRESHOLD", "0.55"))
+
+        self._lock = threading.Lock()
+        self._tiers = {
+            tier: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            for tier in ("faq", "model")
+        }
+        self._intents: Counter = Counter()
+
+    def generate_response(self, user_message: str, conversation_data: Dict[str, Any]) -> str:
+        start = time.perf_counter()
+        faq, score = self.retriever.match(user_message)
+        if faq is not None and score >= self.threshold:
+            self._record("faq", time.perf_counter() - start, faq["intent"])
+            return faq["answer"]
+
+        reply = self.model.generate_response(user_message, conversation_data)
+        self._record("model", time.perf_counter() - start)
+        return reply
+
+    def stream_response(self, user_message: str, conversation_data: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+        """Streaming variant of `generate_response` (see `LoanChatModel.stream_response`)."""
+        start = time.perf_counter()
+        faq, score = self.retriever.match(user_message)
+        if faq is not None and score >= self.threshold:
+            self._record("faq", time.perf_counter() - start, faq["intent"])
+            yield "done", faq["answer"]
+            return
+
+        stream = getattr(self.model, "stream_response", None)
+        if stream is None:
+            yield "done", self.model.generate_response(user_message, conversation_data)
+        else:
+            yield from stream(user_message, conversation_data)
+        self._record("model", time.perf_counter() - start)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.model.get_stats()
+        with self._lock:
+            total = sum(t["count"] for t in self._tiers.values())
+            stats["routing"] = {
+                "threshold": self.threshold,
+                "tiers": {
+                    tier: {
+                        "count": t["count"],
+                        "share": round(t["count"] / total, 4) if total else 0.0,
+                        "mean_ms": round(1000 * t["total_seconds"] / t["count"], 3) if t["count"] else 0.0,
+                        "max_ms": round(1000 * t["max_seconds"], 3),
+                    }
+                    for tier, t in self._tiers.items()
+                },
+                "faq_intents": dict(self._intents),
+            }
+        return stats
+
+    def _record(self, tier: str, elapsed: float, intent: Optional[str] = None) -> None:
+        with self._lock:
+            t = self._tiers[tier]
+            t["count"] += 1
+            t["total_seconds"] += elapsed
+            t["max_seconds"] = max(t["max_seconds"], elapsed)
+            if intent:
+                self._intents[intent] += 1
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Outcomes of `IdempotencyCache.begin`
+NEW = 'new'          # caller owns the key and must `finish` or `abandon` it
+REPLAY = 'replay'    # a stored response is returned
+BUSY = 'busy'        # an identical request is still running after `wait_seconds`
+
+
+class IdempotencyCache:
+    """Bounded replay cache for requests carrying an idempotency key.
+
+    The first request for a key runs; an identical request arriving while
+    it is in flight waits for it, and one arriving afterwards gets the
+    stored response instead of running again. Completed entries expire
+    after `ttl_seconds` and at most `max_entries` are kept (LRU).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_seconds: float = 3600.0,
+        wait_seconds: float = 30.0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+
+        # key -> (response, expires_at)
+        self._done: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # key -> event set once the owning request finishes or gives up
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.replayed = 0
+        self.collapsed = 0
+        self.busy = 0
+        self.evictions = 0
+
+    def begin(self, key: str) -> Tuple[str, Any]:
+        """Claim `key`: returns (NEW, None), (REPLAY, response) or (BUSY, None)."""
+        deadline = time.monotonic() + self.wait_seconds
+        waited = False
+        while True:
+            with self._lock:
+                entry = self._done.get(key)
+                if entry is not None:
+                    response, expires_at = entry
+                    if expires_at > time.monotonic():
+                        self._done.move_to_end(key)
+                        if waited:
+                            self.collapsed += 1
+                        else:
+                            self.replayed += 1
+                        return REPLAY, response
+                    del self._done[key]
+
+                event = self._in_flight.get(key)
+                if event is None:
+                    # Nobody holds the key (or its owner gave up): run it here.
+                    self._in_flight[key] = threading.Event()
+                    self.started += 1
+                    return NEW, None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not event.wait(remaining):
+                with self._lock:
+                    self.busy += 1
+                return BUSY, None
+            waited = True
+
+    def finish(self, key: str, response: Any) -> None:
+        """Store the response for `key` and release requests waiting on it."""
+        with self._lock:
+            if self.max_entries > 0:
+                self._done[key] = (response, time.monotonic() + self.ttl_seconds)
+                self._done.move_to_end(key)
+                while len(self._done) > self.max_entries:
+                    self._done.popitem(last=False)
+                    self.evictions += 1
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def abandon(self, key: str) -> None:
+        """Release `key` without a response; the next waiter runs it instead."""
+        with self._lock:
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._done),
+                'in_flight': len(self._in_flight),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'started': self.started,
+                'replayed': self.replayed,
+                'collapsed': self.collapsed,
+                'busy': self.busy,
+                'evictions': self.evictions,
+            }
+
+
+class SessionLocks:
+    """Serializes work on the same session with one lock per session.
+
+    Requests for one session never interleave (so two copies of a message
+    cannot both run underwriting), and requests for different sessions
+    never wait on each other: a slot-filling turn is not held up by
+    another session's underwriting. A session's lock exists only while a
+    request holds it or waits for it, so memory stays bounded by the
+    number of requests in flight, not sessions seen.
+    """
+
+    def __init__(self) -> None:
+        # session id -> [lock, holders and waiters]
+        self._locks: Dict[str, list] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, session_id: Optional[str]) -> Iterator[None]:
+        key = session_id or ''
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
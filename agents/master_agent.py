@@ -1,14 +1,111 @@
 import json
-import re
+import os
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from agents.admission import Overloaded
+from agents.conversation import to_plain
+from agents.entity_extractor import EntityExtractor
+from agents.metrics import PHASE_SECONDS, SESSION_TRANSITIONS, UNDERWRITING_DECISIONS
+from agents.pdf_renderer import RenderQueueFull
+from agents.tracing import span
+
+
+class SalesSlot(NamedTuple):
+    section: str  # key of the conversation data dict the slot lives in
+    key: str
+    kinds: tuple  # entity kinds that fill the slot from any message
+    loose_kinds: tuple  # bare values accepted only when the slot was asked for
+    accept: Optional[Callable[[Any], bool]]
+    convert: Callable[[Any], Any]
+    ask: Callable[[Any, Dict[str, Any]], Dict[str, Any]]  # (sales_agent, conversation_data) -> reply
+    retry: str  # re-prompt when the answer could not be read; formatted with customer_data
+    input_type: str
+    free_text: bool = False
+
+
+# Sales-phase slots in the order they are asked for.
+SALES_SLOTS = (
+    SalesSlot(
+        'customer_data', 'name', ('name',), ('name_guess',), None, str,
+        ask=lambda sales, conv: {
+            "message": "Great! I'd be happy to help you with a personal loan. What is your full name, please?",
+            "requires_input": True,
+            "input_type": "text"
+        },
+        retry="Great! I'd be happy to help you with a personal loan. What is your full name, please?",
+        input_type='text',
+    ),
+    SalesSlot(
+        'customer_data', 'phone', ('phone',), (), None, str,
+        ask=lambda sales, conv: {
+            "message": f"Thank you, {conv['customer_data']['name']}. Please provide your 10-digit mobile number for verification.",
+            "requires_input": True,
+            "input_type": "phone"
+        },
+        retry="Thank you, {name}. Please provide your 10-digit mobile number for verification.",
+        input_type='phone',
+    ),
+    SalesSlot(
+        'loan_details', 'amount', ('amount',), ('number',),
+        lambda amount: 10000 <= amount <= 4000000, int,  # Reasonable loan amount range
+        ask=lambda sales, conv: sales.get_loan_amount_inquiry(conv['customer_data']['name']),
+        retry="What loan amount are you looking for? (Please enter amount in rupees, e.g., 500000 for ₹5 lakhs)",
+        input_type='number',
+    ),
+    SalesSlot(
+        'loan_details', 'tenure', ('tenure',), ('number',),
+        lambda tenure: 6 <= tenure <= 60, int,  # 6 months to 5 years
+        ask=lambda sales, conv: sales.get_loan_tenure_inquiry(conv['loan_details']['amount']),
+        retry="What loan tenure would you prefer? (Please enter in months, e.g., 24 for 2 years)",
+        input_type='number',
+    ),
+    SalesSlot(
+        'customer_data', 'employment', ('employment',), (), None, str,
+        ask=lambda sales, conv: sales.get_employment_inquiry(),
+        retry="What's your employment situation? (Salaried/Self-employed/Business owner)",
+        input_type='text',
+        free_text=True,
+    ),
+    SalesSlot(
+        'customer_data', 'monthly_income', ('income',), ('amount', 'number'),
+        lambda income: 10000 <= income <= 1000000, int,  # Reasonable income range
+        ask=lambda sales, conv: sales.get_monthly_income_inquiry(),
+        retry="Please enter your monthly income in rupees (e.g., 50000)",
+        input_type='number',
+    ),
+)
+SALES_SLOTS_BY_KEY = {slot.key: slot for slot in SALES_SLOTS}
+
+# Entities that let an opening message go straight to slot filling; a
+# capitalised word (name_guess) or a bare number alone does not.
+OPENER_ENTITY_KINDS = frozenset(['phone', 'amount', 'tenure', 'income', 'employment', 'name'])
+
+# Phases that run without customer input once the conversation reaches them.
+AUTO_ADVANCE_PHASES = frozenset(['verification', 'underwriting', 'sanction'])
+
+# Phases run under an admission limit (see agents.admission); ML fallback
+# replies are admitted on the 'ml' path
+LIMITED_PHASES = frozenset(['underwriting', 'sanction'])
 
 
 class MasterAgent:
-    def __init__(self):
+    def __init__(self, auto_advance: Optional[bool] = None, admission: Optional[Any] = None):
         self.conversation_state = "greeting"
         self.customer_info = {}
         self.loan_requirements = {}
+        self.entity_extractor = EntityExtractor()
+        # Background sanction letter renders by session id
+        self.sanction_jobs = {}
+        self.sanction_wait = float(os.getenv('HF_LOAN_PDF_INLINE_WAIT', '2'))
+        if auto_advance is None:
+            auto_advance = os.getenv('HF_LOAN_AUTO_ADVANCE', '1') == '1'
+        self.auto_advance = auto_advance
+        # AdmissionController limiting the expensive phases, or None
+        self.admission = admission
         
     def process_message(
         self,
@@ -20,18 +117,114 @@ class MasterAgent:
         underwriting_agent,
         sanction_generator,
         ml_model: Optional[Any] = None,
+        stream: bool = False,
     ):
         """
         Main orchestrator that manages the conversation flow and coordinates worker agents
+
+        With an admission controller, the underwriting and sanction phases
+        and ML replies raise `agents.admission.Overloaded` when their limit
+        and queue are full. A turn shed before any phase has run leaves the
+        conversation as it was, so the same message can be retried. When a
+        phase reached by auto-advance is shed, the phases that already ran
+        have changed the conversation: their replies are returned with
+        `requires_input` False and a `retry_after` in seconds, after which
+        any message continues from the shed phase.
+
+        With `stream=True`, ML fallback replies are returned as a
+        `message_stream` of ("token", text) / ("done", reply) events
+        instead of a finished `message`.
+
+        When a reply needs no input and moves the conversation into a
+        phase that runs on its own (verification, underwriting, sanction),
+        that phase is run straight away within the same call. The combined
+        reply joins the phase messages (also listed in `messages`) and
+        carries a `phase_timings` breakdown.
         """
-        user_message = user_message.lower().strip()
-        
+        # Entities are extracted from the original text so that
+        # capitalisation is still available for name detection.
+        raw_message = user_message.strip()
+        user_message = raw_message.lower()
+        agents = (sales_agent, verification_agent, underwriting_agent, sanction_generator)
+
+        status = conversation_data['status']
+        response, elapsed = self._timed_dispatch(user_message, raw_message, conversation_data, agents, ml_model, stream)
+        if not self.auto_advance or response is None:
+            return response
+
+        timings = [{'phase': status, 'ms': round(1000 * elapsed, 3)}]
+        responses = [response]
+        while (
+            not response.get('requires_input', False)
+            and conversation_data['status'] != status
+            and conversation_data['status'] in AUTO_ADVANCE_PHASES
+        ):
+            status = conversation_data['status']
+            try:
+                response, elapsed = self._timed_dispatch('', '', conversation_data, agents, ml_model, stream)
+            except Overloaded as exc:
+                # Raising would hide the replies of the phases that already ran
+                responses.append(self._shed_reply(exc))
+                break
+            if response is None:
+                break
+            timings.append({'phase': status, 'ms': round(1000 * elapsed, 3)})
+            responses.append(response)
+
+        if len(responses) == 1:
+            return dict(response, phase_timings=timings)
+        messages = [r['message'] for r in responses]
+        combined = dict(responses[-1])
+        combined.update({
+            "message": "\n\n".join(messages),
+            "messages": messages,
+            "phase_timings": timings,
+        })
+        return combined
+    
+    def _timed_dispatch(self, user_message, raw_message, conversation_data, agents, ml_model=None, stream=False):
+        """`_dispatch`, recording its latency and any status change; returns (response, seconds)"""
+        status = conversation_data['status']
+        started = time.perf_counter()
+        with self._admit(status if status in LIMITED_PHASES else None), span(f'phase.{status}'):
+            response = self._dispatch(user_message, raw_message, conversation_data, agents, ml_model, stream)
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.labels(status).observe(elapsed)
+        if conversation_data['status'] != status:
+            SESSION_TRANSITIONS.labels(conversation_data['status']).inc()
+        return response, elapsed
+
+    def _shed_reply(self, error):
+        """Reply for an auto-advanced phase that admission control turned away"""
+        return {
+            "message": "⏳ We're handling a lot of applications right now. Your application will continue in a moment.",
+            "requires_input": False,
+            "retry_after": error.retry_after,
+        }
+
+    def _admit(self, path):
+        """Admission slot on `path` for the duration of the block (none without a controller)"""
+        if self.admission is None or path is None:
+            return nullcontext()
+        return self.admission.admit(path)
+
+    def _dispatch(self, user_message, raw_message, conversation_data, agents, ml_model=None, stream=False):
+        """Run the handler for the conversation's current status"""
+        sales_agent, verification_agent, underwriting_agent, sanction_generator = agents
+
         # Determine current state and next action
         if conversation_data['status'] == 'initial':
-            return self._handle_initial_contact(user_message, conversation_data)
+            response = self._handle_initial_contact(user_message, conversation_data)
+            if conversation_data['status'] == 'sales' and any(
+                entity.kind in OPENER_ENTITY_KINDS for entity in self.entity_extractor.extract(raw_message)
+            ):
+                # The opening message already carries application details
+                # (or says "my name is ...").
+                return self._handle_sales_phase(user_message, conversation_data, sales_agent, raw_message)
+            return response
         
         elif conversation_data['status'] == 'sales':
-            return self._handle_sales_phase(user_message, conversation_data, sales_agent)
+            return self._handle_sales_phase(user_message, conversation_data, sales_agent, raw_message)
         
         elif conversation_data['status'] == 'verification':
             return self._handle_verification_phase(user_message, conversation_data, verification_agent)
@@ -49,7 +242,16 @@ class MasterAgent:
             # Fallback: if an ML model is available, use it for a more
             # natural-language response instead of a fixed template.
             if ml_model is not None:
-                generated = ml_model.generate_response(user_message, conversation_data)
+                if stream and hasattr(ml_model, 'stream_response'):
+                    message_stream = ml_model.stream_response(user_message, conversation_data)
+                    if self.admission is not None:
+                        message_stream = self.admission.admit_stream('ml', message_stream)
+                    return {
+                        "message_stream": message_stream,
+                        "requires_input": True,
+                    }
+                with self._admit('ml'):
+                    generated = ml_model.generate_response(user_message, conversation_data)
                 return {
                     "message": generated,
                     "requires_input": True,
@@ -82,86 +284,75 @@ class MasterAgent:
                 "requires_input": True
             }
     
-    def _handle_sales_phase(self, user_message, conversation_data, sales_agent):
-        """Handle sales conversation and collect customer requirements"""
-        if not conversation_data['customer_data'].get('name'):
-            # Extract name from message
-            name = self._extract_name(user_message)
-            if name:
-                conversation_data['customer_data']['name'] = name
-                return sales_agent.get_loan_amount_inquiry(name)
-            else:
-                return {
-                    "message": "Great! I'd be happy to help you with a personal loan. What is your full name, please?",
-                    "requires_input": True,
-                    "input_type": "text"
-                }
-        
-        elif not conversation_data['customer_data'].get('phone'):
-            # Extract phone number
-            phone = self._extract_phone(user_message)
-            if phone:
-                conversation_data['customer_data']['phone'] = phone
-                return sales_agent.get_loan_purpose_inquiry(conversation_data['customer_data']['name'])
-            else:
-                return {
-                    "message": f"Thank you, {conversation_data['customer_data']['name']}. Please provide your 10-digit mobile number for verification.",
-                    "requires_input": True,
-                    "input_type": "phone"
-                }
-        
-        elif not conversation_data['loan_details'].get('amount'):
-            # Extract loan amount
-            amount = self._extract_loan_amount(user_message)
-            if amount:
-                conversation_data['loan_details']['amount'] = amount
-                return sales_agent.get_loan_tenure_inquiry(amount)
-            else:
-                return {
-                    "message": "What loan amount are you looking for? (Please enter amount in rupees, e.g., 500000 for ₹5 lakhs)",
-                    "requires_input": True,
-                    "input_type": "number"
-                }
-        
-        elif not conversation_data['loan_details'].get('tenure'):
-            # Extract tenure
-            tenure = self._extract_tenure(user_message)
-            if tenure:
-                conversation_data['loan_details']['tenure'] = tenure
-                return sales_agent.get_employment_inquiry()
-            else:
-                return {
-                    "message": "What loan tenure would you prefer? (Please enter in months, e.g., 24 for 2 years)",
-                    "requires_input": True,
-                    "input_type": "number"
-                }
-        
-        elif not conversation_data['customer_data'].get('employment'):
-            conversation_data['customer_data']['employment'] = user_message
-            return sales_agent.get_monthly_income_inquiry()
-        
-        elif not conversation_data['customer_data'].get('monthly_income'):
-            income = self._extract_income(user_message)
-            if income:
-                conversation_data['customer_data']['monthly_income'] = income
-                # Move to verification phase
-                conversation_data['status'] = 'verification'
-                return {
-                    "message": f"Perfect! Thank you for providing your details, {conversation_data['customer_data']['name']}. Now I'll verify your information and check your eligibility. This will take just a moment.",
-                    "requires_input": False
-                }
-            else:
-                return {
-                    "message": "Please enter your monthly income in rupees (e.g., 50000)",
-                    "requires_input": True,
-                    "input_type": "number"
-                }
-        
-        # Fallback response in case of unexpected state
-        return {
-            "message": "I'm here to help! Could you please provide the information I'm requesting?",
-            "requires_input": True
-        }
+    def _handle_sales_phase(self, user_message, conversation_data, sales_agent, raw_message=None):
+        """Handle sales conversation and collect customer requirements
+
+        Every slot in `SALES_SLOTS` that the message provides is filled in
+        one turn; the reply then asks for the first slot still missing.
+        """
+        asked = self._next_sales_slot(conversation_data)
+        entities = self.entity_extractor.extract(
+            raw_message or user_message, expect_name=asked is SALES_SLOTS_BY_KEY['name']
+        )
+        filled = self._fill_sales_slots(user_message, entities, conversation_data, asked)
+
+        slot = self._next_sales_slot(conversation_data)
+        if slot is None:
+            # Move to verification phase
+            conversation_data['status'] = 'verification'
+            return {
+                "message": f"Perfect! Thank you for providing your details, {conversation_data['customer_data']['name']}. Now I'll verify your information and check your eligibility. This will take just a moment.",
+                "requires_input": False
+            }
+
+        if not filled and slot is asked:
+            return {
+                "message": slot.retry.format(**conversation_data['customer_data']),
+                "requires_input": True,
+                "input_type": slot.input_type
+            }
+        return slot.ask(sales_agent, conversation_data)
+    
+    def _next_sales_slot(self, conversation_data):
+        """First slot in `SALES_SLOTS` that is still empty, or None"""
+        for slot in SALES_SLOTS:
+            if not conversation_data[slot.section].get(slot.key):
+                return slot
+        return None
+    
+    def _fill_sales_slots(self, user_message, entities, conversation_data, asked):
+        """Fill every empty slot the entities provide; return the filled keys"""
+        by_kind = {}
+        for entity in entities:
+            by_kind.setdefault(entity.kind, []).append(entity)
+
+        used = set()
+        filled = []
+        for slot in SALES_SLOTS:
+            section = conversation_data[slot.section]
+            if section.get(slot.key):
+                continue
+            entity = self._match_slot(slot, by_kind, loose=slot is asked, used=used)
+            if entity is not None:
+                used.add(entity)
+                section[slot.key] = slot.convert(entity.value)
+                filled.append(slot.key)
+
+        # A free-text slot takes the whole reply when it was the question
+        # and nothing in the message could be read as a slot value.
+        if asked is not None and asked.free_text and not filled and user_message:
+            conversation_data[asked.section][asked.key] = user_message
+            filled.append(asked.key)
+        return filled
+    
+    def _match_slot(self, slot, by_kind, loose=True, used=()):
+        """Best entity for `slot`: its own kinds first, bare values only if `loose`"""
+        kinds = slot.kinds + slot.loose_kinds if loose else slot.kinds
+        for kind in kinds:
+            for entity in by_kind.get(kind, ()):
+                if entity not in used and (slot.accept is None or slot.accept(entity.value)):
+                    return entity
+        return None
     
     def _handle_verification_phase(self, user_message, conversation_data, verification_agent):
         """Handle KYC verification"""
@@ -192,6 +383,7 @@ class MasterAgent:
             )
             
             conversation_data['underwriting_result'] = underwriting_result
+            UNDERWRITING_DECISIONS.labels('approved' if underwriting_result['approved'] else 'declined').inc()
             
             if underwriting_result['approved']:
                 conversation_data['underwriting_status'] = True
@@ -207,63 +399,126 @@ class MasterAgent:
                 }
     
     def _handle_sanction_phase(self, user_message, conversation_data, sanction_generator):
-        """Handle sanction letter generation"""
-        if not conversation_data.get('sanction_letter'):
-            # Generate sanction letter
-            sanction_letter_path = sanction_generator.generate_sanction_letter(
-                conversation_data['customer_data'],
-                conversation_data['loan_details'],
-                conversation_data['underwriting_result']
-            )
-            
-            conversation_data['sanction_letter'] = sanction_letter_path
-            conversation_data['status'] = 'completed'
-            # Package files and notify manager (local cloud simulation)
-            try:
-                from agents.cloud_storage import CloudStorage
-                from agents.manager_notify import ManagerNotifier
-
-                storage = CloudStorage()
-                notifier = ManagerNotifier(storage)
-
-                # Gather files to include in package
-                files = {}
-                # include sanction letter
-                files['sanction_letter'] = sanction_letter_path
-                # include any uploaded files recorded in conversation
-                for idx, up in enumerate(conversation_data.get('uploaded_files', [])):
-                    files[f'uploaded_{idx}'] = up
-
-                package_meta = {
-                    'customer': conversation_data.get('customer_data', {}),
-                    'loan_details': conversation_data.get('loan_details', {}),
-                    'underwriting_result': conversation_data.get('underwriting_result', {})
-                }
+        """Handle sanction letter generation
 
-                pkg_path = storage.create_package(
-                    session_id=conversation_data.get('session_id', 'unknown'),
-                    files=files,
-                    package_meta=package_meta
-                )
+        The letter is rendered in the background (see PdfRenderPool). The
+        request waits up to `sanction_wait` seconds for it; after that the
+        phase reports that the letter is still being generated until the
+        file is ready.
+        """
+        if conversation_data.get('sanction_letter'):
+            return None
 
-                # Notify manager / head for further processing
-                notify_payload = notifier.send_to_manager(
-                    session_id=conversation_data.get('session_id', 'unknown'),
-                    package_path=pkg_path,
-                    metadata=package_meta
+        key = conversation_data.get('session_id') or str(id(conversation_data))
+        job = self.sanction_jobs.get(key)
+        if job is None:
+            self._prune_sanction_jobs()
+            try:
+                job = sanction_generator.submit_sanction_letter(
+                    conversation_data['customer_data'],
+                    conversation_data['loan_details'],
+                    conversation_data['underwriting_result']
                 )
+            except RenderQueueFull:
+                return {
+                    "message": "⏳ We're generating a lot of sanction letters right now. Yours will be ready in a moment.",
+                    "requires_input": False
+                }
+            self.sanction_jobs[key] = job
+            conversation_data['sanction_letter_status'] = 'generating'
 
-                conversation_data['package_path'] = pkg_path
-                conversation_data['manager_notification'] = notify_payload
+        sanction_letter_path = None
+        try:
+            with span('sanction.wait_render'):
+                job.future.result(timeout=max(0.0, min(self.sanction_wait, job.deadline - time.monotonic())))
+        except FutureTimeoutError:
+            if time.monotonic() < job.deadline:
+                return {
+                    "message": "⏳ Your sanction letter is being generated. It will be ready in a moment.",
+                    "requires_input": False
+                }
+        except Exception:
+            pass
+        else:
+            # The letter was rendered in memory; write it to storage once.
+            try:
+                sanction_letter_path = sanction_generator.save_document(
+                    job, metadata={'kind': 'sanction_letter', 'session_id': conversation_data.get('session_id')}
+                )
             except Exception:
-                # If packaging or notification fails, continue without blocking user
                 pass
 
+        self.sanction_jobs.pop(key, None)
+        if sanction_letter_path is None:
+            conversation_data['sanction_letter_status'] = 'failed'
             return {
-                "message": f"✅ Your sanction letter has been generated successfully! You can download it using the link below. Your loan will be disbursed within 24-48 hours after document verification. The application has been forwarded for final processing.",
-                "requires_input": False
+                "message": "❌ We couldn't generate your sanction letter just now. Send any message to try again, or contact our customer service at 1800-209-8808.",
+                "requires_input": True
             }
-    
+
+        conversation_data['sanction_letter'] = sanction_letter_path
+        conversation_data['sanction_letter_status'] = 'ready'
+        conversation_data['status'] = 'completed'
+
+        # Package files and notify manager (local cloud simulation)
+        try:
+            from agents.cloud_storage import CloudStorage
+            from agents.manager_notify import ManagerNotifier
+
+            storage = getattr(sanction_generator, 'storage', None) or CloudStorage()
+            notifier = ManagerNotifier(storage)
+
+            # Gather files to include in package
+            files = {}
+            # include sanction letter
+            files['sanction_letter'] = sanction_letter_path
+            # include any uploaded files recorded in conversation
+            for idx, up in enumerate(conversation_data.get('uploaded_files', [])):
+                files[f'uploaded_{idx}'] = up
+
+            package_meta = {
+                'customer': to_plain(conversation_data.get('customer_data', {})),
+                'loan_details': to_plain(conversation_data.get('loan_details', {})),
+                'underwriting_result': to_plain(conversation_data.get('underwriting_result', {}))
+            }
+
+            pkg_path = storage.create_package(
+                session_id=conversation_data.get('session_id', 'unknown'),
+                files=files,
+                package_meta=package_meta
+            )
+
+            # Notify manager / head for further processing
+            notify_payload = notifier.send_to_manager(
+                session_id=conversation_data.get('session_id', 'unknown'),
+                package_path=pkg_path,
+                metadata=package_meta
+            )
+
+            conversation_data['package_path'] = pkg_path
+            conversation_data['manager_notification'] = notify_payload
+        except Exception:
+            # If packaging or notification fails, continue without blocking user
+            pass
+
+        return {
+            "message": f"✅ Your sanction letter has been generated successfully! You can download it using the link below. Your loan will be disbursed within 24-48 hours after document verification. The application has been forwarded for final processing.",
+            "requires_input": False
+        }
+
+    def _prune_sanction_jobs(self):
+        """Drop renders past their deadline that no session came back for
+
+        The jobs (and the rendered PDF bytes their futures hold) would
+        otherwise stay for as long as the process runs; a session that does
+        come back later simply has its letter rendered again.
+        """
+        now = time.monotonic()
+        for key, job in list(self.sanction_jobs.items()):
+            if job.deadline < now:
+                job.future.cancel()
+                self.sanction_jobs.pop(key, None)
+
     def _handle_completion(self, user_message, conversation_data):
         """Handle post-completion interactions"""
         if 'thank' in user_message or 'thanks' in user_message:
@@ -277,54 +532,32 @@ class MasterAgent:
                 "requires_input": True
             }
     
-    def _extract_name(self, text):
+    def _extract_slot(self, key, text, entities=None):
+        if entities is None:
+            entities = self.entity_extractor.extract(text)
+        by_kind = {}
+        for entity in entities:
+            by_kind.setdefault(entity.kind, []).append(entity)
+        slot = SALES_SLOTS_BY_KEY[key]
+        entity = self._match_slot(slot, by_kind)
+        return slot.convert(entity.value) if entity else None
+
+    def _extract_name(self, text, entities=None):
         """Extract name from user input"""
-        # Simple name extraction - look for capitalized words
-        words = text.split()
-        name_words = []
-        for word in words:
-            # Remove punctuation and check if word starts with uppercase
-            clean_word = word.strip('.,!?;:\'"')
-            if clean_word and clean_word[0].isupper() and len(clean_word) > 1:
-                name_words.append(clean_word)
-        
-        if name_words:
-            return ' '.join(name_words)
-        return None
+        return self._extract_slot('name', text, entities)
     
-    def _extract_phone(self, text):
+    def _extract_phone(self, text, entities=None):
         """Extract phone number from user input"""
-        # Extract 10-digit phone number
-        phone_match = re.search(r'\b\d{10}\b', text)
-        if phone_match:
-            return phone_match.group()
-        return None
+        return self._extract_slot('phone', text, entities)
     
-    def _extract_loan_amount(self, text):
+    def _extract_loan_amount(self, text, entities=None):
         """Extract loan amount from user input"""
-        # Extract numbers that could be loan amounts
-        numbers = re.findall(r'\d+', text)
-        for num in numbers:
-            amount = int(num)
-            if 10000 <= amount <= 4000000:  # Reasonable loan amount range
-                return amount
-        return None
+        return self._extract_slot('amount', text, entities)
     
-    def _extract_tenure(self, text):
-        """Extract loan tenure from user input"""
-        numbers = re.findall(r'\d+', text)
-        for num in numbers:
-            tenure = int(num)
-            if 6 <= tenure <= 60:  # 6 months to 5 years
-                return tenure
-        return None
+    def _extract_tenure(self, text, entities=None):
+        """Extract loan tenure (in months) from user input"""
+        return self._extract_slot('tenure', text, entities)
     
-    def _extract_income(self, text):
+    def _extract_income(self, text, entities=None):
         """Extract monthly income from user input"""
-        numbers = re.findall(r'\d+', text)
-        for num in numbers:
-            income = int(num)
-            if 10000 <= income <= 1000000:  # Reasonable income range
-                return income
-        return None
-
+        return self._extract_slot('monthly_income', text, entities)
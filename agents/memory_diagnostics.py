@@ -0,0 +1,275 @@
+"""Memory accounting and growth diagnostics for a running worker.
+
+`MemoryDiagnostics.report` attributes resident memory to the structures
+that grow with traffic (conversations, the verification status cache,
+pending sanction renders) by walking them with `deep_sizeof`, and adds
+the ML model's weight and response cache sizes and the process's RSS,
+PSS and unique memory.
+
+For leaks that do not show up there, `tracemalloc` can be started on
+demand (or at startup with `HF_LOAN_TRACEMALLOC`), snapshots taken while
+the worker keeps serving, and two snapshots compared to see which source
+lines allocated the memory that stayed. tracemalloc slows allocation
+noticeably while it runs, so it is off until asked for.
+"""
+import gc
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+# Allocations made by the diagnostics themselves
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Bytes held by `obj` and everything reachable through containers.
+
+    Follows dicts, lists, tuples, sets, `__slots__` and instance
+    `__dict__`s; objects reached twice are counted once. Interned strings
+    and small ints are counted too (None, booleans, classes and enum
+    members are not), so this slightly overstates what freeing `obj`
+    returns.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or item is None or isinstance(item, (bool, type, Enum)):
+            continue  # shared singletons
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            # list() copies the items without releasing the GIL, so a
+            # concurrent request cannot resize the dict under us
+            for key, value in list(item.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(list(item))
+        elif not isinstance(item, type):
+            for name in _slot_names(type(item)):
+                value = getattr(item, name, _UNSET)
+                if value is not _UNSET:
+                    stack.append(value)
+            if hasattr(item, "__dict__"):
+                stack.append(item.__dict__)
+    return total
+
+
+_UNSET = object()
+_SLOT_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    names = _SLOT_NAMES.get(cls)
+    if names is None:
+        names = []
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get("__slots__", ())
+            names.extend((slots,) if isinstance(slots, str) else slots)
+        names = _SLOT_NAMES[cls] = tuple(name for name in names if name not in ("__dict__", "__weakref__"))
+    return names
+
+
+# /proc/<pid>/smaps_rollup fields reported by `process_memory`
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """Resident memory of `pid` (default: this process) in bytes.
+
+    On Linux this includes the proportional set size (`pss_bytes`, shared
+    pages divided among the processes mapping them) and the memory unique
+    to the process (`uss_bytes`), which is what each forked worker really
+    adds. Elsewhere only the current process's peak RSS is known.
+    """
+    stats: Dict[str, int] = {"pid": pid or os.getpid()}
+    if pid is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stats["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    try:
+        with open(f"/proc/{stats['pid']}/smaps_rollup") as fh:
+            for line in fh:
+                name, _, value = line.partition(":")
+                if name in _SMAPS_FIELDS:
+                    stats[_SMAPS_FIELDS[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        return stats
+    stats["uss_bytes"] = stats.get("private_clean_bytes", 0) + stats.get("private_dirty_bytes", 0)
+    return stats
+
+
+def model_memory(model: Any) -> Dict[str, Any]:
+    """`memory_stats` of the model behind any responder/batcher wrappers."""
+    seen = set()
+    while model is not None and id(model) not in seen:
+        seen.add(id(model))
+        if hasattr(model, "memory_stats"):
+            return model.memory_stats()
+        model = getattr(model, "model", None)
+    return {"available": False, "local": False}
+
+
+class Snapshot(NamedTuple):
+    id: int
+    label: Optional[str]
+    taken_at: str
+    snapshot: tracemalloc.Snapshot
+    traced_bytes: int
+
+    def summary(self) -> Dict[str, Any]:
+        return {"id": self.id, "label": self.label, "taken_at": self.taken_at, "traced_bytes": self.traced_bytes}
+
+
+class MemoryDiagnostics:
+    """Sizes of the app's long-lived structures plus on-demand tracemalloc.
+
+    `structures` maps a name to a callable returning the current object
+    (so rebinding does not go stale). At most `max_snapshots` snapshots are
+    kept; the oldest is dropped first.
+    """
+
+    def __init__(
+        self,
+        structures: Dict[str, Callable[[], Any]],
+        model: Any = None,
+        max_snapshots: int = 8,
+    ) -> None:
+        self.structures = structures
+        self.model = model
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, Snapshot]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def report(self) -> Dict[str, Any]:
+        structures = {}
+        for name, get in self.structures.items():
+            obj = get()
+            size = deep_sizeof(obj)
+            entry = {"bytes": size}
+            if hasattr(obj, "__len__"):
+                entry["entries"] = len(obj)
+                entry["bytes_per_entry"] = round(size / len(obj)) if len(obj) else 0
+            structures[name] = entry
+        return {
+            "process": process_memory(),
+            "structures": structures,
+            "model": model_memory(self.model),
+            "gc": {"objects": len(gc.get_objects()), "counts": gc.get_count()},
+            "tracemalloc": self.tracing_stats(),
+        }
+
+    def tracing_stats(self) -> Dict[str, Any]:
+        stats = {"tracing": tracemalloc.is_tracing(), "snapshots": self.list_snapshots()}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stats.update({
+                "frames": tracemalloc.get_traceback_limit(),
+                "traced_bytes": current,
+                "traced_peak_bytes": peak,
+                "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            })
+        return stats
+
+    def start_tracing(self, frames: int = 1) -> None:
+        if tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is already running")
+        tracemalloc.start(max(1, frames))
+
+    def stop_tracing(self) -> None:
+        """Stop tracemalloc and drop its snapshots (they are tied to the session)."""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+
+    def take_snapshot(self, label: Optional[str] = None) -> Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        traced_bytes = sum(stat.size for stat in snapshot.statistics("filename"))
+        with self._lock:
+            record = Snapshot(
+                self._next_id, label, datetime.now().isoformat(timespec="seconds"), snapshot, traced_bytes
+            )
+            self._next_id += 1
+            self._snapshots[record.id] = record
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return record
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record.summary() for record in self._snapshots.values()]
+
+    def get_snapshot(self, snapshot_id: int) -> Optional[Snapshot]:
+        with self._lock:
+            return self._snapshots.get(snapshot_id)
+
+    def top(self, snapshot_id: int, key_type: str = "lineno", limit: int = 20) -> Dict[str, Any]:
+        """Largest allocation sites in one snapshot."""
+        record = self._require(snapshot_id)
+        stats = record.snapshot.statistics(self._key_type(key_type))
+        return dict(record.summary(), top=[
+            {"location": self._location(stat.traceback, key_type), "bytes": stat.size, "count": stat.count}
+            for stat in stats[:limit]
+        ])
+
+    def compare(self, first_id: int, second_id: int, key_type: str = "lineno", limit: int = 20) -> Dict[str, Any]:
+        """Allocation sites that grew (or shrank) most from `first_id` to `second_id`."""
+        first, second = self._require(first_id), self._require(second_id)
+        diffs = second.snapshot.compare_to(first.snapshot, self._key_type(key_type))
+        return {
+            "from": first.summary(),
+            "to": second.summary(),
+            "traced_bytes_diff": second.traced_bytes - first.traced_bytes,
+            "top": [
+                {
+                    "location": self._location(diff.traceback, key_type),
+                    "bytes": diff.size,
+                    "bytes_diff": diff.size_diff,
+                    "count": diff.count,
+                    "count_diff": diff.count_diff,
+                }
+                for diff in diffs[:limit]
+            ],
+        }
+
+    def _require(self, snapshot_id: int) -> Snapshot:
+        record = self.get_snapshot(snapshot_id)
+        if record is None:
+            raise KeyError(snapshot_id)
+        return record
+
+    @staticmethod
+    def _key_type(key_type: str) -> str:
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key must be one of {', '.join(KEY_TYPES)}")
+        return key_type
+
+    @staticmethod
+    def _location(traceback: tracemalloc.Traceback, key_type: str) -> List[str]:
+        if key_type == "filename":
+            return [frame.filename for frame in traceback]
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
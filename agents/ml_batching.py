@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.prefork import after_fork_in_child
+
+
+class BatchingScheduler:
+    """Dynamic micro-batching front end for `LoanChatModel`.
+
+    Concurrent `generate_response` calls are queued and gathered for up to
+    `max_wait_ms` milliseconds (or until `max_batch_size` prompts are
+    waiting), then run through the model as one batched generate. Each
+    caller blocks until its own reply is ready, so the scheduler can be
+    passed anywhere a `LoanChatModel` is expected.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ) -> None:
+        self.model = model
+        self.max_batch_size = max_batch_size or int(os.getenv("HF_LOAN_BATCH_MAX_SIZE", "8"))
+        self.max_wait_ms = (
+            max_wait_ms if max_wait_ms is not None
+            else float(os.getenv("HF_LOAN_BATCH_WAIT_MS", "10"))
+        )
+
+        self._queue: "queue.Queue[Optional[Tuple[str, Dict[str, Any], Future]]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+        self._closed = False
+        self._start_worker()
+        after_fork_in_child(self._after_fork)
+
+    def generate_response(
+        self,
+        user_message: str,
+        conversation_data: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Queue the message for the next batch and wait for its reply."""
+        # Cached replies do not need to wait for a batch window.
+        cached = self.model.lookup_cached(user_message, conversation_data)
+        if cached is not None:
+            return cached
+
+        if self._closed:
+            raise RuntimeError("BatchingScheduler is closed")
+
+        future: Future = Future()
+        self._queue.put((user_message, conversation_data, future))
+        return future.result(timeout=timeout)
+
+    def stream_response(self, user_message: str, conversation_data: Dict[str, Any]):
+        """Streamed replies bypass batching and go straight to the model."""
+        return self.model.stream_response(user_message, conversation_data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.model.get_stats()
+        with self._stats_lock:
+            stats["batching"] = {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "requests": self.requests,
+                "batches": self.batches,
+                "largest_batch": self.largest_batch,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "queue_depth": self._queue.qsize(),
+            }
+        return stats
+
+    def close(self) -> None:
+        """Stop the worker thread once the queued requests are served."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._worker.join()
+
+    def _start_worker(self) -> None:
+        self._worker = threading.Thread(target=self._run, name="ml-batcher", daemon=True)
+        self._worker.start()
+
+    def _after_fork(self) -> None:
+        # Only the forking thread survives a fork: give the child its own
+        # queue and batcher thread (the model itself stays shared).
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        if not self._closed:
+            self._start_worker()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._drain()
+                return
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+            if stop:
+                self._drain()
+                return
+
+    def _drain(self) -> None:
+        # Fail anything that raced in behind the shutdown marker.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[2].set_exception(RuntimeError("BatchingScheduler is closed"))
+
+    def _dispatch(self, batch: List[Tuple[str, Dict[str, Any], Future]]) -> None:
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+        try:
+            replies = self.model.generate_responses(
+                [(message, conversation) for message, conversation, _ in batch],
+                check_cache=False,
+            )
+        except Exception as exc:
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+
+        for (_, _, future), reply in zip(batch, replies):
+            future.set_result(reply)
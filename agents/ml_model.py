@@ -1,13 +1,49 @@
 import os
-from typing import Any, Dict, Optional
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-try:
-    # Heavy dependencies are imported lazily so that the main app
-    # can still start even if transformers/torch are not installed
-    # or correctly configured.
-    from transformers import pipeline  # type: ignore
-except Exception as e:  # pragma: no cover - defensive import
-    pipeline = None  # type: ignore
+from .ml_streaming import StreamingPostprocessor, stop_on_event
+from .response_cache import ResponseCache
+
+
+def _import_pipeline():
+    try:
+        # Heavy dependencies are imported lazily so that the main app
+        # can still start even if transformers/torch are not installed
+        # or correctly configured, and so that processes which only talk
+        # to a model service never load torch at all.
+        from transformers import pipeline  # type: ignore
+    except Exception:  # pragma: no cover - defensive import
+        return None
+    return pipeline
+
+
+UNAVAILABLE_REPLY = (
+    "I'm currently unable to use the ML model, but I can still guide you "
+    "through the loan process. Please tell me what help you need with your loan."
+)
+
+ERROR_REPLY = (
+    "I'm having trouble generating a smart response right now, "
+    "but I can still help you with loan eligibility, documents and application steps. "
+    "Please tell me what you would like to know."
+)
+
+EMPTY_REPLY = (
+    "I'm here to help you with personal loans, eligibility and required documents. "
+    "Could you please rephrase your question?"
+)
+
+OFF_TOPIC_REPLY = (
+    "I'm currently unable to provide a detailed ML-generated reply. "
+    "I can still guide you through the loan process and required documents."
+)
+
+# Phrases that indicate the model claims personal attributes or drifted off-topic
+OFF_TOPIC_MARKERS = ('i am in my', 'i have a degree', 'my first experience', 'we were young', 'paypal')
 
 
 class LoanChatModel:
@@ -17,12 +53,29 @@ class LoanChatModel:
 
     By default this uses a small, publicly-available model so it can
     run locally without any external API keys.
+
+    Generated replies are kept in a bounded LRU cache keyed on the
+    normalized prompt (with the customer name templated out), so that
+    recurring questions do not pay for model inference again.
+
+    With `cpu_optimize` enabled (or HF_LOAN_CPU_OPTIMIZE=1) the linear
+    layers are dynamically quantized to int8 and the generation length
+    is capped according to the size of the question.
     """
 
+    # Stands in for the customer name inside cache keys and cached replies
+    NAME_PLACEHOLDER = "{customer_name}"
+    # Used in the prompt until the customer has given a name
+    DEFAULT_NAME = "Customer"
+
     def __init__(
         self,
         model_name: Optional[str] = None,
         max_new_tokens: int = 128,
+        cache: Optional[ResponseCache] = None,
+        cpu_optimize: Optional[bool] = None,
+        num_threads: Optional[int] = None,
+        interop_threads: Optional[int] = None,
     ) -> None:
         # Allow overriding the model via environment variable.
         # Use a relatively small model by default to reduce download
@@ -33,12 +86,33 @@ class LoanChatModel:
         )
         self.max_new_tokens = max_new_tokens
 
+        # Response cache; sizing can be tuned through the environment and
+        # HF_LOAN_CACHE_ENTRIES=0 disables caching altogether.
+        self.cache = cache if cache is not None else ResponseCache(
+            max_entries=int(os.getenv("HF_LOAN_CACHE_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("HF_LOAN_CACHE_BYTES", str(1024 * 1024))),
+            ttl_seconds=float(os.getenv("HF_LOAN_CACHE_TTL", "3600")),
+        )
+
+        if cpu_optimize is None:
+            cpu_optimize = os.getenv("HF_LOAN_CPU_OPTIMIZE", "0") == "1"
+        self.cpu_optimize = cpu_optimize
+        self.quantized = False
+        self.num_threads = num_threads or int(os.getenv("HF_LOAN_TORCH_THREADS", "0")) or None
+        self.interop_threads = interop_threads or int(os.getenv("HF_LOAN_TORCH_INTEROP_THREADS", "0")) or None
+
+        # Recent time-to-first-token samples (seconds) for streamed replies
+        self._ttft = deque(maxlen=1000)
+        self.streams = 0
+
         self._generator = None
 
         # Initialize a text-generation pipeline if the transformers
         # library is available and working. If anything goes wrong,
         # we fall back gracefully so that the main app still runs.
+        pipeline = _import_pipeline()
         if pipeline is not None:
+            self._configure_threads()
             try:
                 # Choose pipeline task based on model type (seq2seq instruction models vs. causal LM)
                 model_lower = (self.model_name or '').lower()
@@ -54,6 +128,8 @@ class LoanChatModel:
                     model=self.model_name,
                     device="cpu",
                 )
+                if self.cpu_optimize:
+                    self._quantize()
             except Exception as e:  # pragma: no cover - runtime protection
                 # In a real app we might want to log this to a file;
                 # for now we just disable ML responses.
@@ -72,9 +148,226 @@ class LoanChatModel:
         continues to handle the strict loan process; this model is
         primarily for more natural, free-form replies and fallbacks.
         """
+        return self.generate_responses([(user_message, conversation_data)])[0]
+
+    def generate_responses(
+        self,
+        requests: List[Tuple[str, Dict[str, Any]]],
+        check_cache: bool = True,
+    ) -> List[str]:
+        """
+        Generate replies for several (user_message, conversation_data) pairs.
+
+        Cache hits are answered directly; the remaining prompts are run
+        through the pipeline as a single batch. Callers that have already
+        consulted `lookup_cached` can pass `check_cache=False`.
+        """
+        # If the generator is not available (e.g. transformers/torch
+        # not installed correctly), fall back to a safe, static reply
+        # so that the app never crashes.
+        if self._generator is None:
+            return [UNAVAILABLE_REPLY for _ in requests]
+
+        results: List[Optional[str]] = [None] * len(requests)
+        pending = []
+        for idx, (user_message, conversation_data) in enumerate(requests):
+            status = conversation_data.get("status", "initial")
+            customer_name = self._customer_name(conversation_data)
+
+            cache_key = self._cache_key(status, customer_name, user_message)
+            cached = self.cache.get(cache_key) if check_cache else None
+            if cached is not None:
+                results[idx] = self._fill_name(cached, customer_name)
+                continue
+
+            prompt = self._build_prompt(status, customer_name, user_message)
+            pending.append((idx, prompt, cache_key, customer_name))
+
+        if pending:
+            max_new_tokens = self._max_new_tokens_for(
+                [requests[idx][0] for idx, _, _, _ in pending]
+            )
+            texts = self._run_generator([prompt for _, prompt, _, _ in pending], max_new_tokens)
+            for (idx, _, cache_key, customer_name), raw in zip(pending, texts):
+                if raw is None:
+                    # Absolute last-resort fallback: never let an ML error crash the app.
+                    results[idx] = ERROR_REPLY
+                    continue
+
+                response_text = self._postprocess(raw)
+
+                # Generation is deterministic, so the reply can be shared between
+                # customers once their name has been templated out.
+                self.cache.put(cache_key, self._template_name(response_text, customer_name))
+
+                results[idx] = response_text
+
+        return results  # type: ignore[return-value]
+
+    def stream_response(
+        self,
+        user_message: str,
+        conversation_data: Dict[str, Any],
+    ) -> Iterator[Tuple[str, str]]:
+        """
+        Stream a reply as it is generated.
+
+        Yields ("token", text) events with the text that is safe to show so
+        far, then a single ("done", reply) event carrying the final reply
+        (identical to what `generate_response` would return).
+        """
+        if self._generator is None:
+            yield "done", UNAVAILABLE_REPLY
+            return
+
         status = conversation_data.get("status", "initial")
-        customer_name = conversation_data.get("customer_data", {}).get("name", "Customer")
+        customer_name = self._customer_name(conversation_data)
+        cache_key = self._cache_key(status, customer_name, user_message)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            yield "done", self._fill_name(cached, customer_name)
+            return
+
+        started = time.perf_counter()
+        stop = threading.Event()
+        try:
+            from transformers import TextIteratorStreamer  # type: ignore
+
+            tokenizer = self._generator.tokenizer
+            streamer = TextIteratorStreamer(
+                tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=30.0
+            )
+            encoded = tokenizer(
+                self._build_prompt(status, customer_name, user_message), return_tensors="pt"
+            )
+            gen_kwargs = self._generation_kwargs(self._max_new_tokens_for([user_message]))
+            gen_kwargs.pop("num_return_sequences", None)
+            gen_kwargs.update(
+                input_ids=encoded["input_ids"],
+                attention_mask=encoded.get("attention_mask"),
+                streamer=streamer,
+                stopping_criteria=stop_on_event(stop),
+            )
+        except Exception:
+            yield "done", ERROR_REPLY
+            return
+
+        failed = []
+
+        def run_generation():
+            try:
+                self._generator.model.generate(**gen_kwargs)
+            except Exception as exc:
+                failed.append(exc)
+                # Unblock the consumer instead of waiting for the timeout.
+                streamer.end()
 
+        threading.Thread(target=run_generation, name="ml-stream", daemon=True).start()
+
+        postprocessor = StreamingPostprocessor(OFF_TOPIC_MARKERS)
+        first_token = True
+        try:
+            for chunk in streamer:
+                text = postprocessor.feed(chunk)
+                if text:
+                    if first_token:
+                        self._ttft.append(time.perf_counter() - started)
+                        first_token = False
+                    yield "token", text
+                if postprocessor.finished:
+                    # Enough text (or an off-topic reply); stop generating.
+                    stop.set()
+                    break
+            else:
+                tail = postprocessor.flush()
+                if tail:
+                    yield "token", tail
+        except Exception:
+            yield "done", ERROR_REPLY
+            return
+        finally:
+            # Also reached when the client disconnects mid-stream.
+            stop.set()
+            self.streams += 1
+
+        if failed:
+            yield "done", ERROR_REPLY
+            return
+
+        response_text = self._postprocess(postprocessor.raw)
+        self.cache.put(cache_key, self._template_name(response_text, customer_name))
+
+        yield "done", response_text
+
+    def lookup_cached(self, user_message: str, conversation_data: Dict[str, Any]) -> Optional[str]:
+        """Return a cached reply for the message without running the model."""
+        if self._generator is None:
+            return None
+        status = conversation_data.get("status", "initial")
+        customer_name = self._customer_name(conversation_data)
+        cached = self.cache.get(self._cache_key(status, customer_name, user_message))
+        if cached is None:
+            return None
+        return self._fill_name(cached, customer_name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return model availability and response cache statistics."""
+        return {
+            "model_name": self.model_name,
+            "available": self._generator is not None,
+            "cpu_optimize": self.cpu_optimize,
+            "quantized": self.quantized,
+            "torch_threads": self.num_threads,
+            "torch_interop_threads": self.interop_threads,
+            "cache": self.cache.stats(),
+            "streaming": self._streaming_stats(),
+        }
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Approximate memory held by the model weights and the response cache."""
+        stats = {
+            "available": self._generator is not None,
+            "quantized": self.quantized,
+            "tensors": 0,
+            "weights_bytes": 0,
+            "cache_bytes": self.cache.stats()["bytes"],
+        }
+        if self._generator is None:
+            return stats
+        try:
+            seen = set()
+            for value in self._generator.model.state_dict().values():
+                # Dynamically quantized layers store (weight, bias) tuples
+                for tensor in value if isinstance(value, tuple) else (value,):
+                    if not hasattr(tensor, "element_size"):
+                        continue
+                    key = (tensor.data_ptr(), tensor.numel())
+                    if key in seen:  # tied weights, e.g. shared embeddings
+                        continue
+                    seen.add(key)
+                    stats["tensors"] += 1
+                    stats["weights_bytes"] += tensor.numel() * tensor.element_size()
+        except Exception:  # pragma: no cover - report what is known
+            pass
+        return stats
+
+    def _streaming_stats(self) -> Dict[str, Any]:
+        samples = sorted(self._ttft)
+        if not samples:
+            return {"streams": self.streams, "ttft_samples": 0}
+
+        def pct(p: float) -> float:
+            return round(1000 * samples[min(len(samples) - 1, int(p / 100.0 * len(samples)))], 3)
+
+        return {
+            "streams": self.streams,
+            "ttft_samples": len(samples),
+            "ttft_p50_ms": pct(50),
+            "ttft_p95_ms": pct(95),
+            "ttft_max_ms": round(1000 * samples[-1], 3),
+        }
+
+    def _build_prompt(self, status: str, customer_name: str, user_message: str) -> str:
         system_prompt = (
             "You are an AI banking assistant for a personal loan portal at Tata Capital. "
             "Speak politely, professionally and clearly. Keep replies to one or two concise sentences. "
@@ -87,97 +380,174 @@ class LoanChatModel:
             f"Customer name (if known): {customer_name}.\n"
         )
 
-        prompt = (
+        return (
             f"{system_prompt}\n"
             f"{context}\n"
             f"User: {user_message}\n"
             "Assistant:"
         )
 
-        # If the generator is not available (e.g. transformers/torch
-        # not installed correctly), fall back to a safe, static reply
-        # so that the app never crashes.
-        if self._generator is None:
-            return (
-                "I'm currently unable to use the ML model, but I can still guide you "
-                "through the loan process. Please tell me what help you need with your loan."
+    def _customer_name(self, conversation_data: Dict[str, Any]) -> str:
+        name = (conversation_data.get("customer_data", {}).get("name") or "").strip()
+        return name or self.DEFAULT_NAME
+
+    def _name_pattern(self, customer_name: str, ignore_case: bool = False) -> Optional["re.Pattern[str]"]:
+        """Whole-word pattern for a known customer name (None while it is unknown)."""
+        if not customer_name or customer_name == self.DEFAULT_NAME:
+            return None
+        return re.compile(rf"(?<!\w){re.escape(customer_name)}(?!\w)", re.IGNORECASE if ignore_case else 0)
+
+    def _template_name(self, text: str, customer_name: str) -> str:
+        # Case-sensitive, so "Will" templates the name but not the verb "will"
+        pattern = self._name_pattern(customer_name)
+        return pattern.sub(self.NAME_PLACEHOLDER, text) if pattern else text
+
+    def _fill_name(self, text: str, customer_name: str) -> str:
+        if self.NAME_PLACEHOLDER not in text:
+            return text
+        return text.replace(self.NAME_PLACEHOLDER, customer_name)
+
+    def _cache_key(self, status: str, customer_name: str, user_message: str) -> str:
+        """Normalize the prompt inputs into a name-independent cache key.
+
+        Replies for customers whose name is known and for those still
+        addressed as the default are generated from different prompts, so
+        they are keyed apart; only a known name is templated out.
+        """
+        text = " ".join(user_message.lower().split()).rstrip("?!. ")
+        pattern = self._name_pattern(customer_name, ignore_case=True)
+        if pattern is None:
+            return f"{self.model_name}|{status}|anonymous|{text}"
+        return f"{self.model_name}|{status}|named|{pattern.sub(self.NAME_PLACEHOLDER, text)}"
+
+    def _configure_threads(self) -> None:
+        """Apply the configured torch intra-op / inter-op thread counts."""
+        if not (self.num_threads or self.interop_threads):
+            return
+        try:
+            import torch  # type: ignore
+
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            if self.interop_threads:
+                # Only allowed once per process, before any parallel work.
+                torch.set_num_interop_threads(self.interop_threads)
+        except Exception:  # pragma: no cover - runtime protection
+            pass
+
+    def _quantize(self) -> None:
+        """Dynamically quantize the model's linear layers to int8."""
+        try:
+            import torch  # type: ignore
+
+            self._generator.model = torch.quantization.quantize_dynamic(
+                self._generator.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            self.quantized = True
+        except Exception:  # pragma: no cover - keep the fp32 model
+            self.quantized = False
+
+    def _max_new_tokens_for(self, user_messages: List[str]) -> int:
+        """Generation length budget for a batch of messages."""
+        limit = min(self.max_new_tokens, 64)
+        if not self.cpu_optimize:
+            return limit
+        # Replies are trimmed to two sentences afterwards, so short
+        # questions do not need the full budget.
+        longest = max(len(message.split()) for message in user_messages)
+        return min(limit, max(24, 24 + 2 * longest))
+
+    def _generation_kwargs(self, max_new_tokens: Optional[int] = None) -> Dict[str, Any]:
+        max_new_tokens = max_new_tokens or min(self.max_new_tokens, 64)
+        # Use different generation kwargs depending on pipeline task
+        task = getattr(self, '_task', 'text-generation')
+        if task == 'text2text-generation':
+            return dict(
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                num_return_sequences=1,
             )
+        return dict(
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            num_return_sequences=1,
+            repetition_penalty=1.2,
+        )
 
+    def _run_generator(
+        self,
+        prompts: List[str],
+        max_new_tokens: Optional[int] = None,
+    ) -> List[Optional[str]]:
+        """Run the pipeline over `prompts`, returning raw text or None per prompt."""
+        gen_kwargs = self._generation_kwargs(max_new_tokens)
         try:
-            # Use different generation kwargs depending on pipeline task
-            task = getattr(self, '_task', 'text-generation')
-            if task == 'text2text-generation':
-                gen_kwargs = dict(
-                    max_new_tokens=min(self.max_new_tokens, 64),
-                    do_sample=False,
-                    num_return_sequences=1,
-                )
+            if len(prompts) == 1:
+                outputs = [self._generator(prompts[0], **gen_kwargs)]
             else:
-                gen_kwargs = dict(
-                    max_new_tokens=min(self.max_new_tokens, 64),
-                    do_sample=False,
-                    num_return_sequences=1,
-                    repetition_penalty=1.2,
-                )
+                outputs = self._generator(prompts, batch_size=len(prompts), **gen_kwargs)
+            if not isinstance(outputs, list) or len(outputs) != len(prompts):
+                raise ValueError("Unexpected model output format")
+        except Exception:
+            if len(prompts) == 1:
+                return [None]
+            # Some models (e.g. causal LMs without a pad token) cannot be
+            # batched; retry the prompts one at a time instead.
+            return [self._run_generator([prompt], max_new_tokens)[0] for prompt in prompts]
 
-            outputs = self._generator(prompt, **gen_kwargs)
+        texts: List[Optional[str]] = []
+        for output in outputs:
+            try:
+                texts.append(self._extract_text(output))
+            except ValueError:
+                texts.append(None)
+        return texts
 
-            # Defensive checks around the Hugging Face output structure
-            if not outputs or not isinstance(outputs, list):
+    @staticmethod
+    def _extract_text(output: Any) -> str:
+        # Defensive checks around the Hugging Face output structure
+        if isinstance(output, list):
+            if not output:
                 raise ValueError("Unexpected model output format")
+            output = output[0]
 
-            first = outputs[0]
-            if not isinstance(first, dict) or "generated_text" not in first:
-                raise ValueError("Missing 'generated_text' in model output")
+        if not isinstance(output, dict) or "generated_text" not in output:
+            raise ValueError("Missing 'generated_text' in model output")
 
-            raw = str(first["generated_text"])
+        return str(output["generated_text"])
 
-            # Extract assistant reply and defensively trim repeated phrases.
-            if "Assistant:" in raw:
-                response_text = raw.split("Assistant:")[-1].strip()
-            else:
-                response_text = raw.strip()
-
-            # Remove obvious repeated sentences (simple heuristic)
-            parts = [p.strip() for p in response_text.split('.') if p.strip()]
-            dedup = []
-            for p in parts:
-                if not dedup or p != dedup[-1]:
-                    dedup.append(p)
-
-            if dedup:
-                response_text = '. '.join(dedup)
-                if not response_text.endswith('.'):
-                    response_text += '.'
-
-            # Finally, enforce a short reply: keep only the first two sentences to avoid verbosity
-            sentences = [s.strip() for s in response_text.split('.') if s.strip()]
-            if len(sentences) > 2:
-                response_text = '. '.join(sentences[:2]) + '.'
-
-            # Basic safety: avoid returning an empty string
-            if not response_text:
-                response_text = (
-                    "I'm here to help you with personal loans, eligibility and required documents. "
-                    "Could you please rephrase your question?"
-                )
+    def _postprocess(self, raw: str) -> str:
+        """Trim the raw model output into a short, on-topic reply."""
+        # Extract assistant reply and defensively trim repeated phrases.
+        if "Assistant:" in raw:
+            response_text = raw.split("Assistant:")[-1].strip()
+        else:
+            response_text = raw.strip()
 
-            # Simple content filter: if model claims personal attributes or clearly off-topic text, fallback
-            low = response_text.lower()
-            off_topic_markers = ['i am in my', 'i have a degree', 'my first experience', 'we were young', 'paypal']
-            if any(marker in low for marker in off_topic_markers):
-                return (
-                    "I'm currently unable to provide a detailed ML-generated reply. "
-                    "I can still guide you through the loan process and required documents."
-                )
+        # Remove obvious repeated sentences (simple heuristic)
+        parts = [p.strip() for p in response_text.split('.') if p.strip()]
+        dedup = []
+        for p in parts:
+            if not dedup or p != dedup[-1]:
+                dedup.append(p)
 
-            return response_text
+        if dedup:
+            response_text = '. '.join(dedup)
+            if not response_text.endswith('.'):
+                response_text += '.'
 
-        except Exception:
-            # Absolute last-resort fallback: never let an ML error crash the app.
-            return (
-                "I'm having trouble generating a smart response right now, "
-                "but I can still help you with loan eligibility, documents and application steps. "
-                "Please tell me what you would like to know."
-            )
+        # Finally, enforce a short reply: keep only the first two sentences to avoid verbosity
+        sentences = [s.strip() for s in response_text.split('.') if s.strip()]
+        if len(sentences) > 2:
+            response_text = '. '.join(sentences[:2]) + '.'
+
+        # Basic safety: avoid returning an empty string
+        if not response_text:
+            response_text = EMPTY_REPLY
+
+        # Simple content filter: if model claims personal attributes or clearly off-topic text, fallback
+        low = response_text.lower()
+        if any(marker in low for marker in OFF_TOPIC_MARKERS):
+            return OFF_TOPIC_REPLY
 
+        return response_text
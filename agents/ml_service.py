@@ -0,0 +1,385 @@
+"""Out-of-process inference service for `LoanChatModel`.
+
+The service owns a fixed pool of model worker processes, each of which
+loads the model weights once. Web workers talk to it over a local socket
+through `ModelServiceClient`, so they never import torch themselves and
+model concurrency is capped by the pool size.
+
+Run the service with:
+    HF_LOAN_SERVICE_AUTHKEY=... python -m agents.ml_service --address 127.0.0.1:6100 --workers 2
+
+Requests and replies are pickled, so the socket is authenticated with
+`HF_LOAN_SERVICE_AUTHKEY`, a secret shared by the service and the web
+app; neither starts without it.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, Optional, Tuple
+
+from .ml_model import ERROR_REPLY
+from .prefork import after_fork_in_child
+
+BUSY_REPLY = (
+    "Our assistant is handling a lot of questions right now. "
+    "I can still guide you through the loan process - please tell me what you need help with."
+)
+
+DEFAULT_ADDRESS = "127.0.0.1:6100"
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _authkey() -> bytes:
+    key = os.getenv("HF_LOAN_SERVICE_AUTHKEY", "")
+    if not key:
+        raise RuntimeError(
+            "HF_LOAN_SERVICE_AUTHKEY is not set; the model service and its clients need a shared secret "
+            "(e.g. python -c 'import secrets; print(secrets.token_hex(32))')"
+        )
+    return key.encode("utf-8")
+
+
+def _worker_main(
+    model_name: Optional[str],
+    requests,
+    results,
+    max_batch_size: int,
+    num_threads: int,
+) -> None:
+    """Entry point of a model worker process."""
+    from agents.ml_model import LoanChatModel
+
+    model = LoanChatModel(model_name=model_name, num_threads=num_threads)
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+
+        # Opportunistically pick up whatever else is already queued so
+        # the worker can run a single batched generate.
+        batch = [item]
+        while len(batch) < max_batch_size:
+            try:
+                extra = requests.get_nowait()
+            except queue.Empty:
+                break
+            if extra is None:
+                requests.put(None)
+                break
+            batch.append(extra)
+
+        now = time.time()
+        live = []
+        for request_id, message, conversation, deadline in batch:
+            if deadline < now:
+                # The caller has already given up; skip the work.
+                results.put((request_id, None))
+            else:
+                live.append((request_id, message, conversation))
+
+        if not live:
+            continue
+        try:
+            replies = model.generate_responses([(message, conversation) for _, message, conversation in live])
+        except Exception:
+            replies = [ERROR_REPLY] * len(live)
+        for (request_id, _, _), reply in zip(live, replies):
+            results.put((request_id, reply))
+
+
+class ModelServer:
+    """Serves generation requests from a fixed pool of model processes.
+
+    Requests beyond `max_queue` outstanding items are rejected straight
+    away so that callers can fall back instead of piling up.
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        workers: int = 2,
+        max_queue: int = 32,
+        max_batch_size: int = 4,
+        model_name: Optional[str] = None,
+        threads_per_worker: Optional[int] = None,
+    ) -> None:
+        self.address = parse_address(address)
+        self.authkey = _authkey()
+        self.num_workers = workers
+        self.max_queue = max_queue
+        self.max_batch_size = max_batch_size
+        self.model_name = model_name
+        # Split the cores between workers instead of oversubscribing them.
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+
+        # Spawned (not forked) workers so that no web-server state or
+        # partially initialised torch runtime is inherited.
+        self._ctx = multiprocessing.get_context("spawn")
+        self._requests = self._ctx.Queue(maxsize=max_queue)
+        self._results = self._ctx.Queue()
+        self._workers = []
+
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.restarts = 0
+
+    def start(self) -> None:
+        for _ in range(self.num_workers):
+            self._workers.append(self._spawn_worker())
+        threading.Thread(target=self._collect_results, name="ml-results", daemon=True).start()
+        threading.Thread(target=self._supervise, name="ml-supervisor", daemon=True).start()
+
+    def serve_forever(self) -> None:
+        self.start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def submit(self, message: str, conversation: Dict[str, Any], timeout: float) -> Optional[str]:
+        """Run one generation on the pool; None means the pool is saturated."""
+        request_id = next(self._ids)
+        future: Future = Future()
+        with self._pending_lock:
+            self._pending[request_id] = future
+
+        try:
+            self._requests.put_nowait((request_id, message, conversation, time.time() + timeout))
+        except queue.Full:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+                self.rejected += 1
+            return None
+
+        with self._pending_lock:
+            self.submitted += 1
+        try:
+            reply = future.result(timeout=timeout)
+        except Exception:
+            reply = None
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+        with self._pending_lock:
+            if reply is None:
+                self.expired += 1
+            else:
+                self.completed += 1
+        return reply if reply is not None else ERROR_REPLY
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            return {
+                "workers": self.num_workers,
+                "workers_alive": sum(1 for w in self._workers if w.is_alive()),
+                "threads_per_worker": self.threads_per_worker,
+                "max_queue": self.max_queue,
+                "in_flight": len(self._pending),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "restarts": self.restarts,
+            }
+
+    def _spawn_worker(self):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                self.model_name,
+                self._requests,
+                self._results,
+                self.max_batch_size,
+                self.threads_per_worker,
+            ),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _supervise(self) -> None:
+        while True:
+            time.sleep(1.0)
+            for idx, worker in enumerate(self._workers):
+                if not worker.is_alive():
+                    self._workers[idx] = self._spawn_worker()
+                    self.restarts += 1
+
+    def _collect_results(self) -> None:
+        while True:
+            request_id, reply = self._results.get()
+            with self._pending_lock:
+                future = self._pending.get(request_id)
+            if future is not None and not future.done():
+                future.set_result(reply)
+
+    def _serve_connection(self, conn) -> None:
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    return
+
+                kind = request[0]
+                if kind == "generate":
+                    _, message, conversation, timeout = request
+                    reply = self.submit(message, conversation, timeout)
+                    if reply is None:
+                        conn.send(("busy", None))
+                    else:
+                        conn.send(("ok", reply))
+                elif kind == "stats":
+                    conn.send(("ok", self.get_stats()))
+                else:
+                    conn.send(("error", f"unknown request {kind!r}"))
+        except (OSError, EOFError):
+            return
+        finally:
+            conn.close()
+
+
+class ModelServiceClient:
+    """Drop-in replacement for `LoanChatModel` that calls a `ModelServer`.
+
+    Connections are pooled per client. A request that times out, is
+    rejected by the service, or hits a connection error falls back to a
+    static reply, mirroring `LoanChatModel`'s never-crash behaviour.
+    """
+
+    def __init__(self, address: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        self.address = parse_address(address or os.getenv("HF_LOAN_MODEL_SERVICE", DEFAULT_ADDRESS))
+        self.timeout = timeout if timeout is not None else float(os.getenv("HF_LOAN_SERVICE_TIMEOUT", "10"))
+        self.authkey = _authkey()
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.busy = 0
+        self.timeouts = 0
+        self.errors = 0
+        after_fork_in_child(self._after_fork)
+
+    def _after_fork(self) -> None:
+        # Pooled connections would be shared with the parent; forked web
+        # workers open their own.
+        self._idle = queue.LifoQueue()
+        self._stats_lock = threading.Lock()
+
+    def generate_response(self, user_message: str, conversation_data: Dict[str, Any]) -> str:
+        # Only the fields the prompt uses are sent over the wire.
+        conversation = {
+            "status": conversation_data.get("status", "initial"),
+            "customer_data": {"name": conversation_data.get("customer_data", {}).get("name", "Customer")},
+        }
+        with self._stats_lock:
+            self.requests += 1
+
+        try:
+            status, payload = self._call(("generate", user_message, conversation, self.timeout))
+        except TimeoutError:
+            self._count("timeouts")
+            return ERROR_REPLY
+        except (OSError, EOFError):
+            self._count("errors")
+            return ERROR_REPLY
+
+        if status == "busy":
+            self._count("busy")
+            return BUSY_REPLY
+        if status != "ok":
+            self._count("errors")
+            return ERROR_REPLY
+        return payload
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats: Dict[str, Any] = {
+                "service_address": f"{self.address[0]}:{self.address[1]}",
+                "client": {
+                    "requests": self.requests,
+                    "busy": self.busy,
+                    "timeouts": self.timeouts,
+                    "errors": self.errors,
+                },
+            }
+        try:
+            status, payload = self._call(("stats",))
+            stats["service"] = payload if status == "ok" else None
+        except (OSError, EOFError, TimeoutError):
+            stats["service"] = None
+        return stats
+
+    def _call(self, request):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = Client(self.address, authkey=self.authkey)
+
+        try:
+            conn.send(request)
+            # Leave a little slack beyond the service-side timeout.
+            if not conn.poll(self.timeout + 1.0):
+                raise TimeoutError("model service did not reply in time")
+            response = conn.recv()
+        except BaseException:
+            # A half-finished exchange would desynchronise the connection.
+            conn.close()
+            raise
+
+        self._idle.put(conn)
+        return response
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the loan chat model inference service.")
+    parser.add_argument("--address", default=os.getenv("HF_LOAN_MODEL_SERVICE", DEFAULT_ADDRESS))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("HF_LOAN_SERVICE_WORKERS", "2")))
+    parser.add_argument("--max-queue", type=int, default=int(os.getenv("HF_LOAN_SERVICE_MAX_QUEUE", "32")))
+    parser.add_argument("--max-batch-size", type=int, default=4)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="torch intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--model", default=None, help="override HF_LOAN_MODEL_NAME")
+    args = parser.parse_args()
+    if not os.getenv("HF_LOAN_SERVICE_AUTHKEY"):
+        parser.error("HF_LOAN_SERVICE_AUTHKEY must be set to a secret shared with the web app")
+
+    server = ModelServer(
+        address=args.address,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        max_batch_size=args.max_batch_size,
+        model_name=args.model,
+        threads_per_worker=args.threads_per_worker,
+    )
+    # Exit through the interpreter on SIGTERM so daemon workers are reaped.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Loan model service listening on {args.address} with {args.workers} workers")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
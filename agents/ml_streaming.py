@@ -0,0 +1,122 @@
+from typing import List, Sequence
+
+
+class StreamingPostprocessor:
+    """Incrementally releases generated text for streaming to the browser.
+
+    Mirrors the rules of `LoanChatModel._postprocess` without waiting for
+    the whole generation:
+
+    * a sentence that may still turn out to repeat the previous one is
+      held back until it diverges (and dropped if it is a repeat);
+    * the last few characters of the current sentence are held back so
+      that an off-topic marker is never partially shown; if a marker
+      appears the stream is marked `off_topic` and stops;
+    * generation stops once `max_sentences` sentences are complete.
+
+    The text released here is a preview; the authoritative reply is still
+    `_postprocess(raw)`, which the caller sends once the stream ends.
+    """
+
+    def __init__(self, markers: Sequence[str], max_sentences: int = 2) -> None:
+        self.markers = tuple(markers)
+        self.max_sentences = max_sentences
+        self.raw = ""
+        self.finished = False
+        self.off_topic = False
+
+        self._sentences: List[str] = []
+        self._current = ""
+        self._emitted = 0
+        self._holdback = max((len(m) for m in self.markers), default=0)
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of generated text; return the text safe to show."""
+        if self.finished:
+            return ""
+        self.raw += chunk
+
+        out = []
+        for ch in chunk:
+            if ch == ".":
+                out.append(self._finish_sentence())
+                if self.finished:
+                    return "".join(out)
+            else:
+                self._current += ch
+
+        out.append(self._release(final=False))
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Release whatever is left once generation has ended."""
+        if self.finished:
+            return ""
+        return self._finish_sentence()
+
+    def _has_marker(self, text: str) -> bool:
+        low = text.lower()
+        return any(marker in low for marker in self.markers)
+
+    def _release(self, final: bool) -> str:
+        text = self._current.lstrip()
+        if not text:
+            return ""
+
+        if self._has_marker(text):
+            self.finished = True
+            self.off_topic = True
+            return ""
+
+        if not final:
+            if self._sentences and self._sentences[-1].startswith(text.strip()):
+                # Could still be a repeat of the previous sentence.
+                return ""
+            limit = len(text) - self._holdback
+        else:
+            limit = len(text)
+
+        if limit <= self._emitted:
+            return ""
+        prefix = " " if self._sentences and self._emitted == 0 else ""
+        released = text[self._emitted:limit]
+        self._emitted = limit
+        return prefix + released
+
+    def _finish_sentence(self) -> str:
+        sentence = self._current.strip()
+        if not sentence:
+            self._current = ""
+            self._emitted = 0
+            return ""
+
+        if self._has_marker(sentence):
+            self.finished = True
+            self.off_topic = True
+            return ""
+
+        if self._sentences and sentence == self._sentences[-1]:
+            # Repeated sentence: nothing of it has been released yet.
+            self._current = ""
+            self._emitted = 0
+            return ""
+
+        prefix = " " if self._sentences and self._emitted == 0 else ""
+        rest = sentence[self._emitted:]
+        self._sentences.append(sentence)
+        self._current = ""
+        self._emitted = 0
+        if len(self._sentences) >= self.max_sentences:
+            self.finished = True
+        return prefix + rest + "."
+
+
+def stop_on_event(event):
+    """Stopping criteria that ends `generate()` once `event` is set."""
+    from transformers import StoppingCriteria, StoppingCriteriaList  # type: ignore
+
+    class _StopOnEvent(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return event.is_set()
+
+    return StoppingCriteriaList([_StopOnEvent()])
@@ -0,0 +1,160 @@
+"""Process pool for CPU-bound PDF rendering.
+
+ReportLab layout is pure Python, so rendering inside a web request holds
+the GIL and slows every other request handled by the process. Documents
+are rendered in memory by a small pool of worker processes instead:
+callers get a `RenderJob` whose future resolves to the PDF bytes, which
+the caller persists once, and the pool turns work away once
+`max_pending` jobs are outstanding.
+"""
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, NamedTuple, Optional
+
+from agents.metrics import PDF_RENDER_SECONDS
+from agents.prefork import after_fork_in_child
+
+
+class RenderQueueFull(RuntimeError):
+    """Raised when the pool already has `max_pending` jobs outstanding."""
+
+
+class RenderJob(NamedTuple):
+    filename: str  # name the document is stored under once rendered
+    future: Future
+    deadline: float  # time.monotonic() after which the job counts as failed
+
+
+_generator = None
+
+
+def _render(kind: str, customer_data, loan_details, underwriting_result) -> bytes:
+    """Worker entry point: render one document and return its bytes."""
+    global _generator
+    if _generator is None:
+        from agents.sanction_letter_generator import SanctionLetterGenerator
+
+        _generator = SanctionLetterGenerator()
+    return _generator.render_document(kind, customer_data, loan_details, underwriting_result)
+
+
+def _warm_up() -> int:
+    # Build the cached letter template so the first real job is not slower.
+    from agents.sanction_letter_generator import sanction_letter_template
+
+    sanction_letter_template()
+    return os.getpid()
+
+
+class PdfRenderPool:
+    """Renders sanction letters and loan agreements in worker processes."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.workers = workers if workers is not None else int(os.getenv("HF_LOAN_PDF_WORKERS", str(os.cpu_count() or 1)))
+        self.max_pending = max_pending if max_pending is not None else int(
+            os.getenv("HF_LOAN_PDF_MAX_PENDING", str(4 * max(1, self.workers)))
+        )
+        self.timeout = timeout if timeout is not None else float(os.getenv("HF_LOAN_PDF_TIMEOUT", "30"))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        after_fork_in_child(self._after_fork)
+
+    def start(self) -> None:
+        """Start every worker now rather than on the first submit.
+
+        Workers are forked (where available) so they do not re-import the
+        web application. Serving processes call this before they take
+        requests, so no request threads are running at the fork; the
+        workers share the loaded app copy-on-write and never touch it.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+        # One task per worker forces the whole pool to start.
+        for future in [self._executor.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, kind: str, filename: str, customer_data, loan_details, underwriting_result) -> RenderJob:
+        """Queue a document for rendering; raises `RenderQueueFull` when saturated."""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise RenderQueueFull(f"{self._pending} PDF renders already pending")
+            if self._executor is None:
+                self._executor = self._new_executor()
+            try:
+                future = self._executor.submit(_render, kind, customer_data, loan_details, underwriting_result)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); replace the whole pool.
+                self._executor = self._new_executor()
+                self.restarts += 1
+                future = self._executor.submit(_render, kind, customer_data, loan_details, underwriting_result)
+            self._pending += 1
+            self.submitted += 1
+        future.add_done_callback(functools.partial(self._on_done, kind, submitted_at))
+        return RenderJob(filename, future, time.monotonic() + self.timeout)
+
+    def render(self, kind: str, filename: str, customer_data, loan_details, underwriting_result) -> bytes:
+        """Render synchronously through the pool; raises on rejection or timeout."""
+        job = self.submit(kind, filename, customer_data, loan_details, underwriting_result)
+        return job.future.result(timeout=self.timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "timeout_seconds": self.timeout,
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _after_fork(self) -> None:
+        # The parent's executor and its workers belong to the parent; a
+        # forked web worker starts its own on `start()` or first submit.
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+
+    def _on_done(self, kind: str, submitted_at: float, future: Future) -> None:
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+        PDF_RENDER_SECONDS.labels(kind, "failed" if failed else "ok").observe(time.perf_counter() - submitted_at)
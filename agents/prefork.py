@@ -0,0 +1,228 @@
+"""Pre-fork server: load the app once, fork web workers that share it.
+
+    python -m agents.prefork --workers 4 --port 5001 --port-per-worker
+
+In the default preload mode the master process imports `app`, which
+builds everything that can be shared (the ML model weights, the CRM,
+credit bureau and offer mart datasets, the FAQ index, static assets) but
+starts no PDF render processes; components that keep threads or pooled
+connections reset them in each child (see `after_fork_in_child`). The
+master then moves every object it has created into the garbage
+collector's permanent generation (`gc.freeze`), so that collections in
+the workers do not write to the shared pages, and forks the workers. The
+workers get the model and datasets copy-on-write: only the pages they
+modify become private. Each worker then runs `app.init_worker()` to
+start its own PDF render pool (and `close_worker()` on the way out).
+`HF_LOAN_PDF_WORKERS` (default: the number of CPUs) is the total number
+of render processes and is divided between the web workers, at least
+one each, rather than started in full by every worker. With
+`--no-preload` every worker imports the app itself after forking, like
+independent processes.
+`benchmarks.bench_prefork_memory` compares the two.
+
+Conversations are held in worker memory, so with more than one worker a
+session has to keep talking to the same worker: `--port-per-worker`
+gives worker i its own port (`port + i`) for `agents.session_router` to
+route sessions to (`python -m agents.session_router --spawn N` starts
+both). A single worker listens on `--port`. Several workers accepting
+on one shared socket would hand a session's requests to any of them,
+and a worker that does not hold the conversation starts a new one, so
+that is refused unless asked for with `--shared-socket` (for stateless
+traffic such as memory measurements).
+
+The master restarts workers that exit, stops them on SIGINT/SIGTERM, and
+on SIGUSR1 writes a JSON memory report (RSS, PSS and unique memory of the
+master and every worker) to stderr. Workers print a JSON `ready` line to
+stdout once they serve.
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional
+
+
+def after_fork_in_child(method: Callable[[], None]) -> None:
+    """Call the bound `method` in every child forked from this process.
+
+    Only a weak reference to the instance is kept, so registering does not
+    keep it alive.
+    """
+    ref = weakref.WeakMethod(method)
+
+    def reinit() -> None:
+        bound = ref()
+        if bound is not None:
+            bound()
+
+    os.register_at_fork(after_in_child=reinit)
+
+
+def memory_report(master_pid: int, worker_pids: List[int]) -> Dict:
+    from agents.memory_diagnostics import process_memory
+
+    workers = [process_memory(pid) for pid in worker_pids]
+    processes = [process_memory(master_pid)] + workers
+    return {
+        "master": processes[0],
+        "workers": workers,
+        "total_rss_bytes": sum(p.get("rss_bytes", 0) for p in processes),
+        "total_pss_bytes": sum(p.get("pss_bytes", 0) for p in processes),
+        "total_uss_bytes": sum(p.get("uss_bytes", 0) for p in processes),
+    }
+
+
+def pdf_workers_per_worker(workers: int) -> int:
+    """Each web worker's share of the HF_LOAN_PDF_WORKERS render processes (0 stays 0)."""
+    total = int(os.getenv("HF_LOAN_PDF_WORKERS", str(os.cpu_count() or 1)))
+    if total <= 0:
+        return 0
+    return max(1, total // max(1, workers))
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        workers: int,
+        host: str = "127.0.0.1",
+        port: int = 5000,
+        preload: bool = True,
+        port_per_worker: bool = False,
+    ) -> None:
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.preload = preload
+        self.port_per_worker = port_per_worker
+        self.app_module = None
+        self.listener: Optional[socket.socket] = None
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self.stopping = False
+
+    def run(self) -> int:
+        # Set before the app is imported, here or in the workers
+        os.environ["HF_LOAN_PDF_WORKERS"] = str(pdf_workers_per_worker(self.workers))
+        if self.preload:
+            import app as app_module
+
+            self.app_module = app_module
+            # Keep collections in the workers off the shared pages
+            gc.collect()
+            gc.freeze()
+
+        if not self.port_per_worker:
+            self.listener = self._listen(self.port)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGUSR1, self._report)
+        for index in range(self.workers):
+            self._spawn(index)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.children.pop(pid, None)
+            if index is not None and not self.stopping:
+                print(json.dumps({"event": "worker_exited", "pid": pid, "status": status}), file=sys.stderr)
+                time.sleep(0.5)
+                self._spawn(index)
+        return 0
+
+    def _listen(self, port: int) -> socket.socket:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, port))
+        listener.listen(128)
+        listener.set_inheritable(True)
+        return listener
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+        code = 1
+        try:
+            code = self._serve(index)
+        finally:
+            os._exit(code)
+
+    def _serve(self, index: int) -> int:
+        from werkzeug.serving import make_server
+
+        # Ctrl-C reaches the whole process group; the master stops the workers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        if self.app_module is None:
+            import app as app_module
+
+            self.app_module = app_module
+        self.app_module.init_worker()
+
+        listener = self.listener or self._listen(self.port + index)
+        server = make_server(
+            self.host, listener.getsockname()[1], self.app_module.app, threaded=True, fd=listener.fileno()
+        )
+        # shutdown() waits for serve_forever to return, so not from its thread
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        ready = json.dumps({
+            "event": "ready",
+            "worker": index,
+            "pid": os.getpid(),
+            "port": listener.getsockname()[1],
+            "preload": self.preload,
+        })
+        # One write, so the workers' lines cannot interleave on a shared pipe
+        os.write(sys.stdout.fileno(), (ready + "\n").encode())
+        try:
+            server.serve_forever()
+        finally:
+            self.app_module.close_worker()
+        return 0
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _report(self, signum, frame) -> None:
+        print(json.dumps(memory_report(os.getpid(), list(self.children))), file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--no-preload", dest="preload", action="store_false", help="import the app in every worker")
+    parser.add_argument("--port-per-worker", action="store_true", help="worker i listens on port + i")
+    parser.add_argument(
+        "--shared-socket", action="store_true", help="let several workers accept on one port (sessions do not stick)"
+    )
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not args.port_per_worker and not args.shared_socket:
+        parser.error(
+            "sessions live in worker memory, so several workers on one port would lose them: use "
+            "--port-per-worker behind agents.session_router (or python -m agents.session_router --spawn N), "
+            "or --shared-socket for stateless traffic"
+        )
+    return PreforkServer(args.workers, args.host, args.port, args.preload, args.port_per_worker).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""On-demand profiling of individual requests.
+
+A request is profiled when it carries the admin token in the
+`X-Profile-Request` header, or when it is the N-th request since the last
+sampled one (`sample_every`). The handler then runs under `cProfile`,
+which hooks calls at the C level and so keeps the slowdown of a profiled
+request modest, and the result is kept in a bounded in-memory ring
+buffer: the oldest profile is dropped when the buffer is full.
+
+Profiles are stored as marshalled pstats data (the format written by
+`cProfile`'s `dump_stats`), so they can be downloaded and opened with
+`python -m pstats` or snakeviz, or rendered as text on the server.
+
+Requests that are not profiled never touch the profiler, and with
+neither a token nor sampling configured the app does not create a
+`RequestProfiler` at all.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+PROFILE_HEADER = "X-Profile-Request"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+class ProfileRecord(NamedTuple):
+    id: str
+    started_at: str
+    path: str
+    session_id: Optional[str]
+    trigger: str  # "header" or "sample"
+    duration_ms: float
+    stats: bytes  # marshalled pstats data
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "started_at": self.started_at,
+            "path": self.path,
+            "session_id": self.session_id,
+            "trigger": self.trigger,
+            "duration_ms": self.duration_ms,
+            "bytes": len(self.stats),
+        }
+
+
+class _StatsSource:
+    """Feeds stored stats to `pstats.Stats`, which expects a profiler."""
+
+    def __init__(self, stats: Dict) -> None:
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class RequestProfiler:
+    """Decides which requests to profile, runs them and keeps the results.
+
+    `token` enables profiling on demand via `PROFILE_HEADER`; `sample_every`
+    profiles one request in N (0 disables sampling). At most `capacity`
+    profiles are kept.
+    """
+
+    def __init__(self, token: Optional[str] = None, sample_every: int = 0, capacity: int = 32) -> None:
+        self.token = token
+        self.sample_every = sample_every
+        self._counter = itertools.count(1)
+        self._records: Deque[ProfileRecord] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+        self.profiled = 0
+        self.skipped = 0  # another profiler was already active
+
+    def wants(self, header_value: Optional[str]) -> Optional[str]:
+        """The trigger ("header" or "sample") if this request should be profiled."""
+        if header_value and self.token and hmac.compare_digest(header_value, self.token):
+            return "header"
+        if self.sample_every > 0 and next(self._counter) % self.sample_every == 0:
+            return "sample"
+        return None
+
+    def run(
+        self,
+        handler: Callable[[], Any],
+        trigger: str,
+        path: str,
+        session_id: Optional[str] = None,
+    ) -> Tuple[Any, Optional[str]]:
+        """Call `handler` under the profiler; returns its result and the profile id."""
+        profiler = cProfile.Profile()
+        started_at = datetime.now().isoformat(timespec="milliseconds")
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on some Python versions.
+            with self._lock:
+                self.skipped += 1
+            return handler(), None
+        try:
+            result = handler()
+        finally:
+            profiler.disable()
+            duration_ms = round(1000 * (time.perf_counter() - start), 3)
+
+        profiler.create_stats()
+        record = ProfileRecord(
+            uuid.uuid4().hex[:16], started_at, path, session_id, trigger, duration_ms, marshal.dumps(profiler.stats)
+        )
+        with self._lock:
+            self._records.append(record)
+            self.profiled += 1
+        return result, record.id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first."""
+        with self._lock:
+            records = list(self._records)
+        return [record.summary() for record in reversed(records)]
+
+    def get(self, profile_id: str) -> Optional[ProfileRecord]:
+        with self._lock:
+            for record in self._records:
+                if record.id == profile_id:
+                    return record
+        return None
+
+    @staticmethod
+    def render_text(record: ProfileRecord, sort: str = "cumulative", limit: int = 40) -> str:
+        """The profile as `pstats` text, `limit` functions sorted by `sort`."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsSource(marshal.loads(record.stats)), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sample_every": self.sample_every,
+                "header_enabled": bool(self.token),
+                "capacity": self._records.maxlen,
+                "stored": len(self._records),
+                "profiled": self.profiled,
+                "skipped": self.skipped,
+            }
@@ -0,0 +1,304 @@
+"""Bulk sanction letter generation for approved applications.
+
+Reissues sanction letters outside the chat flow, e.g. after underwriting
+rules change. Applications are read from the loan packages recorded in
+cloud storage or from a CSV file, rendered in parallel worker processes
+with `SanctionLetterGenerator`, and written to an output directory along
+with a `manifest.jsonl` that records every letter as it completes. Running
+the same command again resumes: applications already in the manifest with
+a letter on disk are skipped, failed ones are retried.
+
+CSV columns: `application_id` (optional, defaults to the phone number),
+`name`, `phone`, `amount`, `tenure`, `interest_rate`, and optionally
+`approved_amount`, `emi`, `total_amount`, `total_interest`,
+`processing_fee` and `credit_score` (derived from the others when blank).
+
+Run with:
+    python -m agents.sanction_batch --csv approved.csv --output-dir sanction_letters/batch
+    python -m agents.sanction_batch --storage cloud_storage --output-dir sanction_letters/reissue
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from agents.metrics import summarize_latencies
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+class Application(NamedTuple):
+    application_id: str
+    customer_data: Dict[str, Any]
+    loan_details: Dict[str, Any]
+    underwriting_result: Dict[str, Any]
+
+
+def applications_from_storage(base_dir: str = "cloud_storage") -> Iterator[Application]:
+    """Approved applications from the loan packages recorded in `metadata.json`.
+
+    Packages are only created once a loan is sanctioned; the most recent
+    package of each session wins.
+    """
+    with open(os.path.join(base_dir, "metadata.json"), encoding="utf-8") as fh:
+        packages = json.load(fh).get("packages", [])
+    for record in packages:  # newest first
+        meta = record.get("metadata") or {}
+        underwriting_result = meta.get("underwriting_result") or {}
+        if not underwriting_result.get("approved", True):
+            continue
+        yield Application(
+            str(record.get("session_id") or record.get("package_name")),
+            meta.get("customer") or {},
+            meta.get("loan_details") or {},
+            underwriting_result,
+        )
+
+
+def _number(row: Dict[str, str], column: str, default: Optional[float] = None) -> Optional[float]:
+    value = (row.get(column) or "").strip().replace(",", "")
+    return float(value) if value else default
+
+
+def application_from_row(row: Dict[str, str]) -> Application:
+    """Build an `Application` from one CSV row, deriving blank loan figures."""
+    phone = (row.get("phone") or "").strip()
+    amount = _number(row, "amount")
+    tenure = _number(row, "tenure")
+    rate = _number(row, "interest_rate")
+    if amount is None or tenure is None or rate is None:
+        raise ValueError("amount, tenure and interest_rate are required")
+    tenure = int(tenure)
+    approved_amount = _number(row, "approved_amount", amount)
+
+    # Same figures OfferMart.generate_loan_offer produces
+    monthly_rate = rate / (12 * 100)
+    if monthly_rate:
+        emi = approved_amount * monthly_rate * (1 + monthly_rate) ** tenure / ((1 + monthly_rate) ** tenure - 1)
+    else:
+        emi = approved_amount / tenure
+    emi = _number(row, "emi", round(emi, 2))
+    total_amount = _number(row, "total_amount", round(emi * tenure, 2))
+
+    return Application(
+        (row.get("application_id") or "").strip() or phone,
+        {"name": (row.get("name") or "").strip(), "phone": phone},
+        {"amount": amount, "tenure": tenure},
+        {
+            "approved": True,
+            "approved_amount": approved_amount,
+            "interest_rate": rate,
+            "emi": emi,
+            "total_amount": total_amount,
+            "total_interest": _number(row, "total_interest", round(total_amount - approved_amount, 2)),
+            "processing_fee": _number(row, "processing_fee", min(approved_amount * 0.02, 20000)),
+            "credit_score": int(_number(row, "credit_score", 0)),
+        },
+    )
+
+
+def applications_from_csv(path: str) -> Iterator[Application]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        for line, row in enumerate(csv.DictReader(fh), start=2):
+            try:
+                yield application_from_row(row)
+            except ValueError as exc:
+                raise ValueError(f"{path}:{line}: {exc}") from None
+
+
+def letter_filename(application_id: str) -> str:
+    return "sanction_letter_" + re.sub(r"[^A-Za-z0-9_.-]", "_", application_id) + ".pdf"
+
+
+def completed_ids(output_dir: str) -> Set[str]:
+    """Applications the manifest records as written whose letter still exists."""
+    done: Set[str] = set()
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # line cut short by an interruption
+            if entry.get("status") == "ok" and os.path.exists(os.path.join(output_dir, entry["file"])):
+                done.add(entry["application_id"])
+            else:
+                done.discard(entry.get("application_id"))
+    return done
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+_generator = None
+
+
+def _render_letter(customer_data, loan_details, underwriting_result) -> Tuple[bytes, float]:
+    """Worker entry point: render one letter; returns its bytes and render time."""
+    global _generator
+    if _generator is None:
+        from agents.sanction_letter_generator import SanctionLetterGenerator
+
+        _generator = SanctionLetterGenerator()
+    start = time.perf_counter()
+    data = _generator.render_document("sanction_letter", customer_data, loan_details, underwriting_result)
+    return data, time.perf_counter() - start
+
+
+class _InlineExecutor:
+    """Stand-in for a process pool that renders in the calling process."""
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+
+def run_batch(
+    applications: Iterator[Application],
+    output_dir: str,
+    workers: int,
+    max_in_flight: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Render every application not already completed in `output_dir`."""
+    os.makedirs(output_dir, exist_ok=True)
+    done = completed_ids(output_dir)
+    max_in_flight = max_in_flight or 4 * max(1, workers)
+
+    if workers > 0:
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+    else:
+        executor = _InlineExecutor()
+
+    seen: Set[str] = set()
+    counts = {"applications": 0, "skipped": 0, "duplicates": 0, "rendered": 0, "failed": 0}
+    render_latencies: List[float] = []
+    letter_latencies: List[float] = []
+    in_flight: Dict[Any, Tuple[Application, float]] = {}
+    interrupted = False
+    start = time.perf_counter()
+
+    manifest = open(os.path.join(output_dir, MANIFEST_NAME), "a", encoding="utf-8")
+
+    def record(application: Application, entry: Dict[str, Any]) -> None:
+        entry = {"application_id": application.application_id, **entry, "completed_at": datetime.now().isoformat()}
+        manifest.write(json.dumps(entry) + "\n")
+        manifest.flush()
+
+    def collect(futures) -> None:
+        for future in futures:
+            application, submitted_at = in_flight.pop(future)
+            filename = letter_filename(application.application_id)
+            try:
+                data, render_seconds = future.result()
+                _write_atomic(os.path.join(output_dir, filename), data)
+            except Exception as exc:
+                counts["failed"] += 1
+                record(application, {"status": "failed", "error": f"{type(exc).__name__}: {exc}"})
+                continue
+            counts["rendered"] += 1
+            render_latencies.append(render_seconds)
+            letter_latencies.append(time.perf_counter() - submitted_at)
+            record(application, {
+                "status": "ok",
+                "file": filename,
+                "bytes": len(data),
+                "render_ms": round(1000 * render_seconds, 3),
+            })
+
+    try:
+        for application in applications:
+            counts["applications"] += 1
+            if application.application_id in seen:
+                counts["duplicates"] += 1
+                continue
+            seen.add(application.application_id)
+            if application.application_id in done:
+                counts["skipped"] += 1
+                continue
+
+            # Bound the number of queued letters so huge inputs stream through
+            while len(in_flight) >= max_in_flight:
+                finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                collect(finished)
+            future = executor.submit(
+                _render_letter, application.customer_data, application.loan_details, application.underwriting_result
+            )
+            in_flight[future] = (application, time.perf_counter())
+
+        while in_flight:
+            finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            collect(finished)
+    except KeyboardInterrupt:
+        # Everything already in the manifest is kept; rerun to resume.
+        interrupted = True
+    finally:
+        executor.shutdown(wait=not in_flight, cancel_futures=True)
+        manifest.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        **counts,
+        "interrupted": interrupted,
+        "output_dir": output_dir,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "letters_per_sec": round(counts["rendered"] / elapsed, 1) if elapsed else 0.0,
+        "render_latency": summarize_latencies(render_latencies),
+        "letter_latency": summarize_latencies(letter_latencies),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate sanction letters in bulk for approved applications.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV file of approved applications")
+    source.add_argument("--storage", nargs="?", const="cloud_storage",
+                        help="cloud storage directory whose loan packages are reissued (default: cloud_storage)")
+    parser.add_argument("--output-dir", default="sanction_letters/batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="render processes (default: number of CPUs; 0 renders in this process)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="letters queued for rendering at once (default: 4 per worker)")
+    args = parser.parse_args()
+
+    applications = applications_from_csv(args.csv) if args.csv else applications_from_storage(args.storage)
+    try:
+        report = run_batch(applications, args.output_dir, args.workers, args.max_in_flight)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    report["source"] = args.csv or args.storage
+    print(json.dumps(report, indent=2))
+    if report["interrupted"]:
+        return 130
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
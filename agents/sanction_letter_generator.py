@@ -1,4 +1,9 @@
+import copy
+import io
 import os
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -8,77 +13,248 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 import uuid
 
-class SanctionLetterGenerator:
+from agents.pdf_renderer import RenderJob
+
+TERMS = [
+    "1. This sanction is valid for 30 days from the date of this letter.",
+    "2. The loan will be disbursed within 24-48 hours after completion of documentation.",
+    "3. Interest will be calculated on a reducing balance method.",
+    "4. EMI payments are due on the same date each month as the disbursement date.",
+    "5. Prepayment charges: 2% of outstanding principal for prepayment within 12 months.",
+    "6. Late payment charges: ₹500 per month for delayed EMI payments.",
+    "7. The borrower must maintain the same employment status during the loan tenure.",
+    "8. Any change in contact details must be communicated to Tata Capital immediately.",
+    "9. The loan is subject to final verification of documents and KYC compliance.",
+    "10. Tata Capital reserves the right to recall the loan in case of any misrepresentation."
+]
+
+NEXT_STEPS = [
+    "1. Review and accept the loan terms mentioned above.",
+    "2. Complete the loan agreement and other required documents.",
+    "3. Provide bank account details for loan disbursement.",
+    "4. Submit any additional documents if requested.",
+    "5. Loan disbursement will be processed within 24-48 hours."
+]
+
+
+class StaticParagraph(Paragraph):
+    """Paragraph that reuses its line breaking once wrapped at a given width.
+
+    The layout cache is shared by shallow copies, so the fixed text of the
+    letter is broken into lines once per process rather than per letter.
+    """
+
+    _LAYOUT_ATTRS = ('width', 'height', 'blPara', '_wrapWidths', '_width_max', '_hyphenations', '_splitLongWordCount')
+
+    def __init__(self, text, style):
+        super().__init__(text, style)
+        self._layouts = {}
+
+    def wrap(self, availWidth, availHeight):
+        layout = self._layouts.get(availWidth)
+        if layout is None:
+            size = super().wrap(availWidth, availHeight)
+            self._layouts[availWidth] = {k: self.__dict__[k] for k in self._LAYOUT_ATTRS if k in self.__dict__}
+            return size
+        self.__dict__.update(layout)
+        return self.width, self.height
+
+
+class SanctionLetterTemplate:
+    """Styles and pre-built static flowables of the sanction letter.
+
+    Building the stylesheet and parsing the fixed paragraphs costs more
+    than the per-letter fields, so this is done once and each letter only
+    adds its date, reference and loan details table.
+    """
+
     def __init__(self):
-        self.output_dir = 'sanction_letters'
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-    
-    def generate_sanction_letter(self, customer_data, loan_details, underwriting_result):
-        """Generate PDF sanction letter"""
-        # Generate unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"sanction_letter_{customer_data.get('phone', 'unknown')}_{timestamp}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(filepath, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        
-        # Get styles
-        styles = getSampleStyleSheet()
-        
+        self.styles = getSampleStyleSheet()
+
         # Create custom styles
-        title_style = ParagraphStyle(
+        self.title_style = ParagraphStyle(
             'CustomTitle',
-            parent=styles['Heading1'],
+            parent=self.styles['Heading1'],
             fontSize=18,
             spaceAfter=30,
             alignment=TA_CENTER,
             textColor=colors.darkblue
         )
         
-        heading_style = ParagraphStyle(
+        self.heading_style = ParagraphStyle(
             'CustomHeading',
-            parent=styles['Heading2'],
+            parent=self.styles['Heading2'],
             fontSize=14,
             spaceAfter=12,
             textColor=colors.darkblue
         )
         
-        normal_style = ParagraphStyle(
+        self.normal_style = ParagraphStyle(
             'CustomNormal',
-            parent=styles['Normal'],
+            parent=self.styles['Normal'],
             fontSize=11,
             spaceAfter=6
         )
-        
-        # Build content
-        story = []
-        
+
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+        ])
+
+        normal_style = self.normal_style
+        heading_style = self.heading_style
+
         # Header
-        story.append(Paragraph("TATA CAPITAL FINANCIAL SERVICES LIMITED", title_style))
-        story.append(Paragraph("Personal Loan Sanction Letter", heading_style))
-        story.append(Spacer(1, 20))
+        self.header = [
+            StaticParagraph("TATA CAPITAL FINANCIAL SERVICES LIMITED", self.title_style),
+            StaticParagraph("Personal Loan Sanction Letter", heading_style),
+            Spacer(1, 20),
+        ]
+
+        # Greeting between the reference and the loan details table
+        self.introduction = [
+            Spacer(1, 20),
+            StaticParagraph("Dear Sir/Madam,", normal_style),
+            Spacer(1, 12),
+            StaticParagraph(
+                "We are pleased to inform you that your Personal Loan application has been approved. "
+                "Please find below the details of your sanctioned loan:",
+                normal_style
+            ),
+            Spacer(1, 20),
+        ]
+
+        # Everything after the table: terms, next steps, contact and footer
+        closing = [Spacer(1, 20), StaticParagraph("Terms and Conditions:", heading_style)]
+        closing.extend(StaticParagraph(term, normal_style) for term in TERMS)
+        closing.append(Spacer(1, 20))
+        closing.append(StaticParagraph("Next Steps:", heading_style))
+        closing.extend(StaticParagraph(step, normal_style) for step in NEXT_STEPS)
+        closing.append(Spacer(1, 30))
+        closing.extend([
+            StaticParagraph("For any queries, please contact:", normal_style),
+            StaticParagraph("Customer Service: 1800-209-8808", normal_style),
+            StaticParagraph("Email: customer.service@tatacapital.com", normal_style),
+            StaticParagraph("Website: www.tatacapital.com", normal_style),
+            Spacer(1, 30),
+            StaticParagraph("Thank you for choosing Tata Capital!", normal_style),
+            Spacer(1, 20),
+            StaticParagraph("Yours sincerely,", normal_style),
+            StaticParagraph("Tata Capital Financial Services Limited", normal_style),
+            StaticParagraph("Personal Loans Division", normal_style),
+        ])
+        self.closing = closing
+
+    def story(self, current_date, loan_ref, loan_data):
+        """Flowables for one letter: the static parts plus its variable fields
+
+        Static flowables are shallow copies of the pre-built ones: they
+        share the parsed text, while the layout state a build leaves on a
+        flowable (size, line breaks, postponement) stays on the copy.
+        """
+        loan_table = Table(loan_data, colWidths=[2.5*inch, 3*inch])
+        loan_table.setStyle(self.table_style)
+
+        story = [copy.copy(f) for f in self.header]
+        story.append(Paragraph(f"Date: {current_date}", self.normal_style))
+        story.append(Paragraph(f"Loan Reference: {loan_ref}", self.normal_style))
+        story.extend(copy.copy(f) for f in self.introduction)
+        story.append(loan_table)
+        story.extend(copy.copy(f) for f in self.closing)
+        return story
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def sanction_letter_template():
+    """The process-wide `SanctionLetterTemplate`, built on first use"""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = SanctionLetterTemplate()
+    return _template
+
+
+class SanctionLetterGenerator:
+    def __init__(self, render_pool=None, storage=None):
+        self.output_dir = 'sanction_letters'
+        # Optional PdfRenderPool; without one documents render in-process
+        self.render_pool = render_pool
+        # Optional CloudStorage that rendered documents are persisted to;
+        # without one they are written to `output_dir`
+        self.storage = storage
+    
+    def generate_sanction_letter(self, customer_data, loan_details, underwriting_result):
+        """Generate PDF sanction letter"""
+        job = self.submit_sanction_letter(customer_data, loan_details, underwriting_result)
+        return self.save_document(job, metadata={'kind': 'sanction_letter'})
+
+    def submit_sanction_letter(self, customer_data, loan_details, underwriting_result):
+        """Start rendering the sanction letter; returns a RenderJob for its bytes"""
+        # Generate unique filename
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"sanction_letter_{customer_data.get('phone', 'unknown')}_{timestamp}.pdf"
+        return self._submit('sanction_letter', filename, customer_data, loan_details, underwriting_result)
+
+    def save_document(self, job, metadata=None):
+        """Wait for a RenderJob and persist its PDF once; returns the stored path"""
+        data = job.future.result(timeout=self._timeout())
+        if self.storage is not None:
+            return self.storage.save_document(data, job.filename, metadata=metadata)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        filepath = os.path.join(self.output_dir, job.filename)
+        with open(filepath, 'wb') as fh:
+            fh.write(data)
+        return filepath
+
+    def _submit(self, kind, filename, customer_data, loan_details, underwriting_result):
+        if self.render_pool is not None:
+            return self.render_pool.submit(kind, filename, customer_data, loan_details, underwriting_result)
+
+        future = Future()
+        try:
+            future.set_result(self.render_document(kind, customer_data, loan_details, underwriting_result))
+        except Exception as exc:
+            future.set_exception(exc)
+        return RenderJob(filename, future, time.monotonic())
+
+    def _timeout(self):
+        return self.render_pool.timeout if self.render_pool is not None else None
+
+    def render_document(self, kind, customer_data, loan_details, underwriting_result):
+        """Render a sanction letter or loan agreement in memory; returns the PDF bytes"""
+        buffer = io.BytesIO()
+        if kind == 'sanction_letter':
+            self.render_sanction_letter(buffer, customer_data, loan_details, underwriting_result)
+        elif kind == 'loan_agreement':
+            self.render_loan_agreement(buffer, customer_data, loan_details, underwriting_result)
+        else:
+            raise ValueError(f"unknown document kind {kind!r}")
+        return buffer.getvalue()
+
+    def render_sanction_letter(self, target, customer_data, loan_details, underwriting_result, template=None):
+        """Render the sanction letter PDF to `target` (a path or file-like object)"""
+        template = template or sanction_letter_template()
+
+        # Create PDF document
+        doc = SimpleDocTemplate(target, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
         
         # Date and Reference
         current_date = datetime.now().strftime('%B %d, %Y')
         loan_ref = f"TC/PL/{datetime.now().strftime('%Y%m%d')}/{str(uuid.uuid4())[:8].upper()}"
         
-        story.append(Paragraph(f"Date: {current_date}", normal_style))
-        story.append(Paragraph(f"Loan Reference: {loan_ref}", normal_style))
-        story.append(Spacer(1, 20))
-        
-        # Customer Details
-        story.append(Paragraph("Dear Sir/Madam,", normal_style))
-        story.append(Spacer(1, 12))
-        
-        story.append(Paragraph(
-            f"We are pleased to inform you that your Personal Loan application has been approved. "
-            f"Please find below the details of your sanctioned loan:",
-            normal_style
-        ))
-        story.append(Spacer(1, 20))
-        
         # Loan Details Table
         loan_data = [
             ['Particulars', 'Details'],
@@ -95,88 +271,21 @@ class SanctionLetterGenerator:
             ['Sanction Date', current_date]
         ]
         
-        loan_table = Table(loan_data, colWidths=[2.5*inch, 3*inch])
-        loan_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-        ]))
-        
-        story.append(loan_table)
-        story.append(Spacer(1, 20))
-        
-        # Terms and Conditions
-        story.append(Paragraph("Terms and Conditions:", heading_style))
-        
-        terms = [
-            "1. This sanction is valid for 30 days from the date of this letter.",
-            "2. The loan will be disbursed within 24-48 hours after completion of documentation.",
-            "3. Interest will be calculated on a reducing balance method.",
-            "4. EMI payments are due on the same date each month as the disbursement date.",
-            "5. Prepayment charges: 2% of outstanding principal for prepayment within 12 months.",
-            "6. Late payment charges: ₹500 per month for delayed EMI payments.",
-            "7. The borrower must maintain the same employment status during the loan tenure.",
-            "8. Any change in contact details must be communicated to Tata Capital immediately.",
-            "9. The loan is subject to final verification of documents and KYC compliance.",
-            "10. Tata Capital reserves the right to recall the loan in case of any misrepresentation."
-        ]
-        
-        for term in terms:
-            story.append(Paragraph(term, normal_style))
-        
-        story.append(Spacer(1, 20))
-        
-        # Next Steps
-        story.append(Paragraph("Next Steps:", heading_style))
-        next_steps = [
-            "1. Review and accept the loan terms mentioned above.",
-            "2. Complete the loan agreement and other required documents.",
-            "3. Provide bank account details for loan disbursement.",
-            "4. Submit any additional documents if requested.",
-            "5. Loan disbursement will be processed within 24-48 hours."
-        ]
-        
-        for step in next_steps:
-            story.append(Paragraph(step, normal_style))
-        
-        story.append(Spacer(1, 30))
-        
-        # Contact Information
-        story.append(Paragraph("For any queries, please contact:", normal_style))
-        story.append(Paragraph("Customer Service: 1800-209-8808", normal_style))
-        story.append(Paragraph("Email: customer.service@tatacapital.com", normal_style))
-        story.append(Paragraph("Website: www.tatacapital.com", normal_style))
-        
-        story.append(Spacer(1, 30))
-        
-        # Footer
-        story.append(Paragraph("Thank you for choosing Tata Capital!", normal_style))
-        story.append(Spacer(1, 20))
-        story.append(Paragraph("Yours sincerely,", normal_style))
-        story.append(Paragraph("Tata Capital Financial Services Limited", normal_style))
-        story.append(Paragraph("Personal Loans Division", normal_style))
-        
         # Build PDF
-        doc.build(story)
-        
-        return filepath
+        doc.build(template.story(current_date, loan_ref, loan_data))
     
     def generate_loan_agreement(self, customer_data, loan_details, underwriting_result):
         """Generate loan agreement document"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"loan_agreement_{customer_data.get('phone', 'unknown')}_{timestamp}.pdf"
-        filepath = os.path.join(self.output_dir, filename)
-        
+        job = self._submit('loan_agreement', filename, customer_data, loan_details, underwriting_result)
+        return self.save_document(job, metadata={'kind': 'loan_agreement'})
+
+    def render_loan_agreement(self, target, customer_data, loan_details, underwriting_result):
+        """Render the loan agreement PDF to `target` (a path or file-like object)"""
         # Create PDF document
-        doc = SimpleDocTemplate(filepath, pagesize=A4)
-        styles = getSampleStyleSheet()
+        doc = SimpleDocTemplate(target, pagesize=A4)
+        styles = sanction_letter_template().styles
         story = []
         
         # Add content for loan agreement
@@ -199,7 +308,6 @@ class SanctionLetterGenerator:
             story.append(Paragraph(content, styles['Normal']))
         
         doc.build(story)
-        return filepath
     
     def get_sanction_letter_template(self):
         """Get sanction letter template structure"""
@@ -0,0 +1,444 @@
+"""Consistent-hash front router for a local fleet of app workers.
+
+    python -m agents.session_router --port 8000 --spawn 4
+    python -m agents.session_router --port 8000 --backends http://127.0.0.1:5001,http://127.0.0.1:5002
+
+Conversations live in the memory of the worker that served them, so every
+request of a session has to reach the same worker. The router reads the
+`session_id` a request carries (the JSON body of /api/chat and
+/api/chat/stream, the form of /api/upload, the path of /api/download) and
+forwards the request to the worker that owns that id on a `HashRing`.
+Requests without a session id get one assigned by the router; anything
+else (pages, static files, stats) goes to any worker.
+
+With virtual nodes on the ring, adding or removing a worker changes the
+owner of only about 1/N of the sessions. Those sessions are handed off:
+the router pauses forwarding, exports their state from the old owner
+(`/admin/sessions/export`, which drops it there) and imports it on the
+new one, then resumes with the new ring. A worker that does not answer
+is dropped from the ring, so a crashed one can still be removed; the
+handoff report lists it and the ids of any sessions lost on the way.
+Workers need the same `HF_LOAN_ADMIN_TOKEN` as the router; with
+`--spawn` the router starts an `agents.prefork` fleet (one port per
+worker) and sets one up itself.
+Members are changed at runtime through `/router/backends` (POST to add,
+DELETE to remove, `{"url": ...}`), and `GET /router/backends` reports
+the ring and per-worker request counts. Replayed idempotent responses
+and in-flight PDF renders are not carried over: the new owner reruns
+them when the client retries.
+
+`benchmarks.bench_session_router` measures session movement and
+throughput across 1, 2 and 4 workers.
+"""
+import argparse
+import bisect
+import hashlib
+import hmac
+import io
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from flask import Flask, Response, jsonify, request
+from werkzeug.formparser import parse_form_data
+
+# Headers that describe a single connection, not the message
+HOP_BY_HOP = frozenset([
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+    "transfer-encoding", "upgrade", "host", "content-length", "content-encoding",
+])
+
+HANDOFF_BATCH = 500
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing with `replicas` virtual nodes per member."""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 160) -> None:
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._nodes
+
+    def add(self, node: str) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(replicas=self.replicas)
+        ring._points, ring._owners, ring._nodes = list(self._points), list(self._owners), list(self._nodes)
+        return ring
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise LookupError("the ring has no members")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class _RouteLock:
+    """Many requests forward at once; a membership change waits for them and runs alone."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._active = 0
+        self._changing = False
+
+    @contextmanager
+    def forwarding(self) -> Iterator[None]:
+        with self._cond:
+            while self._changing:
+                self._cond.wait()
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            while self._changing:
+                self._cond.wait()
+            self._changing = True
+            while self._active:
+                self._cond.wait()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._changing = False
+                self._cond.notify_all()
+
+
+class SessionRouter:
+    """Routes sessions to backends on a `HashRing` and hands them off on changes."""
+
+    def __init__(
+        self,
+        backends: Iterable[str],
+        admin_token: Optional[str] = None,
+        replicas: int = 160,
+        timeout: float = 120.0,
+    ) -> None:
+        self.ring = HashRing([url.rstrip("/") for url in backends], replicas)
+        self.admin_token = admin_token
+        self.timeout = timeout
+        self._lock = _RouteLock()
+        self._local = threading.local()
+        self._round_robin = 0
+        self.routed: Counter = Counter()
+        self.handoffs: List[Dict[str, Any]] = []
+
+    @property
+    def http(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def backend_for(self, session_id: Optional[str]) -> str:
+        if session_id:
+            return self.ring.node_for(session_id)
+        nodes = self.ring.nodes
+        self._round_robin += 1
+        return nodes[self._round_robin % len(nodes)]
+
+    def forward(self, session_id: Optional[str], method: str, path: str, headers: Dict[str, str], body: bytes):
+        """Send the request to the session's backend; returns it and the streamed `requests` response."""
+        with self._lock.forwarding():
+            backend = self.backend_for(session_id)
+            self.routed[backend] += 1
+            return backend, self.http.request(
+                method, backend + path, headers=headers, data=body, stream=True,
+                allow_redirects=False, timeout=self.timeout,
+            )
+
+    def add_backend(self, url: str) -> Dict[str, Any]:
+        url = url.rstrip("/")
+        with self._lock.exclusive():
+            if url in self.ring:
+                return {"backend": url, "moved": 0}
+            ring = self.ring.copy()
+            ring.add(url)
+            return self._rebalance(ring, f"add {url}")
+
+    def remove_backend(self, url: str) -> Dict[str, Any]:
+        url = url.rstrip("/")
+        with self._lock.exclusive():
+            if url not in self.ring:
+                raise KeyError(url)
+            if len(self.ring) == 1:
+                raise ValueError("cannot remove the last backend")
+            ring = self.ring.copy()
+            ring.remove(url)
+            return self._rebalance(ring, f"remove {url}")
+
+    def _rebalance(self, ring: HashRing, change: str) -> Dict[str, Any]:
+        """Move sessions whose owner differs on `ring`, then switch to it (under the exclusive lock).
+
+        A member whose sessions cannot be listed is dropped from `ring`
+        (`unreachable`) and whatever it held is lost; a joining backend
+        that cannot be listed aborts the change before anything moves.
+        Once sessions move, the ring is switched even if some batches fail:
+        a batch the new owner rejects is put back on its old worker
+        (`failed`, moved again by the next change), and the ids of batches
+        that could not be exported, or neither imported nor put back, are
+        returned in `lost`.
+        """
+        started = time.perf_counter()
+        listed: Dict[str, List[str]] = {}
+        unreachable: List[str] = []
+        for backend in self.ring.nodes + [node for node in ring.nodes if node not in self.ring]:
+            try:
+                listed[backend] = self._admin("GET", backend, "/admin/sessions")["sessions"]
+            except requests.RequestException:
+                if backend not in self.ring or len(ring.nodes) == 1 and backend in ring:
+                    raise
+                unreachable.append(backend)
+                ring.remove(backend)
+
+        moved = 0
+        failed = 0
+        lost: List[str] = []
+        for backend, session_ids in listed.items():
+            moves: Dict[str, List[str]] = {}
+            for session_id in session_ids:
+                owner = ring.node_for(session_id)
+                if owner != backend:
+                    moves.setdefault(owner, []).append(session_id)
+            batches = [
+                (owner, ids[start:start + HANDOFF_BATCH])
+                for owner, ids in moves.items()
+                for start in range(0, len(ids), HANDOFF_BATCH)
+            ]
+            for index, (owner, batch) in enumerate(batches):
+                try:
+                    sessions = self._admin(
+                        "POST", backend, "/admin/sessions/export", {"session_ids": batch, "remove": True}
+                    )["sessions"]
+                except requests.RequestException:
+                    # The old worker went away mid-handoff; don't wait on it for every batch
+                    lost.extend(session_id for _, rest in batches[index:] for session_id in rest)
+                    break
+                try:
+                    self._admin("POST", owner, "/admin/sessions/import", {"sessions": sessions})
+                    moved += len(sessions)
+                except requests.RequestException:
+                    # Keep them where they were rather than lose them
+                    try:
+                        self._admin("POST", backend, "/admin/sessions/import", {"sessions": sessions})
+                        failed += len(sessions)
+                    except requests.RequestException:
+                        lost.extend(batch)
+        self.ring = ring
+        report = {
+            "change": change,
+            "moved": moved,
+            "failed": failed,
+            "lost": lost,
+            "unreachable": unreachable,
+            "seconds": round(time.perf_counter() - started, 3),
+            "backends": ring.nodes,
+        }
+        self.handoffs.append(report)
+        return report
+
+    def _admin(self, method: str, backend: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        headers = {"Authorization": f"Bearer {self.admin_token}"} if self.admin_token else {}
+        response = self.http.request(method, backend + path, json=payload, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backends": self.ring.nodes,
+            "replicas": self.ring.replicas,
+            "routed": dict(self.routed),
+            "handoffs": self.handoffs[-10:],
+        }
+
+
+def request_session_id() -> Tuple[Optional[str], Optional[bytes]]:
+    """Session id of the current request, and a rewritten body when the router assigned one."""
+    path = request.path
+    if path.startswith("/api/download/"):
+        return path[len("/api/download/"):].split("/")[0], None
+    body = request.get_data()
+    if path in ("/api/chat", "/api/chat/stream") and request.method == "POST":
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            return None, None
+        if not isinstance(data, dict):
+            return None, None
+        if data.get("session_id"):
+            return str(data["session_id"]), None
+        # The worker would make one up; pick it here so the session sticks
+        data["session_id"] = str(uuid.uuid4())
+        return data["session_id"], json.dumps(data).encode("utf-8")
+    if path == "/api/upload" and request.method == "POST":
+        environ = dict(request.environ, **{"wsgi.input": io.BytesIO(body), "CONTENT_LENGTH": str(len(body))})
+        _, form, _ = parse_form_data(environ)
+        return form.get("session_id") or None, None
+    return None, None
+
+
+def create_app(router: SessionRouter) -> Flask:
+    app = Flask(__name__)
+
+    def authorized() -> bool:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        return router.admin_token is not None and hmac.compare_digest(supplied, router.admin_token)
+
+    @app.route("/router/backends", methods=["GET", "POST", "DELETE"])
+    def backends():
+        if request.method == "GET":
+            return jsonify(router.get_stats())
+        if not authorized():
+            return jsonify({"error": "Unauthorized"}), 401
+        url = (request.get_json(silent=True) or {}).get("url")
+        if not url:
+            return jsonify({"error": "url is required"}), 400
+        try:
+            if request.method == "POST":
+                return jsonify(router.add_backend(url))
+            return jsonify(router.remove_backend(url))
+        except KeyError:
+            return jsonify({"error": f"{url} is not a backend"}), 404
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 409
+        except requests.RequestException as exc:
+            return jsonify({"error": f"handoff failed: {exc}"}), 502
+
+    @app.route("/", defaults={"path": ""}, methods=["GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS"])
+    @app.route("/<path:path>", methods=["GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS"])
+    def proxy(path):
+        session_id, body = request_session_id()
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP}
+        target = request.full_path if request.query_string else request.path
+        try:
+            backend, upstream = router.forward(
+                session_id, request.method, target, headers, body if body is not None else request.get_data()
+            )
+        except requests.RequestException as exc:
+            return jsonify({"error": f"backend unavailable: {exc}"}), 502
+
+        def relay() -> Iterator[bytes]:
+            try:
+                # chunk_size=None passes chunks on as they arrive (server-sent events)
+                yield from upstream.iter_content(chunk_size=None)
+            finally:
+                upstream.close()
+
+        response_headers = [
+            (name, value) for name, value in upstream.headers.items() if name.lower() not in HOP_BY_HOP
+        ]
+        return Response(relay(), status=upstream.status_code, headers=response_headers)
+
+    return app
+
+
+def spawn_fleet(workers: int, port: int, admin_token: str, timeout: float = 300) -> Tuple[subprocess.Popen, List[str]]:
+    """Start `agents.prefork` with one port per worker; returns the process and worker URLs."""
+    env = dict(os.environ, HF_LOAN_ADMIN_TOKEN=admin_token)
+    command = [sys.executable, "-m", "agents.prefork", "--workers", str(workers), "--port", str(port), "--port-per-worker"]
+    proc = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + timeout
+    urls = []
+    try:
+        while len(urls) < workers:
+            line = proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"worker fleet exited with {proc.wait()}")
+            event = json.loads(line)
+            if event.get("event") == "ready":
+                urls.append(f"http://127.0.0.1:{event['port']}")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"only {len(urls)} of {workers} workers ready after {timeout}s")
+    except BaseException:
+        proc.terminate()
+        raise
+    return proc, sorted(urls)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from werkzeug.serving import make_server
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backends", default="", help="comma-separated worker URLs")
+    parser.add_argument("--spawn", type=int, default=0, help="start this many workers with agents.prefork")
+    parser.add_argument("--backend-port", type=int, default=5101, help="first port of the spawned workers")
+    parser.add_argument("--replicas", type=int, default=160, help="virtual nodes per worker")
+    args = parser.parse_args(argv)
+
+    admin_token = os.getenv("HF_LOAN_ADMIN_TOKEN") or (secrets.token_hex(16) if args.spawn else None)
+    backends = [url for url in args.backends.split(",") if url]
+    fleet = None
+    if args.spawn:
+        fleet, spawned = spawn_fleet(args.spawn, args.backend_port, admin_token)
+        backends.extend(spawned)
+    if not backends:
+        parser.error("no backends: pass --backends or --spawn")
+
+    router = SessionRouter(backends, admin_token=admin_token, replicas=args.replicas)
+    server = make_server(args.host, args.port, create_app(router), threaded=True)
+    # shutdown() waits for serve_forever to return, so not from its thread
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    print(json.dumps({"event": "ready", "port": args.port, "backends": router.ring.nodes}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if fleet is not None:
+            fleet.terminate()
+            fleet.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Cache-friendly serving of the static folder.
+
+Replaces Flask's default static view so that every asset gets a strong
+ETag derived from its content, `If-None-Match` revalidation answers `304`
+without a body, text assets have a gzip variant compressed once up front,
+and URLs built with `url_for('static', ...)` carry a content fingerprint
+(`?v=<hash>`). Requests for the current fingerprint are marked immutable
+for a year, so returning users do not even revalidate; a changed file
+gets a new fingerprint and therefore a new URL.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from flask import Flask, abort, request
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Response
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+})
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+FINGERPRINT_LENGTH = 12
+
+
+def content_etag(data: bytes) -> str:
+    """Strong ETag value for `data` (hex SHA-256 prefix)."""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def file_etag(path: str, chunk_size: int = 1 << 16) -> str:
+    """`content_etag` of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+class Asset(NamedTuple):
+    body: bytes
+    gzip_body: Optional[bytes]  # None when compression does not pay off
+    etag: str
+    mimetype: str
+    mtime_ns: int
+    size: int
+
+    @property
+    def fingerprint(self) -> str:
+        return self.etag[:FINGERPRINT_LENGTH]
+
+
+class StaticAssets:
+    """Static files held in memory with their ETags and gzip variants.
+
+    Each asset is loaded on first use (or by `preload`) and reloaded when
+    its size or mtime changes on disk, so edits show up without a restart.
+    """
+
+    def __init__(self, static_folder: str, min_gzip_size: int = 256) -> None:
+        self.static_folder = static_folder
+        self.min_gzip_size = min_gzip_size
+        self._assets: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """Serve `app`'s static endpoint from here and fingerprint its URLs."""
+        app.view_functions["static"] = self.serve
+        app.url_defaults(self._add_fingerprint)
+        self.preload()
+
+    def preload(self) -> None:
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                if name.endswith(".gz"):
+                    continue
+                relative = os.path.relpath(os.path.join(root, name), self.static_folder)
+                self.get(relative.replace(os.sep, "/"))
+
+    def get(self, filename: str) -> Optional[Asset]:
+        """The current `Asset` for `filename`, or None if it does not exist."""
+        path = safe_join(self.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        asset = self._assets.get(filename)
+        if asset is not None and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+            return asset
+
+        with open(path, "rb") as fh:
+            body = fh.read()
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        gzip_body = None
+        if mimetype in COMPRESSIBLE_TYPES and len(body) >= self.min_gzip_size:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                gzip_body = compressed
+        asset = Asset(body, gzip_body, content_etag(body), mimetype, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self._assets[filename] = asset
+        return asset
+
+    def serve(self, filename: str) -> Response:
+        """View function for the static endpoint."""
+        asset = self.get(filename)
+        if asset is None:
+            abort(404)
+
+        body, etag = asset.body, asset.etag
+        use_gzip = asset.gzip_body is not None and request.accept_encodings["gzip"] > 0
+        if use_gzip:
+            # A different representation needs its own strong ETag.
+            body, etag = asset.gzip_body, f"{asset.etag}-gzip"
+
+        response = Response(body, mimetype=asset.mimetype)
+        response.set_etag(etag)
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        if asset.gzip_body is not None:
+            response.vary.add("Accept-Encoding")
+
+        if request.args.get("v") == asset.fingerprint:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    def _add_fingerprint(self, endpoint: str, values: Dict) -> None:
+        if endpoint != "static" or "v" in values or "filename" not in values:
+            return
+        asset = self.get(values["filename"])
+        if asset is not None:
+            values["v"] = asset.fingerprint
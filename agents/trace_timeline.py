@@ -0,0 +1,165 @@
+"""Build per-application timelines from the JSONL span log.
+
+Spans are grouped by session id (one loan application) and by trace (one
+request), and shown in one of three formats:
+
+- `text` (default): an indented span tree per request with start offsets,
+  durations and a bar placing each span on the request's timeline
+- `collapsed`: `root;child;leaf <self time in µs>` lines, the input format
+  of flamegraph.pl and speedscope
+- `chrome`: Trace Event Format JSON for chrome://tracing or Perfetto, one
+  row (thread) per application
+
+Usage:
+    python -m agents.trace_timeline cloud_storage/traces.jsonl --session <session_id>
+    python -m agents.trace_timeline cloud_storage/traces.jsonl --format collapsed > chat.folded
+    python -m agents.trace_timeline cloud_storage/traces.jsonl --format chrome -o trace.json
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+BAR_WIDTH = 40
+
+
+def load_spans(path: str, session_id: Optional[str] = None, trace_id: Optional[str] = None) -> List[Dict]:
+    spans = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a torn line from a crashed worker
+            if session_id is not None and record.get("session_id") != session_id:
+                continue
+            if trace_id is not None and record.get("trace_id") != trace_id:
+                continue
+            spans.append(record)
+    return spans
+
+
+def group_traces(spans: Iterable[Dict]) -> Dict[str, List[List[Dict]]]:
+    """session id -> that application's traces in time order, each a list of spans."""
+    traces: Dict[str, List[Dict]] = defaultdict(list)
+    for record in spans:
+        traces[record["trace_id"]].append(record)
+    sessions: Dict[str, List[List[Dict]]] = defaultdict(list)
+    for records in traces.values():
+        records.sort(key=lambda record: record["span_id"])
+        sessions[records[0].get("session_id") or "-"].append(records)
+    for session_traces in sessions.values():
+        session_traces.sort(key=lambda records: records[0]["start"])
+    return dict(sessions)
+
+
+def _children(records: List[Dict]) -> Dict[Optional[int], List[Dict]]:
+    children: Dict[Optional[int], List[Dict]] = defaultdict(list)
+    ids = {record["span_id"] for record in records}
+    for record in records:
+        parent = record.get("parent_id")
+        children[parent if parent in ids else None].append(record)
+    return children
+
+
+def render_text(sessions: Dict[str, List[List[Dict]]]) -> str:
+    lines = []
+    for session_id, traces in sessions.items():
+        total = sum(records[0]["duration_ms"] for records in traces)
+        lines.append(f"session {session_id}: {len(traces)} requests, {total:.1f} ms")
+        for records in traces:
+            children = _children(records)
+            root = records[0]
+            origin, span_ms = root["start"], max(root["duration_ms"], 1e-9)
+            lines.append(f"  trace {root['trace_id']}")
+
+            def walk(record, depth):
+                offset = 1000 * (record["start"] - origin)
+                begin = min(BAR_WIDTH - 1, int(BAR_WIDTH * offset / span_ms))
+                width = max(1, int(BAR_WIDTH * record["duration_ms"] / span_ms))
+                bar = " " * begin + "█" * min(width, BAR_WIDTH - begin)
+                error = f" [{record['error']}]" if record.get("error") else ""
+                label = "  " * depth + record["name"] + error
+                lines.append(
+                    f"    {bar:<{BAR_WIDTH}} {offset:>9.1f} {record['duration_ms']:>9.1f} ms  {label}"
+                )
+                for child in children.get(record["span_id"], ()):
+                    walk(child, depth + 1)
+
+            for top in children.get(None, ()):
+                walk(top, 0)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def render_collapsed(sessions: Dict[str, List[List[Dict]]]) -> str:
+    weights: Dict[str, int] = defaultdict(int)
+    for traces in sessions.values():
+        for records in traces:
+            children = _children(records)
+
+            def walk(record, prefix):
+                stack = f"{prefix};{record['name']}" if prefix else record["name"]
+                kids = children.get(record["span_id"], ())
+                self_ms = record["duration_ms"] - sum(child["duration_ms"] for child in kids)
+                weights[stack] += max(0, int(1000 * self_ms))
+                for child in kids:
+                    walk(child, stack)
+
+            for top in children.get(None, ()):
+                walk(top, "")
+    return "\n".join(f"{stack} {weight}" for stack, weight in sorted(weights.items()) if weight) + "\n"
+
+
+def render_chrome(sessions: Dict[str, List[List[Dict]]]) -> str:
+    events = []
+    for tid, (session_id, traces) in enumerate(sessions.items(), start=1):
+        events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": session_id}})
+        for records in traces:
+            for record in records:
+                args = dict(record.get("attrs", {}), trace_id=record["trace_id"])
+                if record.get("error"):
+                    args["error"] = record["error"]
+                events.append({
+                    "ph": "X",
+                    "name": record["name"],
+                    "pid": 1,
+                    "tid": tid,
+                    "ts": round(record["start"] * 1e6),
+                    "dur": round(record["duration_ms"] * 1000),
+                    "args": args,
+                })
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+RENDERERS = {"text": render_text, "collapsed": render_collapsed, "chrome": render_chrome}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="JSONL span log (HF_LOAN_TRACE_LOG)")
+    parser.add_argument("--session", help="only this application's session id")
+    parser.add_argument("--trace", help="only this trace id")
+    parser.add_argument("--format", choices=sorted(RENDERERS), default="text")
+    parser.add_argument("-o", "--output", help="write here instead of stdout")
+    args = parser.parse_args(argv)
+
+    sessions = group_traces(load_spans(args.log, args.session, args.trace))
+    if not sessions:
+        print("no matching spans", file=sys.stderr)
+        return 1
+    output = RENDERERS[args.format](sessions)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(output)
+    else:
+        sys.stdout.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Lightweight trace spans written to a local JSONL log.
+
+Each request handled with tracing on opens a root span (`Tracer.trace`)
+that carries the conversation's session id and a fresh trace id. Spans
+opened while it is active, by `span` or by methods wrapped with
+`trace_calls`, become its descendants: the current span lives in a
+context variable, so nothing has to be passed through the agents. When
+the root span closes, all spans of the trace are appended to the log in
+a single write, one JSON object per line:
+
+    {"trace_id": ..., "session_id": ..., "span_id": 2, "parent_id": 1,
+     "name": "crm.get_customer_by_phone", "start": 1700000000.123,
+     "duration_ms": 0.021}
+
+`start` is a Unix timestamp; `error` holds the exception type when the
+span raised. Outside a trace `span` returns a shared no-op and wrapped
+methods only pay a context variable lookup. `python -m
+agents.trace_timeline` turns the log into per-application timelines.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Trace:
+    __slots__ = ("trace_id", "session_id", "wall_start", "perf_start", "spans", "next_id")
+
+    def __init__(self, session_id: Optional[str]) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.wall_start = time.time()
+        self.perf_start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.next_id = 1
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attrs", "started", "_token")
+
+    def __init__(self, trace: _Trace, parent_id: Optional[int], name: str, attrs: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.span_id = trace.next_id
+        trace.next_id += 1
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.started = 0.0
+        self._token = None
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        ended = time.perf_counter()
+        _current.reset(self._token)
+        trace = self.trace
+        record = {
+            "trace_id": trace.trace_id,
+            "session_id": trace.session_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(trace.wall_start + (self.started - trace.perf_start), 6),
+            "duration_ms": round(1000 * (ended - self.started), 3),
+        }
+        if self.attrs:
+            record["attrs"] = self.attrs
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        trace.spans.append(record)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def span(name: str, **attrs: Any):
+    """Child span of the current span; a no-op outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        return _NULL_SPAN
+    return Span(parent.trace, parent.span_id, name, attrs)
+
+
+def current_trace_id() -> Optional[str]:
+    parent = _current.get()
+    return parent.trace.trace_id if parent is not None else None
+
+
+class Tracer:
+    """Opens root spans and appends finished traces to a JSONL file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.traces = 0
+        self.dropped = 0
+
+    def trace(self, name: str, session_id: Optional[str] = None, **attrs: Any) -> "_RootSpan":
+        """Root span of a new trace for `session_id`."""
+        return _RootSpan(self, _Trace(session_id), name, attrs)
+
+    def write(self, trace: _Trace) -> None:
+        # Children close before their parents, so restore start order
+        spans = sorted(trace.spans, key=lambda record: record["span_id"])
+        data = "".join(json.dumps(record, default=str) + "\n" for record in spans)
+        with self._lock:
+            try:
+                self._file.write(data)
+                self._file.flush()
+                self.traces += 1
+            except (OSError, ValueError):
+                self.dropped += 1
+                logger.exception("could not write trace %s", trace.trace_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class _RootSpan(Span):
+    __slots__ = ("tracer",)
+
+    def __init__(self, tracer: Tracer, trace: _Trace, name: str, attrs: Dict[str, Any]) -> None:
+        super().__init__(trace, None, name, attrs)
+        self.tracer = tracer
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        super().__exit__(exc_type, exc, tb)
+        self.tracer.write(self.trace)
+
+
+def trace_calls(obj: Any, component: str, methods: Optional[Iterable[str]] = None) -> Any:
+    """Record a span named `component.method` for calls to `obj`'s public methods.
+
+    Like `metrics.instrument`, the wrappers are set on the instance.
+    Returns `obj` for chaining.
+    """
+    if methods is None:
+        methods = [
+            name for name in dir(type(obj))
+            if not name.startswith("_") and callable(getattr(type(obj), name, None))
+        ]
+    for name in methods:
+        setattr(obj, name, _traced(getattr(obj, name), f"{component}.{name}"))
+    return obj
+
+
+def _traced(method, name: str):
+    get_current = _current.get
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        parent = get_current()
+        if parent is None:
+            return method(*args, **kwargs)
+        with Span(parent.trace, parent.span_id, name, {}):
+            return method(*args, **kwargs)
+
+    return wrapper
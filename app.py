@@ -1,19 +1,42 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+import functools
+import hmac
 import json
 import os
+import tracemalloc
+from contextlib import nullcontext
 from datetime import datetime
 import uuid
 
 # Import our AI agents
+from agents.admission import AdmissionController, Overloaded
 from agents.master_agent import MasterAgent
 from agents.sales_agent import SalesAgent
 from agents.verification_agent import VerificationAgent
 from agents.underwriting_agent import UnderwritingAgent
 from agents.sanction_letter_generator import SanctionLetterGenerator
 from agents.ml_model import LoanChatModel
+from agents.ml_batching import BatchingScheduler
+from agents.ml_service import ModelServiceClient
+from agents.faq_retriever import TieredResponder
 from agents.cloud_storage import CloudStorage
+from agents.conversation import Conversation
 from agents.manager_notify import ManagerNotifier
+from agents.memory_diagnostics import MemoryDiagnostics
+from agents.idempotency import BUSY, REPLAY, IdempotencyCache, SessionLocks
+from agents.pdf_renderer import PdfRenderPool
+from agents.profiling import PROFILE_HEADER, PROFILE_ID_HEADER, RequestProfiler
+from agents.static_assets import StaticAssets, file_etag
+from agents.tracing import Tracer, trace_calls
+from agents.metrics import (
+    AGENT_CALL_SECONDS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MOCK_API_SECONDS,
+    REGISTRY,
+    SESSION_TRANSITIONS,
+    instrument,
+)
 
 # Import mock APIs
 from mock_apis.crm_server import CRMServer
@@ -23,70 +46,364 @@ from mock_apis.offer_mart import OfferMart
 app = Flask(__name__)
 CORS(app)
 
+# Let a fronting web server (nginx X-Accel / Apache mod_xsendfile) send
+# downloads straight from disk instead of streaming them through Python
+app.config['USE_X_SENDFILE'] = os.getenv('HF_LOAN_X_SENDFILE', '0') == '1'
+
+# Serve static files with content-hash ETags, gzip variants and fingerprinted
+# (immutable) URLs; HF_LOAN_STATIC_CACHE=0 keeps Flask's default static view
+if os.getenv('HF_LOAN_STATIC_CACHE', '1') == '1':
+    StaticAssets(app.static_folder).init_app(app)
+
+# Trace allocations from startup (HF_LOAN_TRACEMALLOC=<frames>), so that
+# /admin/memory snapshots attribute the model and agents too
+if int(os.getenv('HF_LOAN_TRACEMALLOC', '0')) > 0:
+    tracemalloc.start(int(os.getenv('HF_LOAN_TRACEMALLOC')))
+
 # Initialize mock servers
 crm_server = CRMServer()
 credit_bureau = CreditBureau()
 offer_mart = OfferMart()
 
+# Concurrency limits with bounded queues for underwriting, sanction and ML
+# replies; turns beyond them get 503 + Retry-After (HF_LOAN_ADMISSION=0 disables)
+admission_controller = None
+if os.getenv('HF_LOAN_ADMISSION', '1') == '1':
+    admission_controller = AdmissionController()
+
 # Initialize AI agents
-master_agent = MasterAgent()
+master_agent = MasterAgent(admission=admission_controller)
 sales_agent = SalesAgent()
 verification_agent = VerificationAgent(crm_server)
 underwriting_agent = UnderwritingAgent(credit_bureau, offer_mart)
-sanction_generator = SanctionLetterGenerator()
 
-# Initialize Hugging Face-based ML model for fallback conversational responses
-ml_model = LoanChatModel()
+# Render PDFs in worker processes (HF_LOAN_PDF_WORKERS=0 renders in-process).
+# Nothing is started on import: the processes start with init_worker() or on
+# the first letter, so importing this module (tests, tools, a pre-fork
+# master) forks nothing.
+pdf_render_pool = None
+pdf_workers = int(os.getenv('HF_LOAN_PDF_WORKERS', str(os.cpu_count() or 1)))
+if pdf_workers > 0:
+    pdf_render_pool = PdfRenderPool(workers=pdf_workers)
 
 # Initialize local cloud storage and manager notifier
 cloud_storage = CloudStorage()
 manager_notifier = ManagerNotifier(cloud_storage)
 
+# Rendered PDFs are written once, into cloud storage, and served from there
+sanction_generator = SanctionLetterGenerator(render_pool=pdf_render_pool, storage=cloud_storage)
+
+# Initialize Hugging Face-based ML model for fallback conversational responses
+if os.getenv('HF_LOAN_MODEL_SERVICE'):
+    # Inference runs in a separate model service (python -m agents.ml_service),
+    # so this web worker never loads the model weights itself.
+    ml_model = ModelServiceClient()
+else:
+    ml_model = LoanChatModel()
+
+    # Optionally micro-batch concurrent generations (HF_LOAN_BATCH_MAX_SIZE > 1)
+    if int(os.getenv('HF_LOAN_BATCH_MAX_SIZE', '1')) > 1:
+        ml_model = BatchingScheduler(ml_model)
+
+# Answer confidently matched loan FAQs without running the model
+if os.getenv('HF_LOAN_FAQ_TIER', '1') == '1':
+    ml_model = TieredResponder(ml_model)
+
 # Store active conversations
 active_conversations = {}
 
+# Latency histograms for agent and mock API calls, served at /metrics
+# (phase timings are recorded by MasterAgent, render times by the PDF pool).
+# The sales agent only formats replies in memory; the sales phase timing
+# covers it without a histogram update per method call on every turn.
+metrics_enabled = os.getenv('HF_LOAN_METRICS', '1') == '1'
+if metrics_enabled:
+    instrument(crm_server, MOCK_API_SECONDS, 'crm')
+    instrument(credit_bureau, MOCK_API_SECONDS, 'credit_bureau')
+    instrument(offer_mart, MOCK_API_SECONDS, 'offer_mart')
+    instrument(verification_agent, AGENT_CALL_SECONDS, 'verification')
+    instrument(underwriting_agent, AGENT_CALL_SECONDS, 'underwriting')
+    instrument(sanction_generator, AGENT_CALL_SECONDS, 'sanction_letter')
+    instrument(cloud_storage, AGENT_CALL_SECONDS, 'cloud_storage')
+    instrument(ml_model, AGENT_CALL_SECONDS, 'ml_model', methods=['generate_response'])
+
+    def sessions_by_status():
+        counts = {}
+        for conversation in list(active_conversations.values()):
+            key = (conversation.get('status', 'unknown'),)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    REGISTRY.gauge_callback('loan_active_sessions', 'Conversations held in memory, by status.', ['status'], sessions_by_status)
+    if admission_controller is not None:
+        REGISTRY.gauge_callback(
+            'loan_admission_turns', 'Chat turns running or queued on an admission-limited path.',
+            ['path', 'state'], admission_controller.occupancy,
+        )
+
+# Trace spans per request, correlated by session and trace id, appended to a
+# JSONL log (see agents.trace_timeline); off unless HF_LOAN_TRACE_LOG is set
+tracer = None
+if os.getenv('HF_LOAN_TRACE_LOG'):
+    tracer = Tracer(os.getenv('HF_LOAN_TRACE_LOG'))
+    trace_calls(crm_server, 'crm')
+    trace_calls(credit_bureau, 'credit_bureau')
+    trace_calls(offer_mart, 'offer_mart')
+    trace_calls(sales_agent, 'sales')
+    trace_calls(verification_agent, 'verification')
+    trace_calls(underwriting_agent, 'underwriting')
+    trace_calls(sanction_generator, 'sanction_letter')
+    trace_calls(cloud_storage, 'cloud_storage')
+    trace_calls(manager_notifier, 'manager_notify')
+    trace_calls(ml_model, 'ml_model', methods=['generate_response'])
+
+# Replay cache for requests sent with an Idempotency-Key header, and
+# per-session locks so that requests for one session never interleave
+idempotency_cache = IdempotencyCache(
+    max_entries=int(os.getenv('HF_LOAN_IDEMPOTENCY_ENTRIES', '4096')),
+    ttl_seconds=float(os.getenv('HF_LOAN_IDEMPOTENCY_TTL', '3600')),
+    wait_seconds=float(os.getenv('HF_LOAN_IDEMPOTENCY_WAIT', '30')),
+)
+session_locks = SessionLocks()
+
+# Admin endpoints (/admin/...) are only served when a token is configured and
+# require it as `Authorization: Bearer <token>`
+admin_token = os.getenv('HF_LOAN_ADMIN_TOKEN') or None
+
+# Opt-in profiling of /api/chat: on demand with the admin token in the
+# X-Profile-Request header, or one request in HF_LOAN_PROFILE_SAMPLE
+request_profiler = None
+profile_sample_every = int(os.getenv('HF_LOAN_PROFILE_SAMPLE', '0'))
+if admin_token or profile_sample_every > 0:
+    request_profiler = RequestProfiler(
+        token=admin_token,
+        sample_every=profile_sample_every,
+        capacity=int(os.getenv('HF_LOAN_PROFILE_BUFFER', '32')),
+    )
+
+# Per-structure memory sizes and tracemalloc snapshots for /admin/memory
+memory_diagnostics = MemoryDiagnostics(
+    {
+        'active_conversations': lambda: active_conversations,
+        'verification_status': lambda: verification_agent.verification_status,
+        'sanction_jobs': lambda: master_agent.sanction_jobs,
+    },
+    model=ml_model,
+)
+
+def admin_required(view):
+    """Serve `view` only to requests carrying the admin token"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if admin_token is None:
+            return jsonify({'error': 'Admin endpoints are disabled'}), 404
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, admin_token):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def trace_request(session_id):
+    """Root trace span for the current request, or a no-op when tracing is off"""
+    if tracer is None:
+        return nullcontext()
+    return tracer.trace(f'{request.method} {request.url_rule.rule}', session_id)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    data = request.json
-    user_message = data.get('message', '')
-    session_id = data.get('session_id', str(uuid.uuid4()))
-    
-    # Initialize conversation if new session
+def get_conversation(session_id):
+    """Return the conversation for `session_id`, creating it if new"""
     if session_id not in active_conversations:
-        active_conversations[session_id] = {
-            'status': 'initial',
-            'customer_data': {},
-            'loan_details': {},
-            'verification_status': False,
-            'underwriting_status': False,
-            'sanction_letter': None
-        }
-        # keep session id inside conversation data for easier packaging
-        active_conversations[session_id]['session_id'] = session_id
-    
-    # Get response from Master Agent
-    response = master_agent.process_message(
-        user_message,
-        session_id,
-        active_conversations[session_id],
-        sales_agent,
-        verification_agent,
-        underwriting_agent,
-        sanction_generator,
-        ml_model=ml_model,
-    )
-    
-    return jsonify({
-        'response': response['message'],
+        # Slotted record: starts 'initial' with empty customer and loan details;
+        # the session id is kept inside for easier packaging
+        active_conversations[session_id] = Conversation(session_id=session_id)
+        SESSION_TRANSITIONS.labels('initial').inc()
+    return active_conversations[session_id]
+
+def chat_payload(response, session_id, message=None):
+    """Build the JSON body returned to the chat UI for an agent response"""
+    payload = {
+        'response': message if message is not None else response['message'],
         'session_id': session_id,
         'status': active_conversations[session_id]['status'],
         'requires_input': response.get('requires_input', False),
         'input_type': response.get('input_type', None)
+    }
+    # Replies that ran through several phases in one request
+    if 'messages' in response:
+        payload['messages'] = response['messages']
+    if 'phase_timings' in response:
+        payload['phase_timings'] = response['phase_timings']
+    # A later phase was shed: send any message after this many seconds to continue
+    if 'retry_after' in response:
+        payload['retry_after'] = response['retry_after']
+    return payload
+
+def idempotency_key(scope, session_id):
+    """Replay-cache key for this request, or None without an Idempotency-Key header"""
+    key = request.headers.get('Idempotency-Key')
+    return f'{scope}:{session_id}:{key}' if key else None
+
+@app.errorhandler(Overloaded)
+def overloaded_response(error):
+    """A limited path is saturated: ask the client to retry the same request later"""
+    response = jsonify({
+        'error': 'We are handling a lot of applications right now, please retry shortly',
+        'path': error.path,
+        'retry_after': error.retry_after,
     })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def duplicate_busy_response():
+    response = jsonify({'error': 'An identical request is still being processed, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 409
+
+def run_idempotent(key, session_id, handler):
+    """Run `handler` (returning a JSON body and status) at most once per idempotency key.
+
+    Repeats of a completed request get the stored response; concurrent
+    repeats wait for the first one to finish.
+    """
+    if key is None:
+        with session_locks.hold(session_id):
+            body, status = handler()
+        return jsonify(body), status
+
+    outcome, stored = idempotency_cache.begin(key)
+    if outcome == BUSY:
+        return duplicate_busy_response()
+    if outcome == REPLAY:
+        body, status = stored
+        response = jsonify(body)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response, status
+
+    try:
+        with session_locks.hold(session_id):
+            body, status = handler()
+    except Exception:
+        idempotency_cache.abandon(key)
+        raise
+    idempotency_cache.finish(key, (body, status))
+    return jsonify(body), status
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    data = request.json
+    user_message = data.get('message', '')
+    session_id = data.get('session_id', str(uuid.uuid4()))
+
+    def handle():
+        # Initialize conversation if new session
+        conversation = get_conversation(session_id)
+
+        # Get response from Master Agent
+        response = master_agent.process_message(
+            user_message,
+            session_id,
+            conversation,
+            sales_agent,
+            verification_agent,
+            underwriting_agent,
+            sanction_generator,
+            ml_model=ml_model,
+        )
+        return chat_payload(response, session_id), 200
+
+    def run():
+        with trace_request(session_id):
+            return run_idempotent(key, session_id, handle)
+
+    key = idempotency_key('chat', session_id)
+    trigger = request_profiler.wants(request.headers.get(PROFILE_HEADER)) if request_profiler else None
+    if trigger is None:
+        return run()
+
+    result, profile_id = request_profiler.run(run, trigger, request.path, session_id)
+    response = app.make_response(result)
+    if profile_id is not None:
+        response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /api/chat, but ML replies are streamed token by token as server-sent events.
+
+    Emits `token` events ({"text": ...}) while the reply is generated and a
+    final `done` event carrying the same payload as /api/chat. Shares its
+    idempotency keys with /api/chat.
+    """
+    data = request.json
+    user_message = data.get('message', '')
+    session_id = data.get('session_id', str(uuid.uuid4()))
+
+    key = idempotency_key('chat', session_id)
+    if key is not None:
+        outcome, stored = idempotency_cache.begin(key)
+        if outcome == BUSY:
+            return duplicate_busy_response()
+        if outcome == REPLAY:
+            replay = sse_response(iter([sse_event('done', stored[0])]))
+            replay.headers['Idempotent-Replayed'] = 'true'
+            return replay
+
+    try:
+        with trace_request(session_id), session_locks.hold(session_id):
+            conversation = get_conversation(session_id)
+            response = master_agent.process_message(
+                user_message,
+                session_id,
+                conversation,
+                sales_agent,
+                verification_agent,
+                underwriting_agent,
+                sanction_generator,
+                ml_model=ml_model,
+                stream=True,
+            )
+    except Exception:
+        if key is not None:
+            idempotency_cache.abandon(key)
+        raise
+
+    finished = []
+
+    def events():
+        message = response.get('message', '')
+        for kind, text in response.get('message_stream', ()):
+            if kind == 'token':
+                yield sse_event('token', {'text': text})
+            else:
+                message = text
+        payload = chat_payload(response, session_id, message)
+        if key is not None:
+            idempotency_cache.finish(key, (payload, 200))
+            finished.append(True)
+        yield sse_event('done', payload)
+
+    def release_key():
+        # Client went away before the reply was complete: let a retry run it.
+        if not finished:
+            idempotency_cache.abandon(key)
+
+    stream_response = sse_response(events())
+    if key is not None:
+        stream_response.call_on_close(release_key)
+    return stream_response
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
@@ -98,20 +415,24 @@ def upload_file():
     
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
-    
-    # Save to local cloud storage (simulated)
-    saved_path = cloud_storage.save_file(file.stream, file.filename, metadata={'session_id': session_id})
-
-    # Update conversation status and record saved filename
-    if session_id in active_conversations:
-        active_conversations[session_id]['salary_slip_uploaded'] = True
-        active_conversations[session_id].setdefault('uploaded_files', []).append(saved_path)
-
-    return jsonify({
-        'message': 'File uploaded successfully',
-        'filename': os.path.basename(saved_path),
-        'saved_path': saved_path
-    })
+
+    def handle():
+        # Save to local cloud storage (simulated)
+        saved_path = cloud_storage.save_file(file.stream, file.filename, metadata={'session_id': session_id})
+
+        # Update conversation status and record saved filename
+        if session_id in active_conversations:
+            active_conversations[session_id]['salary_slip_uploaded'] = True
+            active_conversations[session_id].setdefault('uploaded_files', []).append(saved_path)
+
+        return {
+            'message': 'File uploaded successfully',
+            'filename': os.path.basename(saved_path),
+            'saved_path': saved_path
+        }, 200
+
+    with trace_request(session_id):
+        return run_idempotent(idempotency_key('upload', session_id), session_id, handle)
 
 @app.route('/api/download/<session_id>')
 def download_sanction_letter(session_id):
@@ -120,16 +441,198 @@ def download_sanction_letter(session_id):
     
     conversation = active_conversations[session_id]
     if not conversation.get('sanction_letter'):
+        if conversation.get('sanction_letter_status') == 'generating':
+            response = jsonify({'status': 'generating', 'message': 'Sanction letter is being generated'})
+            response.headers['Retry-After'] = '1'
+            return response, 202
         return jsonify({'error': 'No sanction letter available'}), 404
 
-    # Serve the sanction letter file
-    return send_file(conversation['sanction_letter'], as_attachment=True)
+    # Stored letters never change, so their content hash is computed once
+    if 'sanction_letter_etag' not in conversation:
+        conversation['sanction_letter_etag'] = file_etag(conversation['sanction_letter'])
+
+    # Serve the stored letter itself. `conditional` answers Range requests
+    # (206) and If-None-Match / If-Modified-Since (304); the file is handed
+    # to the server's wsgi.file_wrapper, which uses sendfile where supported.
+    response = send_file(
+        conversation['sanction_letter'],
+        mimetype='application/pdf',
+        as_attachment=True,
+        conditional=True,
+        etag=conversation['sanction_letter_etag'],
+    )
+    response.cache_control.private = True
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: phase, agent, mock API and PDF render latencies and session counters"""
+    if not metrics_enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/admin/profiles')
+@admin_required
+def list_profiles():
+    """Stored /api/chat profiles, newest first"""
+    if request_profiler is None:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    return jsonify({'stats': request_profiler.get_stats(), 'profiles': request_profiler.list()})
+
+@app.route('/admin/profiles/<profile_id>')
+@admin_required
+def get_profile(profile_id):
+    """One profile as pstats text (?sort=, ?limit=) or as a pstats file (?format=pstats)"""
+    record = request_profiler.get(profile_id) if request_profiler else None
+    if record is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'pstats':
+        return Response(
+            record.stats,
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': f'attachment; filename=chat-{record.id}.pstats'},
+        )
+    try:
+        text = request_profiler.render_text(
+            record, request.args.get('sort', 'cumulative'), request.args.get('limit', 40, type=int)
+        )
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return Response(text, mimetype='text/plain')
+
+@app.route('/admin/memory')
+@admin_required
+def memory_report():
+    """Process RSS, sizes of the in-memory structures and the model, and tracemalloc state"""
+    return jsonify(memory_diagnostics.report())
+
+@app.route('/admin/memory/tracemalloc', methods=['POST'])
+@admin_required
+def control_tracemalloc():
+    """Start (`{"action": "start", "frames": N}`) or stop tracemalloc"""
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    try:
+        if action == 'start':
+            memory_diagnostics.start_tracing(int(data.get('frames', 1)))
+        elif action == 'stop':
+            memory_diagnostics.stop_tracing()
+        else:
+            return jsonify({'error': 'action must be "start" or "stop"'}), 400
+    except RuntimeError as exc:
+        return jsonify({'error': str(exc)}), 409
+    return jsonify(memory_diagnostics.tracing_stats())
+
+@app.route('/admin/memory/snapshots', methods=['GET', 'POST'])
+@admin_required
+def memory_snapshots():
+    """List tracemalloc snapshots, or take one (POST, optional `{"label": ...}`)"""
+    if request.method == 'GET':
+        return jsonify({'snapshots': memory_diagnostics.list_snapshots()})
+    data = request.get_json(silent=True) or {}
+    try:
+        record = memory_diagnostics.take_snapshot(data.get('label'))
+    except RuntimeError as exc:
+        return jsonify({'error': str(exc)}), 409
+    return jsonify(record.summary()), 201
+
+@app.route('/admin/memory/snapshots/<int:snapshot_id>')
+@admin_required
+def memory_snapshot_top(snapshot_id):
+    """Largest allocation sites in a snapshot (?key=lineno|filename|traceback, ?limit=)"""
+    try:
+        return jsonify(memory_diagnostics.top(
+            snapshot_id, request.args.get('key', 'lineno'), request.args.get('limit', 20, type=int)
+        ))
+    except KeyError:
+        return jsonify({'error': 'Snapshot not found'}), 404
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+@app.route('/admin/memory/snapshots/<int:first_id>/diff/<int:second_id>')
+@admin_required
+def memory_snapshot_diff(first_id, second_id):
+    """Allocation sites that grew most between two snapshots (?key=, ?limit=)"""
+    try:
+        return jsonify(memory_diagnostics.compare(
+            first_id, second_id, request.args.get('key', 'lineno'), request.args.get('limit', 20, type=int)
+        ))
+    except KeyError:
+        return jsonify({'error': 'Snapshot not found'}), 404
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+@app.route('/admin/sessions')
+@admin_required
+def list_sessions():
+    """Ids of the conversations held by this worker (for the session router's handoff)"""
+    return jsonify({'sessions': list(active_conversations)})
+
+@app.route('/admin/sessions/export', methods=['POST'])
+@admin_required
+def export_sessions():
+    """State of the conversations in `{"session_ids": [...]}`; `"remove": true` hands them off"""
+    data = request.get_json(silent=True) or {}
+    remove = bool(data.get('remove'))
+    exported = {}
+    for session_id in data.get('session_ids', []):
+        # Not while a turn for the session is running
+        with session_locks.hold(session_id):
+            conversation = active_conversations.get(session_id)
+            if conversation is None:
+                continue
+            exported[session_id] = conversation.to_dict()
+            if remove:
+                del active_conversations[session_id]
+                # A pending render is not carried over; the new owner submits it again
+                master_agent.sanction_jobs.pop(session_id, None)
+    return jsonify({'sessions': exported})
+
+@app.route('/admin/sessions/import', methods=['POST'])
+@admin_required
+def import_sessions():
+    """Take over conversations exported by another worker (`{"sessions": {id: state}}`)"""
+    data = request.get_json(silent=True) or {}
+    sessions = data.get('sessions', {})
+    for session_id, state in sessions.items():
+        with session_locks.hold(session_id):
+            active_conversations[session_id] = Conversation.from_dict(state)
+    return jsonify({'imported': len(sessions)})
 
 @app.route('/api/customers')
 def get_customers():
     """API endpoint to view dummy customer data"""
     return jsonify(crm_server.get_all_customers())
 
+@app.route('/api/admission/stats')
+def get_admission_stats():
+    """API endpoint exposing per-path concurrency, queue depth and rejection counts"""
+    if admission_controller is None:
+        return jsonify({'error': 'Admission control is disabled'}), 404
+    return jsonify(admission_controller.get_stats())
+
+@app.route('/api/ml/stats')
+def get_ml_stats():
+    """API endpoint exposing ML model availability and response cache metrics"""
+    return jsonify(ml_model.get_stats())
+
+def init_worker():
+    """Start what a serving process needs for itself (its PDF render pool) ahead of the first request"""
+    if pdf_render_pool is not None:
+        pdf_render_pool.start()
+
+def close_worker():
+    """Stop the worker's PDF render pool when the worker shuts down"""
+    if pdf_render_pool is not None:
+        pdf_render_pool.close()
+
+def create_app():
+    """The WSGI application; under a pre-fork server call init_worker() in each worker"""
+    return app
+
 if __name__ == '__main__':
+    # The reloader's watcher process never serves; only the serving child starts the pool
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        init_worker()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
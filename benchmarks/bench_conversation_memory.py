@@ -0,0 +1,158 @@
+"""Memory per session: dict-of-dicts conversations vs the slotted records.
+
+Builds `--sessions` conversations keyed by session id, the way
+`app.active_conversations` holds them, once as the nested dicts the app
+used to create and once as `agents.conversation.Conversation` records,
+and reports the bytes allocated per session (measured with tracemalloc,
+so only the sessions themselves are counted). `state_bytes_per_session`
+leaves out the session id and its slot in the sessions dict, which cost
+the same either way. Three states are measured:
+`idle` (just created), `sales` (customer and loan details filled in) and
+`completed` (underwriting result, sanction letter and package recorded).
+Both representations hold the same values; only their layout differs.
+
+The JSON round trip used for persistence is timed as well.
+
+Usage:
+    python -m benchmarks.bench_conversation_memory --sessions 1000000
+    python -m benchmarks.bench_conversation_memory --sessions 200000 --states idle
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from agents.conversation import Conversation
+
+NOTES = [
+    'Credit score 780 meets minimum requirement',
+    'Loan amount within acceptable range',
+    'EMI within 50% of monthly income',
+    'Tenure within allowed range',
+]
+
+
+def legacy_conversation(session_id):
+    """The dict `get_conversation` used to create"""
+    return {
+        'status': 'initial',
+        'customer_data': {},
+        'loan_details': {},
+        'verification_status': False,
+        'underwriting_status': False,
+        'sanction_letter': None,
+        'session_id': session_id,
+    }
+
+
+def advance(conversation, index, state):
+    if state == 'idle':
+        return
+    customer = conversation['customer_data']
+    customer['name'] = 'Rajesh Kumar'
+    customer['phone'] = f'98{index:08d}'
+    customer['employment'] = 'salaried'
+    customer['monthly_income'] = 80000 + index % 1000
+    loan = conversation['loan_details']
+    loan['amount'] = 500000
+    loan['tenure'] = 36
+    conversation['status'] = 'verification'
+    if state == 'sales':
+        return
+    conversation['verification_status'] = True
+    conversation['underwriting_status'] = True
+    conversation['underwriting_result'] = {
+        'approved': True,
+        'credit_score': 780,
+        'pre_approved_limit': 800000,
+        'approved_amount': 500000,
+        'interest_rate': 10.99,
+        'tenure': 36,
+        'emi': 16367,
+        'total_amount': 589212,
+        'total_interest': 89212,
+        'processing_fee': 10000,
+        'approval_conditions': ['Standard approval based on pre-approved limit'],
+        'underwriting_notes': list(NOTES),
+    }
+    conversation['sanction_letter'] = f'cloud_storage/documents/sanction_letter_{index}.pdf'
+    conversation['sanction_letter_status'] = 'ready'
+    conversation['uploaded_files'] = [f'cloud_storage/files/{index}_salary_slip.pdf']
+    conversation['package_path'] = f'cloud_storage/packages/{index}'
+    conversation['status'] = 'completed'
+
+
+def session_ids(count):
+    return [f'{index:08x}-0000-4000-8000-{index:012x}' for index in range(count)]
+
+
+def measure(factory, ids, state):
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    sessions = {}
+    for index, session_id in enumerate(ids):
+        conversation = factory(session_id)
+        if conversation is not None:
+            advance(conversation, index, state)
+        sessions[session_id] = conversation
+    elapsed = time.perf_counter() - start
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = after - before
+    return sessions, {
+        'total_mb': round(total / (1024 * 1024), 1),
+        'bytes_per_session': round(total / len(ids), 1),
+        'build_seconds': round(elapsed, 3),
+    }
+
+
+def json_round_trip(sessions, sample=10000):
+    conversations = list(sessions.values())[:sample]
+    start = time.perf_counter()
+    encoded = [conversation.to_json() for conversation in conversations]
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = [Conversation.from_json(text) for text in encoded]
+    decode = time.perf_counter() - start
+    assert all(a.to_dict() == b.to_dict() for a, b in zip(conversations, decoded))
+    return {
+        'sessions': len(conversations),
+        'to_json_us': round(1e6 * encode / len(conversations), 2),
+        'from_json_us': round(1e6 * decode / len(conversations), 2),
+        'json_bytes': round(sum(len(text) for text in encoded) / len(encoded), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1000000)
+    parser.add_argument('--states', default='idle,sales,completed', help='comma-separated: idle, sales, completed')
+    args = parser.parse_args()
+
+    ids = session_ids(args.sessions)
+    # Session ids in a dict without any state
+    keys_only = measure(lambda session_id: None, ids, 'idle')[1]['bytes_per_session']
+    report = {'sessions': args.sessions, 'keys_only_bytes_per_session': keys_only, 'states': {}}
+    for state in args.states.split(','):
+        legacy = measure(legacy_conversation, ids, state)[1]
+        sessions, slotted = measure(lambda session_id: Conversation(session_id=session_id), ids, state)
+        for result in (legacy, slotted):
+            result['state_bytes_per_session'] = round(result['bytes_per_session'] - keys_only, 1)
+        report['states'][state] = {
+            'dict': legacy,
+            'slotted': slotted,
+            'reduction': round(legacy['bytes_per_session'] / slotted['bytes_per_session'], 2),
+            'state_reduction': round(legacy['state_bytes_per_session'] / slotted['state_bytes_per_session'], 2),
+            'json': json_round_trip(sessions),
+        }
+        del sessions
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
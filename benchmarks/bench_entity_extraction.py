@@ -0,0 +1,127 @@
+"""Microbenchmark MasterAgent slot extraction.
+
+Compares the previous per-slot helpers (one regex scan per slot plus a
+word-by-word name split) with the single-pass `EntityExtractor`, on a
+fixed set of sales-phase messages. Also reports how many slots each
+approach recovers from the same messages.
+
+Usage:
+    python -m benchmarks.bench_entity_extraction --repeat 2000
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+from agents.entity_extractor import EntityExtractor
+from agents.master_agent import SALES_SLOTS, MasterAgent
+from agents.metrics import summarize_latencies
+
+MESSAGES = [
+    "Rajesh, 9876543210, 5 lakhs for 36 months, salaried, 80000/month",
+    "My name is Priya Sharma",
+    "rajesh kumar",
+    "my number is 9876543210",
+    "+91 98765 43210",
+    "I need 2.5L",
+    "Rs. 5,00,000 please",
+    "500000",
+    "3 years",
+    "24",
+    "salaried",
+    "around 75,000 per month",
+    "50000",
+    "I would like a loan of 8 lakhs over 48 months",
+]
+
+SLOTS = ('name', 'phone', 'amount', 'tenure', 'monthly_income')
+
+
+def legacy_extract(text):
+    """The pre-extractor helpers, applied to lowercased text as before."""
+    text = text.lower().strip()
+    slots = {}
+    name_words = []
+    for word in text.split():
+        clean_word = word.strip('.,!?;:\'"')
+        if clean_word and clean_word[0].isupper() and len(clean_word) > 1:
+            name_words.append(clean_word)
+    if name_words:
+        slots['name'] = ' '.join(name_words)
+    phone_match = re.search(r'\b\d{10}\b', text)
+    if phone_match:
+        slots['phone'] = phone_match.group()
+    for key, low, high in (('amount', 10000, 4000000), ('tenure', 6, 60), ('income', 10000, 1000000)):
+        for num in re.findall(r'\d+', text):
+            if low <= int(num) <= high:
+                slots[key] = int(num)
+                break
+    return slots
+
+
+def extractor_extract(agent, text):
+    """One extraction pass, then every slot matched from it as `_fill_sales_slots` does."""
+    entities = agent.entity_extractor.extract(text.strip(), expect_name=True)
+    by_kind = {}
+    for entity in entities:
+        by_kind.setdefault(entity.kind, []).append(entity)
+    slots = {}
+    used = set()
+    for slot in SALES_SLOTS:
+        entity = agent._match_slot(slot, by_kind, used=used)
+        if entity is not None and slot.key in SLOTS:
+            used.add(entity)
+            slots[slot.key] = slot.convert(entity.value)
+    return slots
+
+
+def measure(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for message in MESSAGES:
+            start = time.perf_counter()
+            fn(message)
+            latencies.append(time.perf_counter() - start)
+    result = summarize_latencies(latencies)
+    result['messages_per_sec'] = round(len(latencies) / sum(latencies), 1) if latencies else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000, help='passes over the message set')
+    args = parser.parse_args()
+
+    agent = MasterAgent()
+    extractor = EntityExtractor()
+
+    # Warm-up, not measured.
+    for message in MESSAGES:
+        legacy_extract(message)
+        extractor_extract(agent, message)
+
+    report = {
+        'messages': len(MESSAGES),
+        'legacy': measure(legacy_extract, args.repeat),
+        'extractor': measure(lambda m: extractor_extract(agent, m), args.repeat),
+        'extract_only': measure(extractor.extract, args.repeat),
+        'slots_found': {
+            'legacy': sum(len(legacy_extract(m)) for m in MESSAGES),
+            'extractor': sum(len(extractor_extract(agent, m)) for m in MESSAGES),
+        },
+        'samples': [
+            {'message': m, 'entities': [e._asdict() for e in extractor.extract(m)]}
+            for m in MESSAGES[:3]
+        ],
+    }
+    report['speedup_mean'] = (
+        round(report['legacy']['mean_ms'] / report['extractor']['mean_ms'], 2)
+        if report['extractor']['mean_ms'] else None
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
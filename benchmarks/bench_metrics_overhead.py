@@ -0,0 +1,206 @@
+"""Overhead of the /metrics instrumentation on the chat path.
+
+Plays the scripted sales conversations from `bench_sales_round_trips`
+with and without instrumentation: `instrumented` records the phase
+histogram and status counters as the app does (the app does not time
+the sales agent's methods), `baseline` swaps those metrics for no-ops.
+The sales phase is pure CPU (verification and underwriting add seconds
+of simulated API delay), so it is the worst case for relative overhead.
+
+Two workloads are measured: `agent` calls `MasterAgent.process_message`
+directly, `http` posts each message through a Flask test client to a
+`/api/chat` route shaped like the app's. Rounds alternate between the
+two modes and the fastest round of each is compared. Because that
+difference is within timing noise on a busy machine, an `estimated`
+overhead is also reported: the number of metric updates per turn times
+the measured cost of one update, relative to the turn latency.
+Each is checked against the 1% target (`meets_target`).
+
+Usage:
+    python -m benchmarks.bench_metrics_overhead --rounds 15 --repeat 100
+"""
+import argparse
+import json
+import sys
+import time
+
+from flask import Flask, jsonify, request
+
+import agents.master_agent as master_agent_module
+from agents.master_agent import MasterAgent
+from agents.metrics import Histogram
+from agents.sales_agent import SalesAgent
+from benchmarks.bench_sales_round_trips import SCRIPTS, play
+
+PHASE_METRICS = ('PHASE_SECONDS', 'SESSION_TRANSITIONS', 'UNDERWRITING_DECISIONS')
+TARGET_PCT = 1.0
+
+
+class NullMetric:
+    def labels(self, *values):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1.0):
+        pass
+
+
+def new_conversation():
+    return {'status': 'initial', 'customer_data': {}, 'loan_details': {}}
+
+
+def play_agent(agent, sales_agent, repeat):
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, opening, answers in SCRIPTS:
+            turns += play(agent, sales_agent, opening, answers)[0]
+    return time.perf_counter() - start, turns
+
+
+def make_app(agent, sales_agent):
+    app = Flask(__name__)
+    conversations = {}
+
+    @app.route('/api/chat', methods=['POST'])
+    def chat():
+        data = request.json
+        session_id = data['session_id']
+        conversation = conversations.setdefault(session_id, new_conversation())
+        response = agent.process_message(data['message'], session_id, conversation, sales_agent, None, None, None)
+        return jsonify({
+            'response': response['message'],
+            'session_id': session_id,
+            'status': conversation['status'],
+            'requires_input': response.get('requires_input', False),
+        })
+
+    return app.test_client(), conversations
+
+
+def play_http(client, conversations, repeat):
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for index, (_, opening, answers) in enumerate(SCRIPTS):
+            conversations.clear()
+            for message in opening + answers:
+                turns += 1
+                status = client.post('/api/chat', json={'message': message, 'session_id': str(index)}).get_json()['status']
+                if status == 'verification':
+                    break
+    return time.perf_counter() - start, turns
+
+
+def compare(run_baseline, run_instrumented, set_metrics, rounds):
+    baseline, instrumented = [], []
+    turns = 0
+    for _ in range(rounds):
+        set_metrics(False)
+        seconds, turns = run_baseline()
+        baseline.append(seconds)
+        set_metrics(True)
+        seconds, _ = run_instrumented()
+        instrumented.append(seconds)
+    best_baseline, best_instrumented = min(baseline), min(instrumented)
+    return {
+        'turns_per_round': turns,
+        'baseline_turn_us': round(1e6 * best_baseline / turns, 2),
+        'instrumented_turn_us': round(1e6 * best_instrumented / turns, 2),
+        'overhead_pct': round(100 * (best_instrumented / best_baseline - 1), 2),
+    }
+
+
+def per_call_ns(fn, samples=200000):
+    start = time.perf_counter()
+    for _ in range(samples):
+        fn()
+    return 1e9 * (time.perf_counter() - start) / samples
+
+
+def metric_update_cost_ns():
+    """Cost of one labelled histogram update, as `_timed_dispatch` records per phase.
+
+    The phase is timed for `phase_timings` with or without metrics, so
+    only the update itself is counted.
+    """
+    histogram = Histogram('bench_update_seconds', 'benchmark', ['x'])
+
+    def update():
+        histogram.labels('x').observe(0.001)
+
+    def noop():
+        pass
+
+    per_call_ns(update, 20000)  # warm-up
+    return max(0.0, min(per_call_ns(update) for _ in range(5)) - min(per_call_ns(noop) for _ in range(5)))
+
+
+def metric_updates():
+    """Samples recorded so far by the metrics the benchmark exercises."""
+    total = 0
+    for name in PHASE_METRICS:
+        for child in getattr(master_agent_module, name)._children.values():
+            total += sum(child.counts) if hasattr(child, 'counts') else int(child.value)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=15, help='alternating baseline/instrumented rounds')
+    parser.add_argument('--repeat', type=int, default=100, help='plays of every script per round')
+    args = parser.parse_args()
+
+    # One phase per call: stop once the conversation reaches verification
+    agent = MasterAgent(auto_advance=False)
+    sales_agent = SalesAgent()
+    real_metrics = {name: getattr(master_agent_module, name) for name in PHASE_METRICS}
+
+    def set_metrics(enabled):
+        for name, metric in real_metrics.items():
+            setattr(master_agent_module, name, metric if enabled else NullMetric())
+
+    client = make_app(agent, sales_agent)
+
+    # Warm-up, not measured.
+    play_agent(agent, sales_agent, 5)
+    play_http(*client, 5)
+
+    try:
+        report = {
+            'agent': compare(
+                lambda: play_agent(agent, sales_agent, args.repeat),
+                lambda: play_agent(agent, sales_agent, args.repeat),
+                set_metrics, args.rounds,
+            ),
+            'http': compare(
+                lambda: play_http(*client, args.repeat),
+                lambda: play_http(*client, args.repeat),
+                set_metrics, args.rounds,
+            ),
+        }
+    finally:
+        set_metrics(True)
+
+    before = metric_updates()
+    _, turns = play_agent(agent, sales_agent, 1)
+    updates_per_turn = (metric_updates() - before) / turns
+    cost_ns = metric_update_cost_ns()
+    report['estimated'] = {
+        'metric_updates_per_turn': round(updates_per_turn, 2),
+        'metric_update_ns': round(cost_ns, 1),
+    }
+    for workload in ('agent', 'http'):
+        estimate = round(100 * updates_per_turn * cost_ns / (1000 * report[workload]['baseline_turn_us']), 3)
+        report['estimated'][f'{workload}_overhead_pct'] = estimate
+        report[workload]['meets_target'] = report[workload]['overhead_pct'] < TARGET_PCT
+        report['estimated'][f'{workload}_meets_target'] = estimate < TARGET_PCT
+    report['target_pct'] = TARGET_PCT
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
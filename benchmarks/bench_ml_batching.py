@@ -0,0 +1,84 @@
+"""Throughput and tail latency of ML generation with and without micro-batching.
+
+Usage:
+    python -m benchmarks.bench_ml_batching --concurrency 8 --requests 64 \
+        --max-batch-size 8 --wait-ms 10
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.metrics import summarize_latencies
+from agents.ml_batching import BatchingScheduler
+from agents.ml_model import LoanChatModel
+from agents.response_cache import ResponseCache
+
+QUESTIONS = [
+    "what documents do i need for a personal loan",
+    "how is my credit score checked",
+    "can i prepay my loan early",
+    "what is the maximum tenure available",
+    "how long does disbursement take",
+    "is a salary slip mandatory",
+    "what interest rate will i get",
+    "can self-employed people apply",
+]
+
+
+def run_load(target, concurrency, total_requests):
+    conversation = {'status': 'sales', 'customer_data': {'name': 'Customer'}}
+
+    def one(i):
+        message = f"{QUESTIONS[i % len(QUESTIONS)]} (question {i})"
+        start = time.perf_counter()
+        target.generate_response(message, conversation)
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize_latencies(latencies)
+    result['throughput_rps'] = round(total_requests / elapsed, 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None, help='override HF_LOAN_MODEL_NAME')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--wait-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    # Disable the response cache so every request pays for generation.
+    model = LoanChatModel(model_name=args.model, cache=ResponseCache(max_entries=0))
+    if model._generator is None:
+        print('ML model unavailable (is transformers/torch installed?)', file=sys.stderr)
+        return 1
+
+    # Warm up so model loading and first-call overhead are not measured.
+    model.generate_response('hello', {'status': 'sales'})
+
+    report = {
+        'config': vars(args),
+        'unbatched': run_load(model, args.concurrency, args.requests),
+    }
+
+    scheduler = BatchingScheduler(model, max_batch_size=args.max_batch_size, max_wait_ms=args.wait_ms)
+    try:
+        report['batched'] = run_load(scheduler, args.concurrency, args.requests)
+        report['batched']['batching'] = scheduler.get_stats()['batching']
+    finally:
+        scheduler.close()
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
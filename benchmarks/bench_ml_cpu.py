@@ -0,0 +1,145 @@
+"""Compare the default and CPU-optimized LoanChatModel configurations.
+
+Each configuration is measured in a fresh subprocess so that resident
+memory and torch thread settings do not leak between runs. Reports
+tokens/sec, per-reply latency, resident memory, and a quality check on a
+fixed loan-FAQ prompt set (keyword coverage, plus how often the optimized
+reply matches the baseline reply).
+
+Usage:
+    python -m benchmarks.bench_ml_cpu --threads 4 --interop-threads 1
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from agents.metrics import summarize_latencies
+
+# (question, keywords a reasonable answer is expected to mention)
+FAQ_PROMPTS = [
+    ("what documents do i need for a personal loan", ["document", "kyc", "id", "salary", "proof"]),
+    ("how is my loan eligibility decided", ["credit", "income", "score", "eligib"]),
+    ("what credit score do i need", ["credit", "score", "700"]),
+    ("how long does the loan approval take", ["day", "hour", "minute", "approv"]),
+    ("can i repay my loan early", ["prepay", "repay", "charge", "early"]),
+    ("what is the maximum loan amount", ["lakh", "amount", "40", "loan"]),
+    ("what interest rate will i get", ["interest", "rate", "%", "percent"]),
+    ("why do you need my salary slip", ["salary", "income", "verif"]),
+    ("what tenure options are available", ["month", "year", "tenure"]),
+    ("how is the emi calculated", ["emi", "interest", "tenure", "month"]),
+]
+
+
+def _rss_mb():
+    """Current resident set size in MiB (falls back to peak RSS)."""
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+        return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except OSError:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_child(mode, args):
+    from agents.ml_model import LoanChatModel
+    from agents.response_cache import ResponseCache
+
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    model = LoanChatModel(
+        model_name=args.model,
+        cache=ResponseCache(max_entries=0),
+        cpu_optimize=(mode == 'optimized'),
+        num_threads=args.threads if mode == 'optimized' else None,
+        interop_threads=args.interop_threads if mode == 'optimized' else None,
+    )
+    load_seconds = time.perf_counter() - started
+    if model._generator is None:
+        return {'mode': mode, 'error': 'ML model unavailable (is transformers/torch installed?)'}
+
+    tokenizer = model._generator.tokenizer
+    conversation = {'status': 'sales', 'customer_data': {'name': 'Customer'}}
+
+    # Warm-up pass, not measured.
+    model.generate_response(FAQ_PROMPTS[0][0], conversation)
+
+    latencies = []
+    tokens = 0
+    replies = []
+    covered = 0
+    for _ in range(args.repeat):
+        replies = []
+        covered = 0
+        for question, keywords in FAQ_PROMPTS:
+            prompt = model._build_prompt('sales', 'Customer', question)
+            start = time.perf_counter()
+            raw = model._run_generator([prompt], model._max_new_tokens_for([question]))[0] or ''
+            latencies.append(time.perf_counter() - start)
+            tokens += len(tokenizer(raw)['input_ids'])
+
+            reply = model._postprocess(raw)
+            replies.append(reply)
+            if any(keyword in reply.lower() for keyword in keywords):
+                covered += 1
+
+    result = summarize_latencies(latencies)
+    result.update({
+        'mode': mode,
+        'quantized': model.quantized,
+        'load_seconds': round(load_seconds, 2),
+        'tokens_per_sec': round(tokens / sum(latencies), 2) if latencies else 0.0,
+        'rss_mb': _rss_mb(),
+        'model_rss_mb': round(_rss_mb() - rss_before, 1),
+        'keyword_coverage': round(covered / len(FAQ_PROMPTS), 3),
+        'replies': replies,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=None, help='override HF_LOAN_MODEL_NAME')
+    parser.add_argument('--threads', type=int, default=None, help='intra-op threads for the optimized mode')
+    parser.add_argument('--interop-threads', type=int, default=None, help='inter-op threads for the optimized mode')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the FAQ prompt set')
+    parser.add_argument('--child', choices=['baseline', 'optimized'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args)))
+        return 0
+
+    forwarded = sys.argv[1:]
+    results = {}
+    for mode in ('baseline', 'optimized'):
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_ml_cpu', '--child', mode] + forwarded,
+            capture_output=True, text=True, check=True,
+        )
+        results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+        if 'error' in results[mode]:
+            print(results[mode]['error'], file=sys.stderr)
+            return 1
+
+    baseline, optimized = results['baseline'], results['optimized']
+    matches = sum(1 for a, b in zip(baseline['replies'], optimized['replies']) if a == b)
+    report = {
+        'baseline': {k: v for k, v in baseline.items() if k != 'replies'},
+        'optimized': {k: v for k, v in optimized.items() if k != 'replies'},
+        'speedup_p50': round(baseline['p50_ms'] / optimized['p50_ms'], 2) if optimized['p50_ms'] else None,
+        'reply_agreement': round(matches / len(FAQ_PROMPTS), 3),
+        'changed_replies': [
+            {'question': q, 'baseline': a, 'optimized': b}
+            for (q, _), a, b in zip(FAQ_PROMPTS, baseline['replies'], optimized['replies'])
+            if a != b
+        ],
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Total memory of N pre-forked web workers, with and without preloading.
+
+For each worker count, starts `python -m agents.prefork` once with the app
+preloaded in the master (the model weights and mock API datasets shared
+copy-on-write) and once with `--no-preload` (every worker loads its own),
+waits for every worker to report ready, optionally sends `--warmup` chat
+requests, and then reads RSS, PSS and unique (USS) memory of the master
+and workers from /proc. RSS counts shared pages in every process that
+maps them, so the sum over processes overstates what preloading uses;
+`total_pss_mb` (shared pages split among the processes) is the figure to
+compare. `pss_mb_per_added_worker` is the growth in total PSS per worker
+beyond the first: with preloading it should be a fraction of the
+`--no-preload` figure.
+
+PDF rendering is done in-process (HF_LOAN_PDF_WORKERS=0) so only the web
+workers are measured. Linux only.
+
+Usage:
+    python -m benchmarks.bench_prefork_memory --workers 1,2,4
+    python -m benchmarks.bench_prefork_memory --workers 1,8 --warmup 200 --modes preload
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.memory_diagnostics import process_memory
+
+MB = 1024 * 1024
+
+
+def start_server(workers, port, preload, timeout):
+    # Only memory is measured, so the warm-up sessions need not stick to a worker
+    command = [sys.executable, '-m', 'agents.prefork', '--workers', str(workers), '--port', str(port), '--shared-socket']
+    if not preload:
+        command.append('--no-preload')
+    env = dict(os.environ, HF_LOAN_PDF_WORKERS='0')
+    env.pop('HF_LOAN_PRELOAD', None)
+    proc = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+    started = time.perf_counter()
+    pids = []
+    while len(pids) < workers:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f'prefork server exited with {proc.wait()}')
+        event = json.loads(line)
+        if event.get('event') == 'ready':
+            pids.append(event['pid'])
+        if time.perf_counter() - started > timeout:
+            stop_server(proc)
+            raise RuntimeError(f'only {len(pids)} of {workers} workers ready after {timeout}s')
+    return proc, pids, time.perf_counter() - started
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def warm_up(port, count):
+    import requests
+
+    url = f'http://127.0.0.1:{port}/api/chat'
+
+    def one(i):
+        session_id = str(uuid.uuid4())
+        for message in ('Hi, I need a personal loan', 'yes', 'Rajesh Kumar'):
+            requests.post(url, json={'message': message, 'session_id': session_id}, timeout=120)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(one, range(count)))
+
+
+def measure(workers, port, preload, warmup, timeout):
+    proc, pids, startup = start_server(workers, port, preload, timeout)
+    try:
+        if warmup:
+            warm_up(port, warmup)
+        master = process_memory(proc.pid)
+        children = [process_memory(pid) for pid in pids]
+    finally:
+        stop_server(proc)
+    processes = [master] + children
+
+    def total(field):
+        return round(sum(p.get(field, 0) for p in processes) / MB, 1)
+
+    return {
+        'startup_seconds': round(startup, 2),
+        'total_rss_mb': total('rss_bytes'),
+        'total_pss_mb': total('pss_bytes'),
+        'total_uss_mb': total('uss_bytes'),
+        'master_rss_mb': round(master.get('rss_bytes', 0) / MB, 1),
+        'worker_uss_mb': [round(p.get('uss_bytes', 0) / MB, 1) for p in children],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts')
+    parser.add_argument('--modes', default='preload,no-preload', help='comma-separated: preload, no-preload')
+    parser.add_argument('--warmup', type=int, default=0, help='chat conversations to send before measuring')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for the workers')
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.workers.split(',')]
+    report = {'warmup_conversations': args.warmup, 'modes': {}}
+    for mode in args.modes.split(','):
+        runs = {}
+        for count in counts:
+            runs[count] = measure(count, args.port, mode == 'preload', args.warmup, args.timeout)
+        first, last = min(counts), max(counts)
+        summary = {'runs': runs}
+        if last > first:
+            summary['pss_mb_per_added_worker'] = round(
+                (runs[last]['total_pss_mb'] - runs[first]['total_pss_mb']) / (last - first), 1
+            )
+        report['modes'][mode] = summary
+    if 'preload' in report['modes'] and 'no-preload' in report['modes']:
+        preload = report['modes']['preload'].get('pss_mb_per_added_worker')
+        separate = report['modes']['no-preload'].get('pss_mb_per_added_worker')
+        if preload and separate:
+            report['growth_reduction'] = round(separate / preload, 2)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Measure /api/chat round trips needed to complete the sales phase.
+
+Scripted customers (from terse to one-answer-per-message) are played
+against `MasterAgent` until the conversation reaches verification. The
+previous one-question-per-turn flow always needed one turn per question
+(name, phone, purpose, amount, tenure, employment, income) after the
+opening; that count is reported alongside for comparison.
+
+Usage:
+    python -m benchmarks.bench_sales_round_trips --repeat 200
+"""
+import argparse
+import json
+import sys
+import time
+
+from agents.master_agent import MasterAgent
+from agents.metrics import summarize_latencies
+from agents.sales_agent import SalesAgent
+
+LEGACY_SALES_QUESTIONS = 7
+
+# (persona, opening messages, answers) - answers are sent in order until
+# the sales phase completes.
+SCRIPTS = [
+    ("everything at once", ["I need a loan"],
+     ["Rajesh Kumar, 9876543210, 5 lakhs for 36 months, salaried, 80000/month"]),
+    ("everything in the opener", [],
+     ["Hi, I'm Rajesh. Personal loan of 2.5L for 2 years please, 9876543210, salaried, 60k per month"]),
+    ("two messages", ["hello", "yes"],
+     ["My name is Anita Rao and I need 3 lakhs for 24 months", "9876543210, self-employed, 45,000 per month"]),
+    ("three messages", ["loan"],
+     ["priya sharma", "98765 43210, Rs. 4,00,000 over 3 years", "government employee earning 70000 a month"]),
+    ("one answer per message", ["hi", "yes"],
+     ["rajesh kumar", "9876543210", "500000", "24", "business owner", "60000"]),
+]
+
+
+def play(agent, sales_agent, opening, answers):
+    conversation = {'status': 'initial', 'customer_data': {}, 'loan_details': {}}
+    turns = 0
+    latencies = []
+    for message in opening + answers:
+        start = time.perf_counter()
+        agent.process_message(message, 'bench', conversation, sales_agent, None, None, None)
+        latencies.append(time.perf_counter() - start)
+        turns += 1
+        if conversation['status'] == 'verification':
+            return turns, latencies, True
+    return turns, latencies, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help='plays of each script for timing')
+    args = parser.parse_args()
+
+    # One phase per call: stop once the conversation reaches verification
+    agent = MasterAgent(auto_advance=False)
+    sales_agent = SalesAgent()
+
+    personas = []
+    all_latencies = []
+    for persona, opening, answers in SCRIPTS:
+        turns, _, completed = play(agent, sales_agent, opening, answers)
+        latencies = []
+        for _ in range(args.repeat):
+            latencies.extend(play(agent, sales_agent, opening, answers)[1])
+        all_latencies.extend(latencies)
+        legacy_turns = max(len(opening), 1) + LEGACY_SALES_QUESTIONS
+        personas.append({
+            'persona': persona,
+            'completed': completed,
+            'round_trips': turns,
+            'legacy_round_trips': legacy_turns,
+            'turn_latency': summarize_latencies(latencies),
+        })
+
+    total = sum(p['round_trips'] for p in personas)
+    legacy_total = sum(p['legacy_round_trips'] for p in personas)
+    report = {
+        'personas': personas,
+        'mean_round_trips': round(total / len(personas), 2),
+        'legacy_mean_round_trips': round(legacy_total / len(personas), 2),
+        'round_trip_reduction': round(1 - total / legacy_total, 3),
+        'turn_latency': summarize_latencies(all_latencies),
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if all(p['completed'] for p in personas) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Sanction letter rendering throughput with and without the cached template.
+
+`uncached` builds a fresh `SanctionLetterTemplate` (stylesheet, styles and
+static paragraphs) for every letter, as the generator used to; `cached`
+reuses the process-wide template and only builds the per-letter fields.
+Letters are rendered to memory so that disk speed does not skew results.
+
+Usage:
+    python -m benchmarks.bench_sanction_letters --letters 200
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+from agents.metrics import summarize_latencies
+from agents.sanction_letter_generator import (
+    SanctionLetterGenerator,
+    SanctionLetterTemplate,
+    sanction_letter_template,
+)
+
+CUSTOMERS = [
+    ({'name': 'Rajesh Kumar', 'phone': '9876543210'}, {'amount': 500000, 'tenure': 36}),
+    ({'name': 'Priya Sharma', 'phone': '9876543211'}, {'amount': 250000, 'tenure': 24}),
+    ({'name': 'Amit Patel', 'phone': '9876543212'}, {'amount': 1200000, 'tenure': 60}),
+    ({'name': 'Sneha Reddy', 'phone': '9876543213'}, {'amount': 80000, 'tenure': 12}),
+]
+
+
+def underwriting_result(loan_details, rate=10.99):
+    amount, tenure = loan_details['amount'], loan_details['tenure']
+    monthly_rate = rate / 1200
+    emi = round(amount * monthly_rate * (1 + monthly_rate) ** tenure / ((1 + monthly_rate) ** tenure - 1), 2)
+    return {
+        'approved_amount': amount,
+        'interest_rate': rate,
+        'emi': emi,
+        'total_amount': round(emi * tenure, 2),
+        'total_interest': round(emi * tenure - amount, 2),
+        'processing_fee': min(amount * 0.02, 20000),
+        'credit_score': 780,
+    }
+
+
+def run(mode, letters, generator):
+    latencies = []
+    size = 0
+    for i in range(letters):
+        customer, loan = CUSTOMERS[i % len(CUSTOMERS)]
+        result = underwriting_result(loan)
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        template = SanctionLetterTemplate() if mode == 'uncached' else sanction_letter_template()
+        generator.render_sanction_letter(buffer, customer, loan, result, template=template)
+        latencies.append(time.perf_counter() - start)
+        size += len(buffer.getvalue())
+
+    report = summarize_latencies(latencies)
+    report['letters_per_sec'] = round(len(latencies) / sum(latencies), 1) if latencies else 0.0
+    report['mean_pdf_bytes'] = size // letters if letters else 0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--letters', type=int, default=200, help='letters rendered per mode')
+    args = parser.parse_args()
+
+    generator = SanctionLetterGenerator()
+    # Warm-up (imports, font metrics, template construction), not measured.
+    run('cached', 5, generator)
+    run('uncached', 5, generator)
+
+    uncached = run('uncached', args.letters, generator)
+    cached = run('cached', args.letters, generator)
+    report = {
+        'uncached': uncached,
+        'cached': cached,
+        'speedup': round(cached['letters_per_sec'] / uncached['letters_per_sec'], 2) if uncached['letters_per_sec'] else None,
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
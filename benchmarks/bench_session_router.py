@@ -0,0 +1,229 @@
+"""Session routing across a local worker fleet: movement, handoff and throughput.
+
+Three measurements, each selectable with `--parts`:
+
+`ring` (in-process) assigns `--keys` session ids to 1..8 workers on the
+router's `HashRing` and reports the share of sessions that change owner
+when a worker is added or removed, next to what `hash % N` would move,
+and the load of the busiest worker relative to the mean.
+
+`handoff` starts the router with two workers, takes `--sessions`
+conversations halfway through the application, adds a third worker
+(another `agents.prefork` process) and then removes it again. After each
+change it checks that every session is held by exactly the worker the
+ring assigns it to, and finishes the applications through the router: a
+session whose state was lost would start over instead of moving on to
+verification.
+
+`scaling` runs `benchmarks.load_test` through the router with 1, 2 and 4
+workers and reports conversations per second and the scaling efficiency
+(throughput over N times the single-worker throughput). CPU-bound work
+only scales up to the number of cores (`cpu_count` in the report).
+
+Usage:
+    python -m benchmarks.bench_session_router
+    python -m benchmarks.bench_session_router --parts scaling --workers 1,2,4,8 --conversations 200 --concurrency 32
+"""
+import argparse
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from agents.session_router import HashRing
+from mock_apis.crm_server import CRMServer
+
+
+def ring_movement(keys, replicas, max_workers=8):
+    ids = [str(uuid.UUID(int=index)) for index in range(keys)]
+    results = {}
+    for count in range(1, max_workers + 1):
+        nodes = [f'http://127.0.0.1:{5101 + index}' for index in range(count)]
+        ring = HashRing(nodes, replicas)
+        owners = [ring.node_for(session_id) for session_id in ids]
+        load = Counter(owners)
+        grown = ring.copy()
+        grown.add(f'http://127.0.0.1:{5101 + count}')
+        entry = {
+            'max_load_vs_mean': round(max(load.values()) / (keys / count), 3),
+            'add_moved': round(sum(a != grown.node_for(s) for a, s in zip(owners, ids)) / keys, 4),
+            'add_moved_modulo': round(sum(hash_mod(s, count) != hash_mod(s, count + 1) for s in ids) / keys, 4),
+            'add_moved_ideal': round(1 / (count + 1), 4),
+        }
+        if count > 1:
+            shrunk = ring.copy()
+            shrunk.remove(nodes[0])
+            entry['remove_moved'] = round(sum(a != shrunk.node_for(s) for a, s in zip(owners, ids)) / keys, 4)
+            entry['remove_moved_modulo'] = round(
+                sum(hash_mod(s, count) != hash_mod(s, count - 1) for s in ids) / keys, 4
+            )
+        results[count] = entry
+    return results
+
+
+def hash_mod(session_id, count):
+    return uuid.UUID(session_id).int % count
+
+
+def start_router(workers, port, backend_port, token):
+    env = dict(os.environ, HF_LOAN_ADMIN_TOKEN=token, HF_LOAN_PDF_WORKERS=os.getenv('HF_LOAN_PDF_WORKERS', '1'))
+    command = [
+        sys.executable, '-m', 'agents.session_router',
+        '--port', str(port), '--spawn', str(workers), '--backend-port', str(backend_port),
+    ]
+    proc = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line:
+        raise RuntimeError(f'router exited with {proc.wait()}')
+    return proc, json.loads(line)['backends']
+
+
+def start_worker(port, token):
+    env = dict(os.environ, HF_LOAN_ADMIN_TOKEN=token, HF_LOAN_PDF_WORKERS=os.getenv('HF_LOAN_PDF_WORKERS', '1'))
+    command = [sys.executable, '-m', 'agents.prefork', '--workers', '1', '--port', str(port)]
+    proc = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, text=True)
+    while json.loads(proc.stdout.readline() or '{"event": "exited"}').get('event') != 'ready':
+        if proc.poll() is not None:
+            raise RuntimeError(f'worker exited with {proc.returncode}')
+    return proc, f'http://127.0.0.1:{port}'
+
+
+def stop(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def placement(router_url, backends, token):
+    """Check every session is held once, by the worker the ring assigns it to"""
+    ring = HashRing(backends)
+    held = Counter()
+    misplaced = 0
+    for backend in backends:
+        sessions = requests.get(
+            f'{backend}/admin/sessions', headers={'Authorization': f'Bearer {token}'}, timeout=30
+        ).json()['sessions']
+        for session_id in sessions:
+            held[session_id] += 1
+            misplaced += ring.node_for(session_id) != backend
+    return {'sessions': len(held), 'duplicated': sum(count > 1 for count in held.values()), 'misplaced': misplaced}
+
+
+def handoff(sessions, port, backend_port, token, concurrency):
+    customers = list(CRMServer().customers.values())
+    router, backends = start_router(2, port, backend_port, token)
+    extra = None
+    url = f'http://127.0.0.1:{port}'
+    admin = {'Authorization': f'Bearer {token}'}
+    report = {}
+    try:
+        ids = [str(uuid.uuid4()) for _ in range(sessions)]
+
+        def chat(session_id, message):
+            return requests.post(f'{url}/api/chat', json={'message': message, 'session_id': session_id}, timeout=120).json()
+
+        def first_half(index):
+            customer = customers[index % len(customers)]
+            for message in ('hi', 'yes', customer['name'], customer['phone']):
+                chat(ids[index], message)
+
+        def second_half(index, session_id):
+            # Amount, tenure and employment, then the income moves a known
+            # session past sales; a session that lost its state would not
+            for message in ('200000', '24', 'salaried', '90000'):
+                body = chat(session_id, message)
+            return body['status'] != 'sales' and body['status'] != 'initial'
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(first_half, range(sessions)))
+        report['before'] = placement(url, backends, token)
+
+        extra, extra_url = start_worker(backend_port + 10, token)
+        added = requests.post(f'{url}/router/backends', json={'url': extra_url}, headers=admin, timeout=300).json()
+        report['add'] = dict(added, placement=placement(url, backends + [extra_url], token))
+
+        half = sessions // 2
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            continued = list(pool.map(second_half, range(half), ids[:half]))
+        report['add']['continued'] = f'{sum(continued)}/{half}'
+
+        removed = requests.delete(f'{url}/router/backends', json={'url': extra_url}, headers=admin, timeout=300).json()
+        report['remove'] = dict(removed, placement=placement(url, backends, token))
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            continued = list(pool.map(second_half, range(half, sessions), ids[half:]))
+        report['remove']['continued'] = f'{sum(continued)}/{sessions - half}'
+    finally:
+        stop(router)
+        if extra is not None:
+            stop(extra)
+    return report
+
+
+def scaling(worker_counts, port, backend_port, token, conversations, concurrency):
+    runs = {}
+    for count in worker_counts:
+        router, _ = start_router(count, port, backend_port, token)
+        try:
+            output = subprocess.run(
+                [
+                    sys.executable, '-m', 'benchmarks.load_test', '--url', f'http://127.0.0.1:{port}',
+                    '--conversations', str(conversations), '--concurrency', str(concurrency),
+                ],
+                capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output)
+        finally:
+            stop(router)
+        runs[count] = {
+            'conversations_per_sec': result['conversations_per_sec'],
+            'requests_per_sec': result['requests_per_sec'],
+            'outcomes': result['outcomes'],
+            'name_p95_ms': result['steps'].get('name', {}).get('p95_ms'),
+            'income_p95_ms': result['steps'].get('income', {}).get('p95_ms'),
+        }
+    base = runs[worker_counts[0]]['conversations_per_sec'] / worker_counts[0]
+    for count, run in runs.items():
+        run['efficiency'] = round(run['conversations_per_sec'] / (count * base), 2) if base else None
+    return {'cpu_count': os.cpu_count(), 'conversations': conversations, 'concurrency': concurrency, 'runs': runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--parts', default='ring,handoff,scaling', help='comma-separated: ring, handoff, scaling')
+    parser.add_argument('--keys', type=int, default=100000, help='session ids for the ring measurement')
+    parser.add_argument('--replicas', type=int, default=160, help='virtual nodes per worker')
+    parser.add_argument('--sessions', type=int, default=40, help='conversations handed off')
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts for scaling')
+    parser.add_argument('--conversations', type=int, default=60, help='load test conversations per worker count')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8055, help='router port')
+    parser.add_argument('--backend-port', type=int, default=5201, help='first worker port')
+    args = parser.parse_args()
+
+    parts = args.parts.split(',')
+    token = secrets.token_hex(16)
+    report = {}
+    if 'ring' in parts:
+        report['ring'] = ring_movement(args.keys, args.replicas)
+    if 'handoff' in parts:
+        report['handoff'] = handoff(args.sessions, args.port, args.backend_port, token, args.concurrency)
+    if 'scaling' in parts:
+        counts = [int(count) for count in args.workers.split(',')]
+        report['scaling'] = scaling(counts, args.port, args.backend_port, token, args.conversations, args.concurrency)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
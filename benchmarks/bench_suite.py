@@ -0,0 +1,278 @@
+"""Microbenchmark suite for the agent and mock API hot paths.
+
+Times each hot path in isolation with stable settings: every case is
+warmed up, its loop count is calibrated so that one sample takes at least
+`--min-time` seconds, the garbage collector is paused while timing, and
+the minimum and median of `--samples` samples are reported per call.
+Inputs are fixed so runs are comparable; nothing loads the ML model, so
+the suite runs offline and without a GPU.
+
+Results are printed as JSON (and written to `--output`). Passing an
+earlier result file with `--compare` adds the per-case ratio and exits
+with status 1 when any case is slower than `--max-regression` allows.
+
+Usage:
+    python -m benchmarks.bench_suite --output bench.json
+    python -m benchmarks.bench_suite --compare bench.json --filter storage
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from agents.cloud_storage import CloudStorage
+from agents.master_agent import MasterAgent
+from agents.sales_agent import SalesAgent
+from agents.sanction_letter_generator import SanctionLetterGenerator
+from agents.underwriting_agent import UnderwritingAgent
+from benchmarks.bench_entity_extraction import MESSAGES
+from benchmarks.bench_sanction_letters import CUSTOMERS, underwriting_result
+from mock_apis.credit_bureau import CreditBureau
+from mock_apis.crm_server import CRMServer
+from mock_apis.offer_mart import OfferMart
+
+CUSTOMER = {
+    'name': 'Rajesh Kumar',
+    'phone': '9876543210',
+    'employment': 'salaried',
+    'monthly_income': 80000,
+    'current_loans': [{'type': 'Home Loan', 'amount': 2500000, 'emi': 25000, 'remaining_tenure': 180}],
+}
+LOAN = {'amount': 500000, 'tenure': 36}
+
+
+class Case(NamedTuple):
+    name: str
+    setup: Callable[[], Callable[[], Any]]  # builds state, returns the timed call
+    loops: Optional[int] = None  # fixed calls per sample, with a fresh setup per sample
+    teardown: Optional[Callable[[], None]] = None
+
+
+def extraction_cases():
+    agent = MasterAgent()
+    extract = agent.entity_extractor.extract
+    parsed = [(m, extract(m.strip())) for m in MESSAGES]
+
+    def helper(method):
+        def run():
+            for message, entities in parsed:
+                method(message, entities)
+        return lambda: run
+
+    def extract_all():
+        for message in MESSAGES:
+            extract(message)
+
+    return [
+        Case('master.entity_extract', lambda: extract_all),
+        Case('master.extract_name', helper(agent._extract_name)),
+        Case('master.extract_phone', helper(agent._extract_phone)),
+        Case('master.extract_loan_amount', helper(agent._extract_loan_amount)),
+        Case('master.extract_tenure', helper(agent._extract_tenure)),
+        Case('master.extract_income', helper(agent._extract_income)),
+    ]
+
+
+def agent_cases():
+    sales = SalesAgent()
+    offer_mart = OfferMart()
+    underwriting = UnderwritingAgent(CreditBureau(), offer_mart)
+    return [
+        Case('sales.suggest_loan_terms', lambda: lambda: sales.suggest_loan_terms(CUSTOMER, LOAN['amount'], LOAN['tenure'])),
+        Case(
+            'underwriting.perform_checks',
+            lambda: lambda: underwriting._perform_underwriting_checks(CUSTOMER, LOAN, 780, 800000),
+        ),
+        Case(
+            'offer_mart.generate_loan_offer',
+            lambda: lambda: offer_mart.generate_loan_offer(CUSTOMER, 780, LOAN['amount'], LOAN['tenure']),
+        ),
+        Case('offer_mart.calculate_loan_eligibility', lambda: lambda: offer_mart.calculate_loan_eligibility(CUSTOMER, 780)),
+    ]
+
+
+def crm_cases():
+    crm = CRMServer()
+    return [
+        Case('crm.get_customer_by_phone', lambda: lambda: crm.get_customer_by_phone('9876543215')),
+        Case('crm.get_customer_by_phone_miss', lambda: lambda: crm.get_customer_by_phone('9000000000')),
+        Case('crm.get_customer_by_name', lambda: lambda: crm.get_customer_by_name('meera')),
+        Case('crm.search_customers', lambda: lambda: crm.search_customers('kumar')),
+        Case('crm.verify_customer', lambda: lambda: crm.verify_customer('9876543212')),
+    ]
+
+
+def storage_cases(sizes):
+    """save_file / create_package with `size` earlier uploads and packages on record."""
+    upload = b'%PDF-1.4\n' + bytes(range(256)) * 256  # 64 KiB salary slip
+    letter = SanctionLetterGenerator().render_document('sanction_letter', *sanction_inputs())
+    state = {}
+
+    def fresh_storage(size):
+        cleanup()
+        base = tempfile.mkdtemp(prefix='bench_storage_')
+        state['base'] = base
+        storage = CloudStorage(base_dir=base)
+        record = {'filename': 'x.pdf', 'saved_path': os.path.join(base, 'files', 'x.pdf'), 'timestamp': '', 'meta': {}}
+        with open(storage.meta_path, 'w', encoding='utf-8') as fh:
+            json.dump({'uploads': [record] * size, 'packages': [record] * size}, fh, indent=2)
+        return storage
+
+    def cleanup():
+        base = state.pop('base', None)
+        if base:
+            shutil.rmtree(base, ignore_errors=True)
+
+    def save_file(size):
+        def setup():
+            storage = fresh_storage(size)
+            return lambda: storage.save_file(io.BytesIO(upload), 'salary_slip.pdf', {'session_id': 'bench'})
+        return setup
+
+    def create_package(size):
+        def setup():
+            storage = fresh_storage(size)
+            files = {
+                'sanction_letter': storage.save_document(letter, 'sanction_letter_bench.pdf'),
+                'uploaded_0': storage.save_file(io.BytesIO(upload), 'salary_slip.pdf'),
+            }
+            counter = iter(range(1 << 30))
+            # Distinct session ids so every call gets its own package directory
+            return lambda: storage.create_package(f'bench{next(counter)}', files, {'customer': CUSTOMER})
+        return setup
+
+    cases = []
+    for size in sizes:
+        cases.append(Case(f'storage.save_file[{size}]', save_file(size), loops=20, teardown=cleanup))
+        cases.append(Case(f'storage.create_package[{size}]', create_package(size), loops=20, teardown=cleanup))
+    return cases
+
+
+def sanction_inputs():
+    customer, loan = CUSTOMERS[0]
+    return customer, loan, underwriting_result(loan)
+
+
+def sanction_cases():
+    generator = SanctionLetterGenerator()
+    inputs = sanction_inputs()
+    return [
+        Case('sanction.render_letter', lambda: lambda: generator.render_document('sanction_letter', *inputs)),
+        Case('sanction.render_agreement', lambda: lambda: generator.render_document('loan_agreement', *inputs)),
+    ]
+
+
+def time_loops(fn, loops):
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def calibrate(fn, min_time):
+    loops = 1
+    while True:
+        elapsed = time_loops(fn, loops)
+        if elapsed >= min_time or loops >= 1 << 24:
+            return loops
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.2))
+
+
+def measure(case, samples, min_time):
+    fn = case.setup()
+    try:
+        fn()  # warm-up
+        loops = case.loops or calibrate(fn, min_time)
+        per_call = []
+        for _ in range(samples):
+            if case.loops:
+                fn = case.setup()
+            per_call.append(time_loops(fn, loops) / loops)
+    finally:
+        if case.teardown:
+            case.teardown()
+    return {
+        'loops': loops,
+        'samples': samples,
+        'min_us': round(1e6 * min(per_call), 3),
+        'median_us': round(1e6 * statistics.median(per_call), 3),
+        'stdev_pct': round(100 * statistics.pstdev(per_call) / statistics.mean(per_call), 2),
+    }
+
+
+def compare(results, baseline, max_regression):
+    comparison, regressions = {}, []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        # Minimums are the least noisy estimate of the true cost
+        ratio = round(result['min_us'] / old['min_us'], 3) if old['min_us'] else None
+        comparison[name] = ratio
+        if ratio is not None and ratio > 1 + max_regression:
+            regressions.append(name)
+    return comparison, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--samples', type=int, default=7, help='timed samples per case')
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per sample for calibrated cases')
+    parser.add_argument('--storage-sizes', default='0,1000,5000', help='records already in cloud storage metadata')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='tolerated slowdown in --compare (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.storage_sizes.split(',') if size.strip()]
+    cases: List[Case] = (
+        extraction_cases() + agent_cases() + crm_cases() + storage_cases(sizes) + sanction_cases()
+    )
+
+    results = {}
+    for case in cases:
+        if args.filter in case.name:
+            results[case.name] = measure(case, args.samples, args.min_time)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            baseline = json.load(fh)['results']
+        report['comparison'], regressions = compare(results, baseline, args.max_regression)
+        report['regressions'] = regressions
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""End-to-end load test: full loan conversations at a given concurrency.
+
+Each simulated customer plays the whole application the way the chat UI
+does: greeting, consent, then one answer per message (name, phone, loan
+amount, tenure, employment), a salary slip upload, the monthly income
+(after which verification, underwriting and the sanction letter run), a
+poll while the letter is still being generated, and the PDF download.
+Turns the server sheds with 503 (admission control) are retried after
+the delay it advertises, up to `--max-retries` times; when it sheds a
+phase reached later in the same turn (the reply carries `retry_after`),
+the conversation is continued with another message after that delay.
+
+Customers are drawn from the CRM's known customers (who pass verification
+and are asked for amounts within their pre-approved limit) and, with
+probability `--synthetic-ratio`, synthetic ones unknown to the CRM. The
+app is driven in-process through the Flask test client (the default,
+which imports `app` and so loads the ML model) or over HTTP against a
+running server with `--url`.
+
+The report gives conversations and requests per second, outcomes, shed
+turns by step, and p50/p95/p99 latency per conversation step as seen by
+the client, plus the server-side `phase_timings` of verification,
+underwriting and sanction.
+
+Usage:
+    python -m benchmarks.load_test --conversations 50 --concurrency 8
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --conversations 200 --concurrency 32
+"""
+import argparse
+import io
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from agents.metrics import summarize_latencies
+from mock_apis.crm_server import CRMServer
+
+FIRST_NAMES = ['Arjun', 'Kavya', 'Rohan', 'Ishita', 'Nikhil', 'Pooja', 'Karan', 'Divya', 'Sameer', 'Neha']
+LAST_NAMES = ['Mehta', 'Iyer', 'Verma', 'Nair', 'Gupta', 'Kapoor', 'Das', 'Malhotra', 'Rao', 'Bose']
+EMPLOYMENT = ['salaried', 'self-employed', 'business owner', 'government employee']
+TENURES = [12, 24, 36, 48, 60]
+
+
+class Customer(NamedTuple):
+    name: str
+    phone: str
+    amount: int
+    tenure: int
+    employment: str
+    income: int
+    known: bool  # in the CRM, so verification can pass
+
+
+def make_customers(count, synthetic_ratio, seed):
+    rng = random.Random(seed)
+    crm = list(CRMServer().customers.values())
+    known_phones = {c['phone'] for c in crm}
+    customers = []
+    for _ in range(count):
+        if rng.random() >= synthetic_ratio:
+            record = rng.choice(crm)
+            limit = record.get('pre_approved_limit', 500000)
+            amount = rng.randrange(50000, max(limit, 100000) + 1, 10000)
+            customers.append(Customer(
+                record['name'], record['phone'], amount, rng.choice(TENURES),
+                rng.choice(EMPLOYMENT), rng.randrange(80000, 200001, 5000), True,
+            ))
+        else:
+            phone = None
+            while phone is None or phone in known_phones:
+                phone = '9' + ''.join(rng.choice('0123456789') for _ in range(9))
+            customers.append(Customer(
+                f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', phone,
+                rng.randrange(50000, 1500001, 10000), rng.choice(TENURES),
+                rng.choice(EMPLOYMENT), rng.randrange(20000, 200001, 5000), False,
+            ))
+    return customers
+
+
+class TestClientTarget:
+    """Drives the app in-process; every worker thread gets its own client."""
+
+    def __init__(self):
+        import app as app_module
+
+        self.app = app_module.app
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def chat(self, session_id, message):
+        response = self.client.post('/api/chat', json={'message': message, 'session_id': session_id})
+        return response.status_code, response.get_json()
+
+    def upload(self, session_id, filename, data):
+        response = self.client.post(
+            '/api/upload',
+            data={'session_id': session_id, 'file': (io.BytesIO(data), filename)},
+            content_type='multipart/form-data',
+        )
+        return response.status_code, response.get_json()
+
+    def download(self, session_id):
+        response = self.client.get(f'/api/download/{session_id}')
+        size = len(response.data)
+        response.close()
+        return response.status_code, size
+
+    def close(self):
+        pool = getattr(sys.modules.get('app'), 'pdf_render_pool', None)
+        if pool is not None:
+            pool.close()
+
+
+class HttpTarget:
+    """Drives a running server; every worker thread gets its own connection pool."""
+
+    def __init__(self, base_url, timeout=120):
+        import requests
+
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self.requests.Session()
+        return self._local.session
+
+    def chat(self, session_id, message):
+        response = self.session.post(
+            f'{self.base_url}/api/chat', json={'message': message, 'session_id': session_id}, timeout=self.timeout
+        )
+        return response.status_code, response.json()
+
+    def upload(self, session_id, filename, data):
+        response = self.session.post(
+            f'{self.base_url}/api/upload',
+            data={'session_id': session_id},
+            files={'file': (filename, data, 'application/pdf')},
+            timeout=self.timeout,
+        )
+        return response.status_code, response.json()
+
+    def download(self, session_id):
+        response = self.session.get(f'{self.base_url}/api/download/{session_id}', timeout=self.timeout)
+        return response.status_code, len(response.content)
+
+    def close(self):
+        pass
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = defaultdict(list)
+        self.server_phases = defaultdict(list)
+        self.outcomes = Counter()
+        self.shed = Counter()
+        self.requests = 0
+        self.errors = []
+
+    def step(self, name, seconds):
+        with self.lock:
+            self.steps[name].append(seconds)
+            self.requests += 1
+
+    def phases(self, timings):
+        with self.lock:
+            for timing in timings:
+                self.server_phases[timing['phase']].append(timing['ms'] / 1000)
+
+    def shed_step(self, name):
+        with self.lock:
+            self.shed[name] += 1
+
+    def outcome(self, name, error=None):
+        with self.lock:
+            self.outcomes[name] += 1
+            if error is not None and len(self.errors) < 20:
+                self.errors.append(error)
+
+
+class ConversationFailed(Exception):
+    pass
+
+
+def timed(results, name, call, *args):
+    start = time.perf_counter()
+    status, body = call(*args)
+    results.step(name, time.perf_counter() - start)
+    return status, body
+
+
+def run_conversation(target, customer, results, upload_bytes, poll_interval, max_polls, max_retries):
+    session_id = str(uuid.uuid4())
+
+    def chat(step, message):
+        status, body = timed(results, step, target.chat, session_id, message)
+        retries = 0
+        while status == 503 and retries < max_retries:
+            # Shed by admission control: retry after the advertised delay
+            results.shed_step(step)
+            time.sleep((body or {}).get('retry_after', 1))
+            status, body = timed(results, step, target.chat, session_id, message)
+            retries += 1
+        if status != 200:
+            raise ConversationFailed(f'{step}: HTTP {status}')
+        results.phases(body.get('phase_timings', ()))
+        return body
+
+    try:
+        for step, message in (
+            ('greeting', 'hi'),
+            ('consent', 'yes'),
+            ('name', customer.name),
+            ('phone', customer.phone),
+            ('amount', str(customer.amount)),
+            ('tenure', str(customer.tenure)),
+            ('employment', customer.employment),
+        ):
+            chat(step, message)
+
+        status, _ = timed(results, 'upload', target.upload, session_id, 'salary_slip.pdf', upload_bytes)
+        if status != 200:
+            raise ConversationFailed(f'upload: HTTP {status}')
+
+        body = chat('income', str(customer.income))
+        polls = 0
+        while (body.get('retry_after') or body['status'] == 'sanction' and not body.get('requires_input')) and polls < max_polls:
+            if body.get('retry_after'):
+                # A later phase was shed after the earlier ones ran: continue it
+                results.shed_step('continue')
+                time.sleep(body['retry_after'])
+                body = chat('continue', 'continue')
+            else:
+                time.sleep(poll_interval)
+                body = chat('sanction_poll', 'sanction letter status')
+            polls += 1
+
+        if body['status'] != 'completed':
+            results.outcome({
+                'verification': 'verification_failed',
+                'underwriting': 'declined',
+                'sanction': 'letter_not_ready',
+            }.get(body['status'], body['status']))
+            return
+
+        status, size = timed(results, 'download', target.download, session_id)
+        while status == 202 and polls < max_polls:
+            time.sleep(poll_interval)
+            status, size = timed(results, 'download', target.download, session_id)
+            polls += 1
+        if status != 200 or not size:
+            raise ConversationFailed(f'download: HTTP {status}')
+        results.outcome('completed')
+    except ConversationFailed as exc:
+        results.outcome('error', str(exc))
+    except Exception as exc:
+        results.outcome('error', f'{type(exc).__name__}: {exc}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server (default: in-process Flask test client)')
+    parser.add_argument('--conversations', type=int, default=50, help='loan applications to run')
+    parser.add_argument('--concurrency', type=int, default=8, help='applications in flight at once')
+    parser.add_argument('--synthetic-ratio', type=float, default=0.3, help='share of customers unknown to the CRM')
+    parser.add_argument('--upload-kb', type=int, default=64, help='size of the uploaded salary slip')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between sanction letter polls')
+    parser.add_argument('--max-polls', type=int, default=60)
+    parser.add_argument('--max-retries', type=int, default=5, help='retries of a turn answered 503 (shed by admission control)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    customers = make_customers(args.conversations, args.synthetic_ratio, args.seed)
+    upload_bytes = b'%PDF-1.4\n' + random.Random(args.seed).randbytes(max(0, 1024 * args.upload_kb - 9))
+    target = HttpTarget(args.url) if args.url else TestClientTarget()
+    results = Results()
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for customer in customers:
+                executor.submit(
+                    run_conversation, target, customer, results, upload_bytes, args.poll_interval, args.max_polls,
+                    args.max_retries,
+                )
+    finally:
+        target.close()
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'target': args.url or 'test_client',
+        'conversations': len(customers),
+        'known_customers': sum(c.known for c in customers),
+        'concurrency': args.concurrency,
+        'elapsed_seconds': round(elapsed, 3),
+        'conversations_per_sec': round(len(customers) / elapsed, 3),
+        'requests': results.requests,
+        'requests_per_sec': round(results.requests / elapsed, 2),
+        'outcomes': dict(results.outcomes),
+        'shed_by_step': dict(results.shed),
+        'steps': {name: summarize_latencies(values) for name, values in results.steps.items()},
+        'server_phases': {name: summarize_latencies(values) for name, values in results.server_phases.items()},
+        'errors': results.errors,
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if results.outcomes.get('error') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
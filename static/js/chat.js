@@ -54,6 +54,33 @@ class ChatInterface {
         return 'session_' + Math.random().toString(36).substr(2, 9) + '_' + Date.now();
     }
     
+    generateRequestId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return 'req_' + Math.random().toString(36).substr(2, 9) + '_' + Date.now();
+    }
+    
+    async fetchWithRetry(url, options, retries = 2) {
+        // Retries network failures, "still processing" (409) and "server
+        // busy" (503) replies after their Retry-After. Callers send an
+        // Idempotency-Key, so a retry replays the original response
+        // instead of repeating the work.
+        for (let attempt = 0; ; attempt++) {
+            try {
+                const response = await fetch(url, options);
+                if ((response.status !== 409 && response.status !== 503) || attempt >= retries) {
+                    return response;
+                }
+                const delay = parseFloat(response.headers.get('Retry-After')) || 1;
+                await new Promise(resolve => setTimeout(resolve, delay * 1000));
+            } catch (error) {
+                if (attempt >= retries) throw error;
+                await new Promise(resolve => setTimeout(resolve, 500 * (attempt + 1)));
+            }
+        }
+    }
+    
     async sendMessage() {
         const message = this.messageInput.value.trim();
         if (!message || this.isLoading) return;
@@ -66,10 +93,12 @@ class ChatInterface {
         this.setLoading(true);
         
         try {
-            const response = await fetch('/api/chat', {
+            // The same key is sent on a retry so the server never processes this message twice
+            const response = await this.fetchWithRetry('/api/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Idempotency-Key': this.generateRequestId()
                 },
                 body: JSON.stringify({
                     message: message,
@@ -77,10 +106,8 @@ class ChatInterface {
                 })
             });
             
-            const data = await response.json();
-            
-            // Add bot response
-            this.addMessage(data.response, 'bot');
+            // Add bot response (rendered incrementally while it streams)
+            const data = await this.readChatStream(response);
             
             // Handle special responses
             this.handleSpecialResponse(data);
@@ -120,6 +147,79 @@ class ChatInterface {
         
         this.chatMessages.appendChild(messageDiv);
         this.scrollToBottom();
+        
+        return messageText;
+    }
+    
+    async readChatStream(response) {
+        // Parse the server-sent events from /api/chat/stream, appending
+        // tokens to a bot message as they arrive. Resolves with the final
+        // payload, which has the same shape as the /api/chat response.
+        if (!response.ok || !response.body) {
+            throw new Error(`Chat request failed with status ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let messageText = null;
+        let final = null;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const event = this.parseStreamEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                
+                if (event.type === 'token') {
+                    if (!messageText) {
+                        // First token: swap the loading overlay for the reply itself
+                        this.loadingOverlay.style.display = 'none';
+                        messageText = this.addMessage('', 'bot');
+                    }
+                    messageText.textContent += event.data.text;
+                    this.scrollToBottom();
+                } else if (event.type === 'done') {
+                    final = event.data;
+                }
+            }
+        }
+        
+        if (!final) {
+            throw new Error('Chat stream ended without a reply');
+        }
+        
+        // The final reply is authoritative (e.g. after filtering on the server)
+        if (messageText) {
+            messageText.textContent = final.response;
+        } else {
+            this.addBotReply(final);
+        }
+        return final;
+    }
+    
+    addBotReply(data) {
+        // A reply that ran through several phases (e.g. verification,
+        // underwriting and sanction) lists each phase message separately.
+        const messages = data.messages && data.messages.length ? data.messages : [data.response];
+        messages.forEach(text => this.addMessage(text, 'bot'));
+    }
+    
+    parseStreamEvent(frame) {
+        let type = 'message';
+        let data = '';
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data += line.slice(5).trim();
+            }
+        });
+        return { type, data: data ? JSON.parse(data) : null };
     }
     
     handleSpecialResponse(data) {
@@ -146,6 +246,48 @@ class ChatInterface {
         
         // Update loan status
         this.updateLoanStatus(data.status);
+        
+        // The sanction letter renders in the background, and a step the
+        // server deferred under load (retry_after) continues on the next
+        // message; check back until there is something new to show
+        if (data.retry_after) {
+            this.scheduleSanctionPoll(0, data.retry_after * 1000);
+        } else if (data.status === 'sanction' && !data.requires_input) {
+            this.scheduleSanctionPoll();
+        }
+    }
+    
+    scheduleSanctionPoll(attempt = 0, delay = 1500) {
+        if (attempt >= 40) return;
+        clearTimeout(this.sanctionPollTimer);
+        this.sanctionPollTimer = setTimeout(async () => {
+            try {
+                const response = await this.fetchWithRetry('/api/chat', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': this.generateRequestId()
+                    },
+                    body: JSON.stringify({ message: 'sanction letter status', session_id: this.sessionId })
+                });
+                const data = await response.json();
+                if (data.retry_after) {
+                    // Still deferred: wait as long as the server asks
+                    this.scheduleSanctionPoll(attempt + 1, data.retry_after * 1000);
+                    return;
+                }
+                if (data.status === 'sanction' && !data.requires_input) {
+                    // Still generating: keep waiting without repeating the message
+                    this.scheduleSanctionPoll(attempt + 1);
+                    return;
+                }
+                this.addBotReply(data);
+                this.handleSpecialResponse(data);
+            } catch (err) {
+                console.error('Sanction status check failed', err);
+                this.scheduleSanctionPoll(attempt + 1);
+            }
+        }, delay);
     }
     
     showInputOptions(inputType) {
@@ -219,8 +361,10 @@ class ChatInterface {
             formData.append('file', file);
             formData.append('session_id', this.sessionId);
             
-            const response = await fetch('/api/upload', {
+            const uploadId = this.generateRequestId();
+            const response = await this.fetchWithRetry('/api/upload', {
                 method: 'POST',
+                headers: { 'Idempotency-Key': uploadId },
                 body: formData
             });
             
@@ -233,14 +377,17 @@ class ChatInterface {
                 // Inform backend that file was uploaded so conversation can progress
                 setTimeout(async () => {
                     try {
-                        const r = await fetch('/api/chat', {
+                        const r = await this.fetchWithRetry('/api/chat', {
                             method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
+                            headers: {
+                                'Content-Type': 'application/json',
+                                'Idempotency-Key': `${uploadId}-notify`
+                            },
                             body: JSON.stringify({ message: 'I have uploaded the salary slip', session_id: this.sessionId })
                         });
                         const d = await r.json();
                         if (d && d.response) {
-                            this.addMessage(d.response, 'bot');
+                            this.addBotReply(d);
                             this.handleSpecialResponse(d);
                         }
                     } catch (err) {
@@ -0,0 +1,78 @@
+"""Admission control shedding a phase that auto-advance reaches mid-turn."""
+import pytest
+
+from agents.admission import AdmissionController, Overloaded
+from agents.conversation import Conversation
+from agents.master_agent import MasterAgent
+
+
+class StubVerification:
+    def verify_customer(self, customer_data):
+        return {"verified": True}
+
+
+class StubUnderwriting:
+    def evaluate_loan(self, customer_data, loan_details):
+        return {"approved": True, "interest_rate": 11.5, "emi": 16500}
+
+
+class StubSanction:
+    def __init__(self):
+        self.submitted = 0
+
+    def submit_sanction_letter(self, customer_data, loan_details, underwriting_result):
+        self.submitted += 1
+        raise AssertionError("the sanction phase should have been shed")
+
+
+@pytest.fixture
+def conversation():
+    return Conversation(
+        session_id="shed-test",
+        status="verification",
+        customer_data={"name": "Rajesh Kumar", "phone": "9876543210"},
+        loan_details={"amount": 500000, "tenure": 36},
+    )
+
+
+@pytest.fixture
+def admission():
+    controller = AdmissionController(limits={"sanction": (1, 0)}, max_wait=0)
+    # Another turn holds the only sanction slot and nothing may queue
+    controller.limiters["sanction"].acquire()
+    return controller
+
+
+def process(agent, conversation, sanction):
+    return agent.process_message(
+        "continue", "shed-test", conversation, None, StubVerification(), StubUnderwriting(), sanction
+    )
+
+
+def test_shed_mid_chain_returns_completed_phases(conversation, admission):
+    agent = MasterAgent(auto_advance=True, admission=admission)
+    sanction = StubSanction()
+
+    response = process(agent, conversation, sanction)
+
+    assert conversation["status"] == "sanction"
+    assert conversation["underwriting_status"] is True
+    assert len(response["messages"]) == 3
+    assert response["messages"][1].startswith("🎉 Congratulations!")
+    assert response["requires_input"] is False
+    assert response["retry_after"] >= 1
+    assert [t["phase"] for t in response["phase_timings"]] == ["verification", "underwriting"]
+    assert sanction.submitted == 0
+    assert admission.limiters["sanction"].running == 1
+
+
+def test_shed_before_any_phase_keeps_status(conversation, admission):
+    agent = MasterAgent(auto_advance=True, admission=admission)
+    sanction = StubSanction()
+    process(agent, conversation, sanction)
+
+    # The continuation is shed again before anything ran: nothing to return
+    with pytest.raises(Overloaded):
+        process(agent, conversation, sanction)
+    assert conversation["status"] == "sanction"
+    assert sanction.submitted == 0
@@ -0,0 +1,73 @@
+"""Session handoff when workers are unreachable."""
+import pytest
+import requests
+
+from agents.session_router import SessionRouter
+
+A, B, C = "http://a", "http://b", "http://c"
+
+
+class FakeFleetRouter(SessionRouter):
+    """Admin calls go to in-memory workers; a worker in `down` refuses connections."""
+
+    def __init__(self, workers, down=()):
+        super().__init__(list(workers))
+        self.workers = workers
+        self.down = set(down)
+
+    def _admin(self, method, backend, path, payload=None):
+        if backend in self.down:
+            raise requests.ConnectionError(f"{backend} refused the connection")
+        sessions = self.workers[backend]
+        if path == "/admin/sessions":
+            return {"sessions": list(sessions)}
+        if path == "/admin/sessions/export":
+            exported = {sid: sessions.pop(sid) for sid in payload["session_ids"] if sid in sessions}
+            return {"sessions": exported}
+        sessions.update(payload["sessions"])
+        return {"imported": len(payload["sessions"])}
+
+
+def owned(router, workers):
+    return all(router.ring.node_for(sid) == backend for backend, held in workers.items() for sid in held)
+
+
+def test_remove_crashed_backend():
+    workers = {A: {}, B: {}, C: {}}
+    router = FakeFleetRouter(workers)
+    for n in range(300):
+        sid = f"s{n}"
+        workers[router.ring.node_for(sid)][sid] = {"status": "sales"}
+    router.down.add(C)
+
+    report = router.remove_backend(C)
+
+    assert router.ring.nodes == [A, B]
+    assert report["unreachable"] == [C]
+    assert report["lost"] == []
+    assert owned(router, {A: workers[A], B: workers[B]})
+
+
+def test_add_drops_unreachable_member():
+    workers = {A: {}, B: {}, C: {}}
+    router = FakeFleetRouter({A: workers[A], B: workers[B]})
+    router.workers = workers
+    for n in range(300):
+        sid = f"s{n}"
+        workers[router.ring.node_for(sid)][sid] = {"status": "sales"}
+    router.down.add(B)
+
+    report = router.add_backend(C)
+
+    assert sorted(router.ring.nodes) == [A, C]
+    assert report["unreachable"] == [B]
+    assert report["moved"] > 0
+    assert owned(router, {A: workers[A], C: workers[C]})
+
+
+def test_add_unreachable_backend_changes_nothing():
+    router = FakeFleetRouter({A: {"s1": {}}, B: {}}, down=[C])
+
+    with pytest.raises(requests.ConnectionError):
+        router.add_backend(C)
+    assert router.ring.nodes == [A, B]